@@ -0,0 +1,101 @@
+"""Measures how many System Activity history rows per second field usage is
+aggregated at, comparing the row by row parsing henry used to do with
+henry.modules.aggregation.
+
+    $ python -m benchmarks.bench_aggregation --rows 500000 --distinct 2000
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from typing import Any, Callable, Dict, List, Sequence
+
+from henry.modules import aggregation
+
+
+def row_by_row(data: Sequence[Dict[str, Any]]) -> Dict[str, int]:
+    """Field usage aggregation as it was done before henry.modules.aggregation."""
+    used_fields: Dict[str, int] = {}
+    for row in data:
+        fields = re.findall(r"(\w+\.\w+)", row["query.formatted_fields"])
+        recorded = []
+        for f in fields:
+            if used_fields.get(f):
+                used_fields[f] += row["history.query_run_count"]
+            else:
+                used_fields[f] = row["history.query_run_count"]
+            recorded.append(f)
+        filters = row["query.filters"]
+        if filters:
+            parsed_filters = re.findall(r"(\w+\.\w+)+", filters)
+            for f in parsed_filters:
+                if f in recorded:
+                    continue
+                elif used_fields.get(f):
+                    used_fields[f] += row["history.query_run_count"]
+                else:
+                    used_fields[f] = row["history.query_run_count"]
+    return used_fields
+
+
+def history_rows(rows: int, distinct: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Returns history rows drawn from `distinct` different queries."""
+    rng = random.Random(seed)
+    fields = [f"view_{v}.field_{f}" for v in range(10) for f in range(40)]
+    queries = []
+    for _ in range(distinct):
+        selected = rng.sample(fields, rng.randint(1, 12))
+        filtered = rng.sample(fields, rng.randint(0, 4))
+        queries.append(
+            (
+                json.dumps(selected),
+                json.dumps({f: "-NULL" for f in filtered}) if filtered else None,
+            )
+        )
+    data = []
+    for _ in range(rows):
+        formatted_fields, filters = rng.choice(queries)
+        data.append(
+            {
+                "query.formatted_fields": formatted_fields,
+                "query.filters": filters,
+                "history.query_run_count": rng.randint(1, 20),
+            }
+        )
+    return data
+
+
+def rows_per_second(
+    aggregate: Callable[[Sequence[Dict[str, Any]]], Dict[str, int]],
+    data: Sequence[Dict[str, Any]],
+    repeat: int,
+) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        aggregation.parse_fields.cache_clear()
+        start = time.perf_counter()
+        aggregate(data)
+        best = min(best, time.perf_counter() - start)
+    return len(data) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--distinct", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = history_rows(args.rows, args.distinct)
+    assert row_by_row(data) == aggregation.count_used_fields(data)
+    before = rows_per_second(row_by_row, data, args.repeat)
+    after = rows_per_second(aggregation.count_used_fields, data, args.repeat)
+    print(f"{args.rows} rows, {args.distinct} distinct queries")
+    print(f"row by row:  {before:>12,.0f} rows/s")
+    print(f"aggregation: {after:>12,.0f} rows/s ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
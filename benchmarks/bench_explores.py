@@ -0,0 +1,83 @@
+"""Measures the memory held by the metadata of many explores, comparing the SDK
+models henry used to keep for the whole run with henry.modules.summaries.
+
+    $ python -m benchmarks.bench_explores --explores 400 --fields 40
+"""
+
+import argparse
+import gc
+import json
+import sys
+import types
+from typing import Any, Callable, List
+
+from looker_sdk.rtl import serialize
+from looker_sdk.sdk.api40 import models
+
+from benchmarks import fake_looker
+from henry.modules import summaries
+
+
+def explore_payloads(volume: fake_looker.Volume) -> List[str]:
+    """Returns the lookml_model_explore responses of every explore of a model."""
+    instance = fake_looker.Instance(volume)
+    return [
+        json.dumps(instance.explore("model_0", f"explore_{e}"))
+        for e in range(volume.explores)
+    ]
+
+
+def sdk_explore(payload: str) -> models.LookmlModelExplore:
+    explore = serialize.deserialize40(data=payload, structure=models.LookmlModelExplore)
+    assert isinstance(explore, models.LookmlModelExplore)
+    return explore
+
+
+def summary(payload: str) -> summaries.ExploreSummary:
+    return summaries.summarize_explore(sdk_explore(payload))
+
+
+def retained_bytes(load: Callable[[str], Any], payloads: List[str]) -> int:
+    """Returns the size of the objects kept once every payload was loaded. Objects
+    shared by several explores are counted once, classes and modules not at all.
+    """
+    kept = [load(p) for p in payloads]
+    seen = set()
+    size = 0
+    stack: List[Any] = [kept]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, (type, types.ModuleType)):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--explores", type=int, default=200)
+    parser.add_argument("--joins", type=int, default=3)
+    parser.add_argument("--fields", type=int, default=20)
+    parser.add_argument("--field-padding", type=int, default=200)
+    args = parser.parse_args()
+
+    volume = fake_looker.Volume(
+        models=1,
+        explores=args.explores,
+        joins=args.joins,
+        fields=args.fields,
+        field_padding=args.field_padding,
+    )
+    payloads = explore_payloads(volume)
+    fields = 2 * (args.joins + 1) * args.fields
+    before = retained_bytes(sdk_explore, payloads)
+    after = retained_bytes(summary, payloads)
+    print(f"{args.explores} explores of {fields} fields")
+    print(f"sdk models: {before / 2 ** 20:>10,.1f} MB")
+    print(f"summaries:  {after / 2 ** 20:>10,.1f} MB ({before / after:.0f}x less)")
+
+
+if __name__ == "__main__":
+    main()
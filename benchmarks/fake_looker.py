@@ -0,0 +1,597 @@
+"""A local stand-in for the subset of the Looker API henry talks to.
+
+The server fabricates a deterministic instance (projects, models, explores,
+connections and system__activity history) whose size and response latency are
+configurable, and counts every call it serves so benchmarks can report how many
+round trips a command needed.
+"""
+
+import argparse
+import collections
+import csv
+import datetime
+import io
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http import server
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+MEASURES = {
+    "history.query_run_count",
+    "query.count",
+    "scheduled_job.count",
+    "history.average_runtime",
+}
+
+
+class Volume(NamedTuple):
+    """Size of the fabricated instance. field_padding is the number of characters
+    added to descriptions and sql of every field to make explore metadata as heavy
+    as on real instances.
+    """
+
+    projects: int = 2
+    models: int = 4
+    explores: int = 20
+    joins: int = 3
+    fields: int = 10
+    history_rows: int = 20000
+    connections: int = 5
+    field_padding: int = 200
+
+
+class Latency(NamedTuple):
+    """Seconds every call waits before it is answered, per kind of endpoint."""
+
+    default: float = 0.0
+    explore: float = 0.0
+    query: float = 0.0
+    connection_test: float = 0.0
+
+
+class Instance:
+    """Deterministically generated Looker content."""
+
+    def __init__(self, volume: Volume, seed: int = 0):
+        self.volume = volume
+        rnd = random.Random(seed)
+        self.projects = [f"project_{p}" for p in range(volume.projects)]
+        self.models: Dict[str, Dict[str, Any]] = {}
+        for m in range(volume.models):
+            name = f"model_{m}"
+            self.models[name] = {
+                "name": name,
+                "project_name": self.projects[m % volume.projects],
+                "has_content": True,
+                "label": name.title(),
+                "explores": [
+                    {
+                        "name": f"explore_{e}",
+                        "description": None,
+                        "label": f"Explore {e}",
+                        "hidden": e % 7 == 6,
+                        "group_label": name.title(),
+                    }
+                    for e in range(volume.explores)
+                ],
+            }
+        self.connections = [f"connection_{c}" for c in range(volume.connections)]
+        today = datetime.date.today()
+        self.history: List[Tuple[Any, ...]] = []
+        model_names = list(self.models)
+        for _ in range(volume.history_rows):
+            model = rnd.choice(model_names)
+            explore = f"explore_{rnd.randrange(volume.explores)}"
+            views = [explore] + [f"join_{j}" for j in range(volume.joins)]
+            fields = sorted(
+                {
+                    f"{rnd.choice(views)}.{rnd.choice(['dimension', 'measure'])}_"
+                    f"{rnd.randrange(1, volume.fields)}"
+                    for _ in range(rnd.randint(1, 4))
+                }
+            )
+            filters = None
+            if rnd.random() < 0.3:
+                filters = json.dumps(
+                    {f"{rnd.choice(views)}.dimension_1": f"{rnd.randrange(10)}"}
+                )
+            self.history.append(
+                (
+                    today - datetime.timedelta(days=rnd.randrange(120)),
+                    model,
+                    explore,
+                    json.dumps(fields),
+                    filters,
+                    rnd.randint(1, 5),
+                    rnd.choice(self.connections),
+                    rnd.random() * 10,
+                )
+            )
+
+    def model(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.models.get(name)
+
+    def explore(self, model: str, explore: str) -> Optional[Dict[str, Any]]:
+        m = self.models.get(model)
+        if not m or explore not in {e["name"] for e in m["explores"]}:
+            return None
+        views = [explore] + [f"join_{j}" for j in range(self.volume.joins)]
+        padding = "x" * self.volume.field_padding
+
+        def field(view: str, kind: str, i: int) -> Dict[str, Any]:
+            name = f"{view}.{kind}_{i}"
+            return {
+                "name": name,
+                "hidden": i == 0,
+                "label": name.replace("_", " ").title(),
+                "description": padding,
+                "sql": f"${{TABLE}}.{kind}_{i} -- {padding}",
+                "suggestions": [padding] * 3,
+                "scope": view,
+                "type": "string" if kind == "dimension" else "count",
+                "view": view,
+            }
+
+        return {
+            "id": f"{model}::{explore}",
+            "name": explore,
+            "model_name": model,
+            "project_name": m["project_name"],
+            "hidden": explore.endswith("6"),
+            "description": None if explore.endswith("1") else "An explore",
+            "scopes": list(views),
+            "sql_table_name": padding,
+            "fields": {
+                "dimensions": [
+                    field(v, "dimension", i)
+                    for v in views
+                    for i in range(self.volume.fields)
+                ],
+                "measures": [
+                    field(v, "measure", i)
+                    for v in views
+                    for i in range(self.volume.fields)
+                ],
+                "filters": [],
+                "parameters": [],
+            },
+        }
+
+
+def _values(expression: str) -> Tuple[List[str], List[str]]:
+    """Splits a Looker filter expression into included and excluded values, with
+    characters escaped by "^" taken literally.
+    """
+    include, exclude = [], []
+    for part in re.split(r"(?<!\^),", expression):
+        part = part.strip()
+        if not part:
+            continue
+        excluded = part.startswith("-")
+        value = re.sub(r"\^(.)", r"\1", part[1:] if excluded else part)
+        (exclude if excluded else include).append(value)
+    return include, exclude
+
+
+def _date_range(expression: str) -> Tuple[datetime.date, datetime.date]:
+    today = datetime.date.today()
+    match = re.match(r"^(\d+) days?$", expression.strip())
+    if match:
+        return today - datetime.timedelta(days=int(match.group(1)) - 1), today
+    match = re.match(r"^(\d+) days? ago for (\d+) days?$", expression.strip())
+    if match:
+        start = today - datetime.timedelta(days=int(match.group(1)))
+        return start, start + datetime.timedelta(days=int(match.group(2)) - 1)
+    start, end = expression.split(" to ")
+    parse = lambda d: datetime.datetime.strptime(d.strip(), "%Y/%m/%d").date()  # noqa
+    return parse(start), parse(end) - datetime.timedelta(days=1)
+
+
+def run_query(instance: Instance, query: Dict[str, Any], limit: Optional[str]):
+    """Evaluates a system__activity history query against the fake history."""
+    if query.get("model") != "system__activity" or query.get("view") != "history":
+        return list(query.get("fields") or []), []
+    fields = list(query.get("fields") or [])
+    filters = query.get("filters") or {}
+    rows = instance.history
+    for field, expression in filters.items():
+        if field == "history.created_date" and expression:
+            start, end = _date_range(expression)
+            rows = [r for r in rows if start <= r[0] <= end]
+        elif field in ("query.model", "query.view", "history.connection_name"):
+            include, exclude = _values(expression or "")
+            idx = {"query.model": 1, "query.view": 2, "history.connection_name": 6}
+            i = idx[field]
+            rows = [
+                r
+                for r in rows
+                if (not include or r[i] in include) and r[i] not in exclude
+            ]
+    dims = [f for f in fields if f not in MEASURES]
+    getters = {
+        "query.model": lambda r: r[1],
+        "query.view": lambda r: r[2],
+        "query.formatted_fields": lambda r: r[3],
+        "query.filters": lambda r: r[4],
+        "history.created_date": lambda r: r[0].isoformat(),
+        "history.connection_name": lambda r: r[6],
+    }
+    groups: Dict[Tuple[Any, ...], List[Tuple[Any, ...]]] = collections.OrderedDict()
+    for r in rows:
+        key = tuple(getters.get(d, lambda r: None)(r) for d in dims)
+        groups.setdefault(key, []).append(r)
+    result = []
+    for key, members in groups.items():
+        row: Dict[str, Any] = {d: key[i] for i, d in enumerate(dims)}
+        for f in fields:
+            if f in ("history.query_run_count", "query.count"):
+                row[f] = sum(m[5] for m in members)
+            elif f == "history.average_runtime":
+                row[f] = sum(m[7] for m in members) / len(members)
+            elif f == "scheduled_job.count":
+                row[f] = 0
+        result.append({f: row.get(f) for f in fields})
+    sorts = query.get("sorts") or [f"{dims[0]}" if dims else ""]
+    for sort in reversed([s for s in sorts if s]):
+        name, _, direction = sort.partition(" ")
+        result.sort(
+            key=lambda r: (r.get(name) is None, r.get(name) or 0),
+            reverse=direction.lower() == "desc",
+        )
+    row_limit = int(limit or query.get("limit") or 500)
+    if row_limit >= 0:
+        result = result[:row_limit]
+    return fields, result
+
+
+def _parse_fields(fields: str) -> Dict[str, Any]:
+    """Parses a `fields=` projection into the attributes it selects mapped to the
+    projection of their own attributes, e.g. "a,b(c)" -> {"a": None, "b": {"c": None}}
+    """
+    tree: Dict[str, Any] = {}
+    depth = 0
+    token = nested = ""
+    for ch in fields + ",":
+        if ch == "(":
+            depth += 1
+            if depth == 1:
+                continue
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                continue
+        elif ch == "," and depth == 0:
+            if token.strip():
+                tree[token.strip()] = _parse_fields(nested) if nested else None
+            token = nested = ""
+            continue
+        if depth:
+            nested += ch
+        else:
+            token += ch
+    return tree
+
+
+def _apply(data: Any, tree: Optional[Dict[str, Any]]) -> Any:
+    if tree is None:
+        return data
+    if isinstance(data, list):
+        return [_apply(d, tree) for d in data]
+    if not isinstance(data, dict):
+        return data
+    return {k: _apply(v, tree[k]) for k, v in data.items() if k in tree}
+
+
+def _project(data: Any, fields: Optional[str]) -> Any:
+    """Applies a `fields=` projection, nested ones included, to a response."""
+    if not fields:
+        return data
+    return _apply(data, _parse_fields(fields))
+
+
+class Handler(server.BaseHTTPRequestHandler):
+    server: "FakeLooker"
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+    def _send(self, status: int, body: Any, content_type="application/json"):
+        if not isinstance(body, (bytes, str)):
+            body = json.dumps(body)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.record_bytes(len(body))
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def _dispatch(self, method: str):
+        url = urllib.parse.urlparse(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        path = url.path
+        if not path.startswith("/api/4.0/"):
+            return self._send(404, {"message": "Not found"})
+        path = urllib.parse.unquote(path[len("/api/4.0") :])
+        body = self._body()
+        for pattern, verb, endpoint in ROUTES:
+            match = re.fullmatch(pattern, path)
+            if match and verb == method:
+                self.server.record_call(endpoint)
+                if not self.server.admit():
+                    return self._send(429, {"message": "Too Many Requests"})
+                try:
+                    self.server.wait(endpoint)
+                finally:
+                    self.server.leave()
+                if self.server.fail():
+                    return self._send(503, {"message": "Service Unavailable"})
+                if endpoint != "login" and not self.headers.get(
+                    "Authorization", ""
+                ).startswith("Bearer "):
+                    return self._send(401, {"message": "Requires authentication."})
+                handler = getattr(self, f"_{endpoint}")
+                return handler(*match.groups(), params=params, body=body)
+        return self._send(404, {"message": "Not found"})
+
+    def _login(self, params, body):
+        self._send(
+            200,
+            {"access_token": "fake-token", "token_type": "Bearer", "expires_in": 3600},
+        )
+
+    def _me(self, params, body):
+        self._send(200, {"id": "1", "display_name": "Henry Benchmark"})
+
+    def _session(self, params, body):
+        workspace = json.loads(body or b"{}").get("workspace_id", "production")
+        self._send(200, {"workspace_id": workspace, "sudo_user_id": None})
+
+    def _all_lookml_models(self, params, body):
+        data = list(self.server.instance.models.values())
+        self._send(200, _project(data, params.get("fields")))
+
+    def _lookml_model(self, model, params, body):
+        m = self.server.instance.model(model)
+        if m is None:
+            return self._send(404, {"message": "Not found"})
+        self._send(200, _project(m, params.get("fields")))
+
+    def _lookml_model_explore(self, model, explore, params, body):
+        e = self.server.instance.explore(model, explore)
+        if e is None:
+            return self._send(404, {"message": "Not found"})
+        self._send(200, _project(e, params.get("fields")))
+
+    def _run_inline_query(self, result_format, params, body):
+        fields, rows = run_query(
+            self.server.instance, json.loads(body or b"{}"), params.get("limit")
+        )
+        if result_format == "csv":
+            # Like Looker, csv results list dimensions before measures
+            columns = sorted(fields, key=lambda f: f in MEASURES)
+            out = io.StringIO()
+            writer = csv.writer(out)
+            writer.writerow(
+                [f.replace(".", " ").replace("_", " ").title() for f in columns]
+            )
+            for r in rows:
+                writer.writerow(["" if r[f] is None else r[f] for f in columns])
+            return self._send(200, out.getvalue(), "text/csv")
+        self._send(200, rows)
+
+    def _all_projects(self, params, body):
+        self._send(200, [self._project_data(p) for p in self.server.instance.projects])
+
+    def _project(self, project, params, body):
+        if project not in self.server.instance.projects:
+            return self._send(404, {"message": "Not found"})
+        self._send(200, self._project_data(project))
+
+    def _project_data(self, project):
+        return {
+            "id": project,
+            "name": project,
+            "git_remote_url": f"git@example.com:looker/{project}.git",
+            "pull_request_mode": "off",
+            "validation_required": True,
+        }
+
+    def _project_workspace(self, project, params, body):
+        self._send(
+            200,
+            {"project_id": project, "workspace_id": "production", "git_head": "abc123"},
+        )
+
+    def _all_project_files(self, project, params, body):
+        instance = self.server.instance
+        files = [
+            {"id": f"{m}.model.lkml", "type": "model", "title": m, "path": m}
+            for m, data in instance.models.items()
+            if data["project_name"] == project
+        ] + [
+            {"id": f"view_{v}.view.lkml", "type": "view", "title": f"view_{v}"}
+            for v in range(instance.volume.joins + 1)
+        ]
+        self._send(200, _project(files, params.get("fields")))
+
+    def _all_git_connection_tests(self, project, params, body):
+        self._send(200, [{"id": "git_connect"}, {"id": "git_auth"}])
+
+    def _run_git_connection_test(self, project, test, params, body):
+        self._send(200, {"id": test, "status": "pass", "message": "OK"})
+
+    def _all_connections(self, params, body):
+        self._send(
+            200,
+            [
+                {"name": c, "dialect": {"connection_tests": ["connect", "query"]}}
+                for c in self.server.instance.connections
+            ],
+        )
+
+    def _test_connection(self, connection, params, body):
+        tests = (params.get("tests") or "connect").split(",")
+        self._send(
+            200,
+            [{"name": t, "status": "success", "message": "OK"} for t in tests],
+        )
+
+    def _all_legacy_features(self, params, body):
+        self._send(200, [{"name": "Legacy Feature", "enabled": True}])
+
+
+ROUTES = [
+    (r"/login", "POST", "login"),
+    (r"/user", "GET", "me"),
+    (r"/session", "PATCH", "session"),
+    (r"/lookml_models", "GET", "all_lookml_models"),
+    (r"/lookml_models/([^/]+)", "GET", "lookml_model"),
+    (r"/lookml_models/([^/]+)/explores/([^/]+)", "GET", "lookml_model_explore"),
+    (r"/queries/run/([^/]+)", "POST", "run_inline_query"),
+    (r"/projects", "GET", "all_projects"),
+    (r"/projects/([^/]+)", "GET", "project"),
+    (r"/projects/([^/]+)/current_workspace", "GET", "project_workspace"),
+    (r"/projects/([^/]+)/files", "GET", "all_project_files"),
+    (r"/projects/([^/]+)/git_connection_tests", "GET", "all_git_connection_tests"),
+    (
+        r"/projects/([^/]+)/git_connection_tests/([^/]+)",
+        "GET",
+        "run_git_connection_test",
+    ),
+    (r"/connections", "GET", "all_connections"),
+    (r"/connections/([^/]+)/test", "PUT", "test_connection"),
+    (r"/legacy_features", "GET", "all_legacy_features"),
+]
+
+
+class FakeLooker(server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        *,
+        volume: Optional[Volume] = None,
+        latency: Optional[Latency] = None,
+        error_rate: float = 0.0,
+        capacity: Optional[int] = None,
+    ):
+        """Calls are answered with a 503 error at random, at error_rate, and with a
+        429 error while capacity calls are already being answered.
+        """
+        super().__init__(address, Handler)
+        self.instance = Instance(volume or Volume())
+        self.latency = latency or Latency()
+        self.error_rate = error_rate
+        self.capacity = capacity
+        self.in_flight = 0
+        self.throttled = 0
+        self._random = random.Random(0)
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = collections.Counter()
+        self.bytes_sent = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record_call(self, endpoint: str):
+        with self._lock:
+            self.calls[endpoint] += 1
+
+    def record_bytes(self, n: int):
+        with self._lock:
+            self.bytes_sent += n
+
+    def reset(self):
+        with self._lock:
+            self.calls = collections.Counter()
+            self.bytes_sent = 0
+            self.throttled = 0
+
+    def wait(self, endpoint: str):
+        delay = {
+            "lookml_model_explore": self.latency.explore,
+            "run_inline_query": self.latency.query,
+            "test_connection": self.latency.connection_test,
+        }.get(endpoint) or self.latency.default
+        if delay:
+            time.sleep(delay)
+
+    def admit(self) -> bool:
+        with self._lock:
+            if self.capacity is not None and self.in_flight >= self.capacity:
+                self.throttled += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def fail(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def start(self) -> "FakeLooker":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    add_volume_arguments(parser)
+    args = parser.parse_args()
+    fake = FakeLooker(
+        ("127.0.0.1", args.port),
+        volume=volume_from_args(args),
+        latency=Latency(default=args.latency),
+        error_rate=args.error_rate,
+    )
+    print(f"Serving a fake Looker API on {fake.base_url}")
+    fake.serve_forever()
+
+
+def add_volume_arguments(parser: argparse.ArgumentParser):
+    for name, default in Volume._field_defaults.items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}",
+            type=int,
+            default=default,
+            help=f"Default: {default}",
+        )
+
+
+def volume_from_args(args: argparse.Namespace) -> Volume:
+    return Volume(**{name: getattr(args, name) for name in Volume._fields})
+
+
+if __name__ == "__main__":
+    main()
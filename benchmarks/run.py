@@ -0,0 +1,194 @@
+"""Runs henry commands end to end against a local fake Looker API and reports their
+wall time, number of API calls and peak memory.
+
+    $ python -m benchmarks.run --latency 0.05 --explores 50
+    $ python -m benchmarks.run --commands "vacuum explores" --extra-args="--jobs 8"
+
+Every command runs in its own process with an empty cache directory, so that runs
+are independent of each other and of the caches of the machine running them.
+"""
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, NamedTuple, Sequence
+
+import tabulate
+
+from benchmarks.fake_looker import (
+    FakeLooker,
+    Latency,
+    add_volume_arguments,
+    volume_from_args,
+)
+
+COMMANDS = [
+    "pulse",
+    "analyze projects",
+    "analyze models",
+    "analyze explores",
+    "vacuum models",
+    "vacuum explores",
+]
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Measurement(NamedTuple):
+    command: str
+    wall_time: float
+    api_calls: int
+    calls: Dict[str, int]
+    bytes_received: int
+    throttled: int
+    peak_rss: int
+    returncode: int
+
+
+def max_rss_bytes(ru_maxrss: int) -> int:
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return ru_maxrss if sys.platform == "darwin" else ru_maxrss * 1024
+
+
+def measure(
+    fake: FakeLooker, command: str, extra_args: Sequence[str], workdir: str
+) -> Measurement:
+    """Runs a henry command in a new process and measures it."""
+    with open(os.path.join(workdir, "looker.ini"), "w") as f:
+        f.write(
+            f"[Looker]\nbase_url={fake.base_url}\n"
+            "client_id=benchmark\nclient_secret=benchmark\nverify_ssl=False\n"
+        )
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(
+            filter(None, [ROOT, os.environ.get("PYTHONPATH")])
+        ),
+        "XDG_CACHE_HOME": os.path.join(workdir, "cache"),
+    }
+    args = [sys.executable, "-m", "henry.cli", *command.split(), *extra_args]
+    fake.reset()
+    with tempfile.TemporaryFile() as stderr:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            args, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=stderr
+        )
+        # os.wait4 reports the resource usage of this one process only
+        _, status, rusage = os.wait4(process.pid, 0)
+        wall_time = time.perf_counter() - start
+        returncode = (
+            os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+        )
+        if returncode:
+            stderr.seek(0)
+            print(f"{command} failed:\n{stderr.read().decode()}", file=sys.stderr)
+    return Measurement(
+        command=command,
+        wall_time=wall_time,
+        api_calls=sum(fake.calls.values()),
+        calls=dict(fake.calls),
+        bytes_received=fake.bytes_sent,
+        throttled=fake.throttled,
+        peak_rss=max_rss_bytes(rusage.ru_maxrss),
+        returncode=returncode,
+    )
+
+
+def summarize(measurements: Sequence[Measurement]) -> List[Dict[str, Any]]:
+    """Returns the best run of every command."""
+    best: Dict[str, Measurement] = {}
+    for m in measurements:
+        if m.command not in best or m.wall_time < best[m.command].wall_time:
+            best[m.command] = m
+    return [
+        {
+            "Command": m.command,
+            "Wall Time (s)": round(m.wall_time, 3),
+            "API Calls": m.api_calls,
+            "Received (KB)": round(m.bytes_received / 1024),
+            "Throttled": m.throttled,
+            "Peak RSS (MB)": round(m.peak_rss / 1024**2, 1),
+            "Status": "OK" if not m.returncode else f"exit {m.returncode}",
+        }
+        for m in best.values()
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--commands",
+        nargs="+",
+        default=COMMANDS,
+        help="Commands to run, e.g. 'vacuum explores'. Default: all of them",
+    )
+    parser.add_argument(
+        "--extra-args",
+        default="",
+        help="Arguments passed to every command, e.g. '--jobs 8'",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per command")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds every API call takes"
+    )
+    parser.add_argument(
+        "--explore-latency",
+        type=float,
+        default=0.0,
+        help="Seconds every explore metadata call takes instead of --latency",
+    )
+    parser.add_argument(
+        "--query-latency",
+        type=float,
+        default=0.0,
+        help="Seconds every query takes instead of --latency",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Share of API calls answered with a 503 error",
+    )
+    parser.add_argument(
+        "--capacity",
+        type=int,
+        default=None,
+        help="Calls answered at once, beyond which calls are throttled",
+    )
+    parser.add_argument(
+        "--json", dest="json_file", help="Also write all measurements to a file"
+    )
+    add_volume_arguments(parser)
+    args = parser.parse_args()
+
+    fake = FakeLooker(
+        volume=volume_from_args(args),
+        latency=Latency(
+            default=args.latency,
+            explore=args.explore_latency,
+            query=args.query_latency,
+        ),
+        error_rate=args.error_rate,
+        capacity=args.capacity,
+    ).start()
+    measurements = []
+    for command in args.commands:
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as workdir:
+                measurements.append(
+                    measure(fake, command, shlex.split(args.extra_args), workdir)
+                )
+    fake.shutdown()
+
+    print(tabulate.tabulate(summarize(measurements), headers="keys", tablefmt="psql"))
+    if args.json_file:
+        with open(args.json_file, "w") as f:
+            json.dump([m._asdict() for m in measurements], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,39 +2,98 @@
 import argparse
 import os
 import sys
+from typing import Any, Dict, Optional, Sequence
 
 import henry
-from henry.commands import analyze, pulse, vacuum
-from henry.modules import fetcher
+
+# Stands for the default socket of henry serve until it is looked up
+SERVER_SOCKET = "default"
+
+# Commands, and the Looker SDK they use, are only imported once arguments were
+# parsed, so that --help and usage errors return right away.
 
 
 def main():
     parser = setup_cli()
-    user_input = parse_input(parser)
+    args = parse_args(parser)
+    if args.get("server"):
+        from henry.modules import server
+
+        sys.exit(server.forward(args["server"], sys.argv[1:]))
+    from henry.modules import fetcher
+
+    run_command(parser, fetcher.Input(**args))
+
 
+def run_command(parser: argparse.ArgumentParser, user_input, warm=None):
+    """Runs the command of user_input, with the API session and caches of warm
+    when run by henry serve.
+    """
     if user_input.command == "pulse":
-        pulse.Pulse.run(user_input)
+        from henry.commands import pulse
+
+        pulse.Pulse.run(user_input, warm)
     elif user_input.command == "analyze":
-        analyze.Analyze.run(user_input)
+        from henry.commands import analyze
+
+        run_fetcher(analyze.Analyze, user_input, warm)
     elif user_input.command == "vacuum":
-        vacuum.Vacuum.run(user_input)
+        from henry.commands import vacuum
+
+        run_fetcher(vacuum.Vacuum, user_input, warm)
+    elif user_input.command == "serve" and warm is None:
+        from henry.commands import serve
+
+        serve.Serve.run(user_input)
+    elif user_input.command == "batch" and warm is None:
+        from henry.commands import batch
+
+        batch.Batch.run(user_input)
     else:
-        parser.error()
+        parser.error(
+            "Please specify one of 'pulse', 'analyze', 'vacuum', 'serve' or 'batch'"
+        )
 
 
-def setup_cli():
+def run_fetcher(command, user_input, warm=None):
+    """Runs an analyze or vacuum command against one instance, or every instance
+    of --sections or --all-sections in their own process.
+    """
+    if user_input.sections or user_input.all_sections:
+        from henry.commands import fanout
+
+        fanout.run(command, user_input)
+    else:
+        command.run(user_input, warm)
+
+
+def setup_cli(argv: Optional[Sequence[str]] = None):
     parser = create_parser()
-    setup_subparsers(parser)
+    setup_subparsers(parser, sys.argv[1:] if argv is None else argv)
     return parser
 
 
+class HelpFileParser(argparse.ArgumentParser):
+    """ArgumentParser whose description is read from help_file when help is
+    printed, rather than whenever henry runs.
+    """
+
+    def __init__(self, *args, help_file: Optional[str] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.help_file = help_file
+
+    def format_help(self) -> str:
+        if self.help_file and self.description is None:
+            with open(self.help_file, "r", encoding="unicode_escape") as myfile:
+                self.description = myfile.read()
+        return super().format_help()
+
+
 def create_parser():
     help_file = os.path.join(os.path.dirname(henry.__file__), ".support_files/help.rtf")
-    with open(help_file, "r", encoding="unicode_escape") as myfile:
-        description = myfile.read()
 
-    parser = argparse.ArgumentParser(
-        description=description,
+    parser = HelpFileParser(
+        help_file=help_file,
         formatter_class=argparse.RawDescriptionHelpFormatter,
         prog="henry",
         usage="henry command subcommand "
@@ -49,11 +108,13 @@ def create_parser():
     return parser
 
 
-def setup_subparsers(parser):
+def setup_subparsers(parser, argv: Sequence[str]):
     subparsers = parser.add_subparsers(dest="command", help=argparse.SUPPRESS)
     setup_pulse_subparser(subparsers)
-    setup_analyze_subparser(subparsers)
-    setup_vacuum_subparser(subparsers)
+    setup_analyze_subparser(subparsers, argv)
+    setup_vacuum_subparser(subparsers, argv)
+    setup_serve_subparser(subparsers)
+    setup_batch_subparser(subparsers)
 
 
 def setup_pulse_subparser(subparsers):
@@ -63,6 +124,48 @@ def setup_pulse_subparser(subparsers):
     pulse_parser.add_argument(
         "--timeout", type=int, default=120, help=argparse.SUPPRESS
     )
+    pulse_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of checks and connection tests to run concurrently. Default: 1",
+    )
+    pulse_parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=5,
+        help="Times an API request failing with a transient error is retried. "
+        "Default: 5",
+    )
+    add_rate_limit_arguments(pulse_parser)
+    pulse_parser.add_argument(
+        "--token-cache",
+        action="store_true",
+        default=False,
+        help="Reuse API access tokens across runs until they expire.",
+    )
+    add_server_argument(pulse_parser)
+    pulse_parser.add_argument(
+        "--connection-timeout",
+        type=int,
+        default=60,
+        help="Seconds after which a connection test is reported as failed. "
+        "Default: 60",
+    )
+    pulse_parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=False,
+        help="Report API calls per endpoint and time spent per stage of the run.",
+    )
+    pulse_parser.add_argument(
+        "--trace",
+        action="store_true",
+        default=False,
+        help="Write a timeline of API calls and stages to {command}_{date}_trace.json "
+        "for chrome://tracing or Perfetto.",
+    )
     pulse_parser.add_argument_group("Authentication")
     pulse_parser.add_argument(
         "--config-file", type=str, default="looker.ini", help=argparse.SUPPRESS
@@ -72,7 +175,7 @@ def setup_pulse_subparser(subparsers):
     )
 
 
-def setup_analyze_subparser(subparsers):
+def setup_analyze_subparser(subparsers, argv: Sequence[str]):
     analyze_parser = subparsers.add_parser(
         "analyze", help="analyze help", usage="henry analyze"
     )
@@ -128,6 +231,8 @@ def setup_analyze_subparser(subparsers):
         nargs=1,
         help="Limit results. No limit by default",
     )
+    add_history_arguments(analyze_models)
+    add_cache_arguments(analyze_models)
     add_common_arguments(analyze_models)
 
     analyze_explores = analyze_subparsers.add_parser("explores")
@@ -136,7 +241,7 @@ def setup_analyze_subparser(subparsers):
         "--model",
         type=str,
         default=None,
-        required=("--explore") in sys.argv,
+        required="--explore" in argv,
         help="Filter on model",
     )
     analyze_explores.add_argument(
@@ -162,10 +267,12 @@ def setup_analyze_subparser(subparsers):
         nargs=1,
         help="Limit results. No limit by default",
     )
+    add_history_arguments(analyze_explores)
+    add_cache_arguments(analyze_explores)
     add_common_arguments(analyze_explores)
 
 
-def setup_vacuum_subparser(subparsers):
+def setup_vacuum_subparser(subparsers, argv: Sequence[str]):
     vacuum_parser = subparsers.add_parser(
         "vacuum", help="vacuum help", usage="henry vacuum"
     )
@@ -196,6 +303,8 @@ def setup_vacuum_subparser(subparsers):
         "queries in the given usage period will "
         "be vacuumed. Default: 0 queries.",
     )
+    add_history_arguments(vacuum_models)
+    add_cache_arguments(vacuum_models)
     add_common_arguments(vacuum_models)
 
     vacuum_explores.add_argument(
@@ -203,7 +312,7 @@ def setup_vacuum_subparser(subparsers):
         "--model",
         type=str,
         default=None,
-        required=("--explore") in sys.argv,
+        required="--explore" in argv,
         help="Filter on model",
     )
 
@@ -218,9 +327,185 @@ def setup_vacuum_subparser(subparsers):
     vacuum_explores.add_argument(
         "--min-queries", type=int, default=0, help="Query threshold"
     )
+    add_history_arguments(vacuum_explores)
+    add_cache_arguments(vacuum_explores)
     add_common_arguments(vacuum_explores)
 
 
+def setup_serve_subparser(subparsers):
+    serve_parser = subparsers.add_parser(
+        "serve", help="serve help", usage="henry serve [global options]"
+    )
+    serve_parser.add_argument(
+        "--socket",
+        type=str,
+        default=None,
+        help="Unix socket to listen on. Default: ~/.cache/henry/serve.sock",
+    )
+    serve_parser.add_argument(
+        "--cache-ttl",
+        type=int,
+        default=300,
+        help="Seconds explore metadata and usage history are kept in memory. "
+        "Default: 300",
+    )
+    serve_parser.add_argument(
+        "--timeout", type=int, default=120, help=argparse.SUPPRESS
+    )
+    serve_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of concurrent API requests. Default: 1",
+    )
+    serve_parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=5,
+        help="Times an API request failing with a transient error is retried. "
+        "Default: 5",
+    )
+    add_rate_limit_arguments(serve_parser)
+    serve_parser.add_argument(
+        "--token-cache",
+        action="store_true",
+        default=False,
+        help="Reuse API access tokens across runs until they expire.",
+    )
+    serve_parser.add_argument_group("Authentication")
+    serve_parser.add_argument(
+        "--config-file", type=str, default="looker.ini", help=argparse.SUPPRESS
+    )
+    serve_parser.add_argument(
+        "--section", type=str, default="Looker", help=argparse.SUPPRESS
+    )
+
+
+def setup_batch_subparser(subparsers):
+    batch_parser = subparsers.add_parser(
+        "batch", help="batch help", usage="henry batch manifest [global options]"
+    )
+    batch_parser.add_argument(
+        "manifest", help="YAML or JSON file listing the commands to run"
+    )
+    batch_parser.add_argument(
+        "--output-dir",
+        type=str,
+        default=".",
+        help="Directory the output of every command is written to. Default: current "
+        "directory",
+    )
+    batch_parser.add_argument(
+        "--timeout", type=int, default=120, help=argparse.SUPPRESS
+    )
+    batch_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of concurrent API requests. Default: 1",
+    )
+    batch_parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=5,
+        help="Times an API request failing with a transient error is retried. "
+        "Default: 5",
+    )
+    add_rate_limit_arguments(batch_parser)
+    batch_parser.add_argument(
+        "--token-cache",
+        action="store_true",
+        default=False,
+        help="Reuse API access tokens across runs until they expire.",
+    )
+    batch_parser.add_argument_group("Authentication")
+    batch_parser.add_argument(
+        "--config-file", type=str, default="looker.ini", help=argparse.SUPPRESS
+    )
+    batch_parser.add_argument(
+        "--section", type=str, default="Looker", help=argparse.SUPPRESS
+    )
+
+
+def add_history_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=5000,
+        help="Maximum number of history rows fetched per request. Default: 5000",
+    )
+    parser.add_argument(
+        "--max-history-rows",
+        type=int,
+        default=1000000,
+        help="Maximum number of history rows fetched in total. Default: 1000000",
+    )
+    parser.add_argument(
+        "--usage-store",
+        action="store_true",
+        default=False,
+        help="Keep usage history in a local store and only fetch new days.",
+    )
+    parser.add_argument(
+        "--usage-retention",
+        type=int,
+        default=90,
+        help="Days of usage history kept in the local store. Default: 90",
+    )
+    parser.add_argument(
+        "--result-format",
+        choices=["csv", "json"],
+        default="csv",
+        help="Format usage history is fetched in. Default: csv",
+    )
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser):
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument(
+        "--no-cache",
+        action="store_true",
+        default=False,
+        help="Do not read or write the explore metadata cache.",
+    )
+    cache_group.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        default=False,
+        help="Refetch all explore metadata and rebuild the cache.",
+    )
+
+
+def add_rate_limit_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--max-rps",
+        type=float,
+        default=None,
+        help="Maximum number of API requests per second. Default: no limit",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=None,
+        help="Maximum number of API requests awaiting a response. Default: as "
+        "many as --jobs allows",
+    )
+
+
+def add_server_argument(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--server",
+        nargs="?",
+        const=SERVER_SOCKET,
+        default=None,
+        metavar="SOCKET",
+        help="Run the command on henry serve, listening on SOCKET. Default: "
+        "~/.cache/henry/serve.sock",
+    )
+
+
 def add_common_arguments(parser: argparse.ArgumentParser):
     parser.add_argument(
         "--save",
@@ -229,7 +514,68 @@ def add_common_arguments(parser: argparse.ArgumentParser):
         help="Save output to CSV.",
     )
     parser.add_argument("-q", "--quiet", action="store_true", help="Silence output")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        default=False,
+        help="Output results as they are generated. Can not be used with --order-by.",
+    )
+    parser.add_argument(
+        "--jsonl",
+        action="store_true",
+        default=False,
+        help="Stream results to stdout as JSON Lines instead of tables.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=False,
+        help="Report API calls per endpoint and time spent per stage of the run.",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        default=False,
+        help="Write a timeline of API calls and stages to {command}_{date}_trace.json "
+        "for chrome://tracing or Perfetto.",
+    )
     parser.add_argument("--timeout", type=int, default=120, help=argparse.SUPPRESS)
+    sections_group = parser.add_mutually_exclusive_group()
+    sections_group.add_argument(
+        "--sections",
+        type=lambda sections: [s.strip() for s in sections.split(",") if s.strip()],
+        default=None,
+        help="Comma separated config file sections of the instances to run the "
+        "command against concurrently, reported in an Instance column.",
+    )
+    sections_group.add_argument(
+        "--all-sections",
+        action="store_true",
+        default=False,
+        help="Run the command against the instances of all config file sections.",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of concurrent API requests. Default: 1",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=5,
+        help="Times an API request failing with a transient error is retried. "
+        "Default: 5",
+    )
+    add_rate_limit_arguments(parser)
+    parser.add_argument(
+        "--token-cache",
+        action="store_true",
+        default=False,
+        help="Reuse API access tokens across runs until they expire.",
+    )
+    add_server_argument(parser)
     parser.add_argument_group("Authentication")
     parser.add_argument(
         "--config-file", type=str, default="looker.ini", help=argparse.SUPPRESS
@@ -237,9 +583,23 @@ def add_common_arguments(parser: argparse.ArgumentParser):
     parser.add_argument("--section", type=str, default="Looker", help=argparse.SUPPRESS)
 
 
-def parse_input(parser: argparse.ArgumentParser):
-    args = vars(parser.parse_args())
-    return fetcher.Input(**args)
+def parse_args(
+    parser: argparse.ArgumentParser, argv: Optional[Sequence[str]] = None
+) -> Dict[str, Any]:
+    args = vars(parser.parse_args(argv))
+    if args.get("sortkey") and (args.get("stream") or args.get("jsonl")):
+        parser.error("--order-by can not be used with --stream or --jsonl")
+    if args.get("sections") or args.get("all_sections"):
+        if args.get("profile") or args.get("trace") or args.get("server"):
+            parser.error(
+                "--profile, --trace and --server can not be used with --sections or "
+                "--all-sections"
+            )
+    if args.get("server") == SERVER_SOCKET:
+        from henry.modules import server
+
+        args["server"] = server.default_socket_path()
+    return args
 
 
 if __name__ == "__main__":
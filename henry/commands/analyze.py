@@ -1,4 +1,4 @@
-from typing import cast, Optional, List, Any
+from typing import cast, Dict, Iterator, Optional, Any
 
 from looker_sdk.sdk.api40 import models
 from henry.modules import spinner
@@ -7,100 +7,136 @@ from henry.modules import fetcher
 
 class Analyze(fetcher.Fetcher):
     @classmethod
-    def run(cls, user_input: fetcher.Input):
-        analyze = cls(user_input)
+    def run(cls, user_input: fetcher.Input, warm: Optional[fetcher.WarmState] = None):
+        analyze = cls(user_input, warm)
+        rows = analyze.iter_results(user_input)
+        if analyze.stream:
+            analyze.stream_output(rows)
+        else:
+            name = f"{cls.__name__}.{user_input.subcommand}"
+            with spinner.Spinner(name, analyze.tracer):
+                result = list(rows)
+            analyze.output(data=cast(fetcher.TResult, result))
+
+    def iter_results(self, user_input: fetcher.Input) -> Iterator[Dict[str, Any]]:
+        """Yields the results of the subcommand of user_input."""
         if user_input.subcommand == "projects":
-            result = analyze.projects(id=user_input.project)
+            return self.iter_project_results(id=user_input.project)
         elif user_input.subcommand == "models":
-            result = analyze.models(project=user_input.project, model=user_input.model)
+            return self.iter_model_results(
+                project=user_input.project, model=user_input.model
+            )
         elif user_input.subcommand == "explores":
-            result = analyze.explores(
+            return self.iter_explore_results(
                 model=user_input.model, explore=user_input.explore
             )
         else:
             raise ValueError("Please specify one of 'projects', 'models' or 'explores'")
-        analyze.output(data=cast(fetcher.TResult, result))
 
     @spinner.Spinner()
     def projects(self, *, id: Optional[str] = None) -> fetcher.TResult:
         """Analyzes all projects or a specific project."""
+        return list(self.iter_project_results(id=id))
+
+    def iter_project_results(
+        self, *, id: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yields the analysis of every project once all of them were tested."""
         projects = self.get_projects(project_id=id)
-        result: List[Any] = []
         for p in projects:
             assert isinstance(p.name, str)
             assert isinstance(p.pull_request_mode, models.PullRequestMode)
             assert isinstance(p.validation_required, bool)
-            p_files = self.sdk.all_project_files(p.name)
 
-            if p.git_remote_url is None:
-                git_connection_test_results = "No repo found"
-            elif "/bare_models/" in cast(str, p.git_remote_url):
-                git_connection_test_results = "Bare repo, no tests required"
-            else:
-                git_connection_test_results = self.run_git_connection_tests(
-                    cast(str, p.id)
-                )
-
-            result.append(
-                {
-                    "Project": p.name,
-                    "# Models": sum(map(lambda p: p.type == "model", p_files)),
-                    "# View Files": sum(map(lambda p: p.type == "view", p_files)),
-                    "Git Connection Status": git_connection_test_results,
-                    "PR Mode": p.pull_request_mode.value,
-                    "Is Validation Required": p.validation_required,
-                }
+        # File listings are read from production before the session switches to
+        # dev mode, once, for the git connection tests of all projects.
+        project_files = self._concurrent_map(
+            lambda p: self.sdk.all_project_files(cast(str, p.name), fields="type"),
+            projects,
+        )
+        # Git connections are all tested before any result is yielded, so that the
+        # session is back in production even if the caller stops consuming them.
+        with self.dev_mode():
+            git_connection_test_results = self._concurrent_map(
+                self._test_project_git_connection, projects
             )
-        return result
+        for i, git_connection_test_result in enumerate(git_connection_test_results):
+            p = projects[i]
+            p_files = project_files[i]
+            yield {
+                "Project": p.name,
+                "# Models": sum(map(lambda p: p.type == "model", p_files)),
+                "# View Files": sum(map(lambda p: p.type == "view", p_files)),
+                "Git Connection Status": git_connection_test_result,
+                "PR Mode": cast(models.PullRequestMode, p.pull_request_mode).value,
+                "Is Validation Required": p.validation_required,
+            }
+
+    def _test_project_git_connection(self, p: models.Project) -> str:
+        if p.git_remote_url is None:
+            return "No repo found"
+        elif "/bare_models/" in cast(str, p.git_remote_url):
+            return "Bare repo, no tests required"
+        else:
+            return self.run_git_connection_tests(cast(str, p.id))
 
     @spinner.Spinner()
     def models(
         self, *, project: Optional[str] = None, model: Optional[str] = None
     ) -> fetcher.TResult:
         """Analyze models, can optionally filter by project or model."""
+        return list(self.iter_model_results(project=project, model=model))
+
+    def iter_model_results(
+        self, *, project: Optional[str] = None, model: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yields the results of models() one model at a time."""
         all_models = self.get_models(project=project, model=model)
-        result: fetcher.TResult = []
+        used_models = self.get_used_models()
         for m in all_models:
             assert isinstance(m.name, str)
             assert isinstance(m.project_name, str)
             assert isinstance(m.explores, list)
-            result.append(
-                {
-                    "Project": m.project_name,
-                    "Model": m.name,
-                    "# Explores": len(m.explores),
-                    "# Unused Explores": len(self.get_unused_explores(model=m.name)),
-                    "Query Count": self.get_used_models().get(m.name) or 0,
-                }
-            )
-        return result
+            yield {
+                "Project": m.project_name,
+                "Model": m.name,
+                "# Explores": len(m.explores),
+                "# Unused Explores": len(self.get_unused_explores(model=m.name)),
+                "Query Count": used_models.get(m.name) or 0,
+            }
 
     @spinner.Spinner()
     def explores(
         self, *, model: Optional[str] = None, explore: Optional[str] = None
     ) -> fetcher.TResult:
         """Analyze explores."""
-        all_explores = self.get_explores(model=model, explore=explore)
-        result: fetcher.TResult = []
+        return list(self.iter_explore_results(model=model, explore=explore))
+
+    def iter_explore_results(
+        self, *, model: Optional[str] = None, explore: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yields the results of explores() one explore at a time."""
+        all_explores = self.iter_explores(model=model, explore=explore)
+        explore_usage: Dict[str, Dict[str, fetcher.ExploreUsage]] = {}
         for e in all_explores:
             assert isinstance(e.name, str)
             assert isinstance(e.model_name, str)
             assert isinstance(e.hidden, bool)
-            field_stats = self.get_explore_field_stats(e)
+            if e.model_name not in explore_usage:
+                explore_usage[e.model_name] = self.get_explore_usage(
+                    model=e.model_name, explore=explore or ""
+                )
+            usage = explore_usage[e.model_name].get(e.name, fetcher.ExploreUsage(0, {}))
+            field_stats = self.get_explore_field_stats(e, used_fields=usage.fields)
             join_stats = self.get_explore_join_stats(explore=e, field_stats=field_stats)
-            result.append(
-                {
-                    "Model": e.model_name,
-                    "Explore": e.name,
-                    "Is Hidden": e.hidden,
-                    "Has Description": True if e.description else False,
-                    "# Joins": len(join_stats),
-                    "# Unused Joins": len(self._filter(join_stats)),
-                    "# Fields": len(field_stats),
-                    "# Unused Fields": len(self._filter(field_stats)),
-                    "Query Count": self.get_used_explores(
-                        model=e.model_name, explore=e.name
-                    ).get(e.name, 0),
-                }
-            )
-        return result
+            yield {
+                "Model": e.model_name,
+                "Explore": e.name,
+                "Is Hidden": e.hidden,
+                "Has Description": True if e.description else False,
+                "# Joins": len(join_stats),
+                "# Unused Joins": len(self._filter(join_stats)),
+                "# Fields": len(field_stats),
+                "# Unused Fields": len(self._filter(field_stats)),
+                "Query Count": usage.query_count,
+            }
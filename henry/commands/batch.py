@@ -0,0 +1,139 @@
+import contextlib
+import json
+import os
+import shlex
+import traceback
+from typing import Any, List, NamedTuple
+
+from henry import cli
+from henry.modules import fetcher, spinner
+
+# Commands a manifest can list
+BATCH_COMMANDS = ("pulse", "analyze", "vacuum")
+
+
+class Job(NamedTuple):
+    name: str
+    argv: List[str]
+    user_input: fetcher.Input
+
+
+class Batch(fetcher.Fetcher):
+    """Runs the commands listed in a manifest in one process. Commands share the
+    API session along with the models, explores and usage history fetched by
+    the commands before them, and each command's output is written to its own file.
+    """
+
+    def __init__(self, options: fetcher.Input):
+        super().__init__(options)
+        assert options.manifest
+        self.jobs_to_run = plan(load_manifest(options.manifest), options)
+        self.state = fetcher.WarmState(self.sdk)
+        self.parser = cli.setup_cli([])
+
+    @classmethod
+    def run(cls, user_input: fetcher.Input):
+        batch = cls(user_input)
+        batch.run_jobs()
+
+    def run_jobs(self):
+        """Runs every command of the manifest in order. A failing command does not
+        stop the others, its error is raised once all of them ran.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        errors: List[Exception] = []
+        for i, job in enumerate(self.jobs_to_run):
+            filename = os.path.join(self.output_dir, job.name + output_suffix(job))
+            print(f"\bCommand {i + 1}/{len(self.jobs_to_run)}: {' '.join(job.argv)}")
+            try:
+                with spinner.Spinner(job.name):
+                    with open(filename, "w") as f, contextlib.redirect_stdout(f):
+                        cli.run_command(self.parser, job.user_input, self.state)
+            except Exception as e:
+                errors.append(e)
+                with open(filename, "a") as f:
+                    traceback.print_exc(file=f)
+                print(f"\bUnable to run command: {e}", end="\n" * 2)
+                continue
+            print(f"\bOutput written to {filename}", end="\n" * 2)
+        if errors:
+            raise errors[0]
+
+
+def load_manifest(filename: str) -> List[Any]:
+    """Returns the commands listed by a manifest, read as JSON if its name ends in
+    .json, as YAML otherwise.
+    """
+    with open(filename, "r", encoding="utf-8") as f:
+        if filename.endswith(".json"):
+            manifest = json.load(f)
+        else:
+            try:
+                import yaml  # type: ignore
+            except ImportError:
+                raise ValueError(
+                    "Reading YAML manifests requires PyYAML, please install it with "
+                    "`pip install henry[yaml]` or write the manifest as JSON."
+                ) from None
+            manifest = yaml.safe_load(f)
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("commands"), list):
+        raise ValueError(f"{filename} should hold a list of commands.")
+    return manifest["commands"]
+
+
+def plan(commands: List[Any], options: fetcher.Input) -> List[Job]:
+    """Parses the commands of a manifest, each either a command line or a mapping
+    of a command line to `run` and the `name` of its output file. Commands run
+    against the instance of options with its number of jobs, and save their files
+    to its output directory.
+    """
+    jobs: List[Job] = []
+    for command in commands:
+        if isinstance(command, str):
+            command = {"run": command}
+        if not isinstance(command, dict) or not isinstance(command.get("run"), str):
+            raise ValueError(f"Unrecognized command in manifest: {command}.")
+        argv = shlex.split(command["run"])
+        if argv[:1] == ["henry"]:
+            argv = argv[1:]
+        if not argv or argv[0] not in BATCH_COMMANDS:
+            raise ValueError(
+                f"Unable to run `{command['run']}`, manifests can only run "
+                f"{', '.join(BATCH_COMMANDS)}."
+            )
+        options_given = {a.split("=")[0] for a in argv}
+        if options_given & {"--config-file", "--section", "--server"}:
+            raise ValueError(
+                f"Unable to run `{command['run']}`, commands run against the "
+                "instance henry batch connects to."
+            )
+        if "--jobs" in options_given or any(a.startswith("-j") for a in argv):
+            raise ValueError(
+                f"Unable to run `{command['run']}`, commands run with the --jobs "
+                "of henry batch."
+            )
+        parser = cli.setup_cli(argv)
+        try:
+            args = cli.parse_args(parser, argv)
+        except SystemExit:
+            raise ValueError(f"Unable to parse `{command['run']}`.") from None
+        args.update(
+            config_file=options.config_file,
+            section=options.section,
+            jobs=options.jobs,
+            output_dir=options.output_dir,
+        )
+        user_input = fetcher.Input(**args)
+        name = command.get("name") or "_".join(
+            filter(None, [user_input.command, user_input.subcommand])
+        )
+        if any(job.name == name for job in jobs):
+            raise ValueError(
+                f"Several commands are named {name}, please name them differently."
+            )
+        jobs.append(Job(name, argv, user_input))
+    return jobs
+
+
+def output_suffix(job: Job) -> str:
+    return ".jsonl" if job.user_input.jsonl else ".txt"
@@ -0,0 +1,105 @@
+import configparser
+import os
+import sys
+from concurrent import futures
+from typing import Any, Dict, Iterable, Iterator, List, Type, Union, cast
+
+from henry.commands import analyze, vacuum
+from henry.modules import fetcher, spinner
+
+# Column the instance every result comes from is reported in
+INSTANCE_COLUMN = "Instance"
+# Commands that can run against several instances, those yielding their results
+Command = Type[Union[analyze.Analyze, vacuum.Vacuum]]
+
+
+def config_sections(config_file: str) -> List[str]:
+    """Returns the sections of a looker.ini file, one per instance."""
+    if not os.path.isfile(config_file):
+        raise FileNotFoundError(f"No config file found: {config_file!r}")
+    parser = configparser.ConfigParser()
+    parser.read(config_file)
+    return parser.sections()
+
+
+def run(command: Command, user_input: fetcher.Input):
+    """Runs command against the instances of every section of user_input, each in
+    its own process, and outputs their results in one table with the instance they
+    come from. Results are output in the order of the sections, or as soon as an
+    instance is done when streaming, so that a slow instance does not hold up the
+    others. Instances failing do not stop the others, their first error is raised
+    once all results were output.
+    """
+    sections = (
+        config_sections(user_input.config_file)
+        if user_input.all_sections
+        else list(user_input.sections or [])
+    )
+    if not sections:
+        raise ValueError(f"No sections found in {user_input.config_file}.")
+    # Results are output by a fetcher of the first instance, sending no API calls
+    output = fetcher.Fetcher(
+        user_input._replace(section=sections[0], no_cache=True, usage_store=False)
+    )
+    errors: List[Exception] = []
+    with futures.ProcessPoolExecutor(max_workers=len(sections)) as executor:
+        pending = {
+            executor.submit(section_results, command, section_input(user_input, s)): s
+            for s in sections
+        }
+
+        def iter_results(
+            done: Iterable["futures.Future[List[Dict[str, Any]]]"],
+        ) -> Iterator[Dict[str, Any]]:
+            for future in done:
+                section = pending[future]
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    print(
+                        f"\bUnable to run {output.cmd} on {section}: {e}",
+                        file=sys.stderr,
+                    )
+                    continue
+                for row in rows:
+                    yield {INSTANCE_COLUMN: section, **row}
+
+        try:
+            if output.stream:
+                output.stream_output(iter_results(futures.as_completed(pending)))
+            else:
+                with spinner.Spinner(f"{command.__name__}.{user_input.subcommand}"):
+                    result = list(iter_results(pending))
+                output.output(data=cast(fetcher.TResult, result))
+        finally:
+            # Instances not started yet when streaming stopped at --limit, or when
+            # interrupted, are not run
+            for future in pending:
+                future.cancel()
+    if errors:
+        raise errors[0]
+
+
+def section_input(user_input: fetcher.Input, section: str) -> fetcher.Input:
+    """Returns the options to run the command of user_input against the instance
+    of section with, its results being output by the calling process.
+    """
+    return user_input._replace(
+        section=section,
+        sections=None,
+        all_sections=False,
+        quiet=True,
+        save=False,
+        stream=False,
+        jsonl=False,
+        profile=False,
+        trace=False,
+    )
+
+
+def section_results(
+    command: Command, user_input: fetcher.Input
+) -> List[Dict[str, Any]]:
+    """Returns the results of command for one instance, in a worker process."""
+    return list(command(user_input).iter_results(user_input))
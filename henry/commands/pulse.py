@@ -1,11 +1,26 @@
-import json
+from concurrent import futures
 from textwrap import fill
-from typing import Sequence, cast
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    cast,
+)
 
 from looker_sdk.sdk.api40 import models
 from looker_sdk.error import SDKError
 
-from henry.modules import exceptions, fetcher, spinner
+from henry.modules import exceptions, fetcher, spinner, tracing, transport
+
+
+class CheckResult(NamedTuple):
+    rows: Sequence[Any]
+    note: Optional[str] = None
 
 
 class Pulse(fetcher.Fetcher):
@@ -13,21 +28,76 @@ class Pulse(fetcher.Fetcher):
     overall health.
     """
 
+    # Connection tests run concurrently within a check running concurrently
+    THREADS_PER_JOB = 2
+
+    def __init__(
+        self, options: fetcher.Input, warm: Optional[fetcher.WarmState] = None
+    ):
+        super().__init__(options, warm)
+        self.connection_timeout = options.connection_timeout
+
     @classmethod
-    def run(cls, user_input: fetcher.Input):
-        pulse = cls(user_input)
-        pulse.check_db_connections()
-        pulse.check_dashboard_performance()
-        pulse.check_dashboard_errors()
-        pulse.check_explore_performance()
-        pulse.check_schedule_failures()
-        pulse.check_legacy_features()
-
-    @spinner.Spinner()
-    def check_db_connections(self):
-        """Gets all db connections and runs all supported tests against them."""
-        print("\bTest 1/6: Checking connections")
+    def run(cls, user_input: fetcher.Input, warm: Optional[fetcher.WarmState] = None):
+        pulse = cls(user_input, warm)
+        try:
+            pulse.run_checks()
+        finally:
+            pulse.report_profile()
+            pulse.write_trace()
+
+    def checks(self) -> Sequence[Tuple[str, Callable[[], CheckResult]]]:
+        """Returns the checks to run along with their titles, in display order."""
+        return [
+            ("Checking connections", self.check_db_connections),
+            (
+                "Checking for dashboards with queries slower than 30 seconds in the "
+                "last 7 days",
+                self.check_dashboard_performance,
+            ),
+            (
+                "Checking for dashboards with erroring queries in the last 7 days",
+                self.check_dashboard_errors,
+            ),
+            (
+                "Checking for the slowest explores in the past 7 days",
+                self.check_explore_performance,
+            ),
+            ("Checking for failing schedules", self.check_schedule_failures),
+            ("Checking for enabled legacy features", self.check_legacy_features),
+        ]
+
+    def run_checks(self):
+        """Runs all checks, up to self.jobs at a time, and prints their results in
+        order as soon as they are available. A failing check does not stop the
+        others, its error is raised once all results were printed.
+        """
+        checks = self.checks()
+        errors: List[Exception] = []
+        with futures.ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            pending = [executor.submit(self._run_check, *c) for c in checks]
+            for i, (title, _) in enumerate(checks):
+                print(f"\bTest {i + 1}/{len(checks)}: {title}")
+                try:
+                    with spinner.Spinner(title, self.tracer):
+                        result = pending[i].result()
+                except Exception as e:
+                    errors.append(e)
+                    print(f"\bUnable to run check: {e}", end="\n" * 2)
+                    continue
+                with self._stage("rendering"):
+                    if result.note:
+                        print(f"\b{result.note}")
+                    self._tabularize_and_print(result.rows)
+        if errors:
+            raise errors[0]
 
+    def _run_check(self, title: str, check: Callable[[], CheckResult]) -> CheckResult:
+        with tracing.span(self.tracer, title, "check"):
+            return check()
+
+    def check_db_connections(self) -> CheckResult:
+        """Gets all db connections and runs all supported tests against them."""
         reserved_names = [
             "looker__internal__analytics__replica",
             "looker__internal__analytics",
@@ -41,49 +111,65 @@ class Pulse(fetcher.Fetcher):
         if not db_connections:
             raise exceptions.NotFoundError("No connections found.")
 
-        formatted_results = []
-        for connection in db_connections:
-            assert connection.dialect
-            assert isinstance(connection.name, str)
-            try:
-                resp = self.sdk.test_connection(
-                    connection.name,
-                    models.DelimSequence(connection.dialect.connection_tests),
-                )
-                results = list(filter(lambda r: r.status == "error", resp))
-                errors = [f"- {fill(cast(str, e.message), width=100)}" for e in results]
-            except SDKError:
-                results = []
-                errors = ["API JSONDecode Error"]
-            resp = self.sdk.run_inline_query(
-                "json",
-                models.WriteQuery(
-                    model="system__activity",
-                    view="history",
-                    fields=["history.query_run_count"],
-                    filters={"history.connection_name": connection.name},
-                    limit="1",
-                ),
-            )
-            query_run_count = json.loads(resp)[0]["history.query_run_count"]
+        connection_names = [cast(str, c.name) for c in db_connections]
+        query_counts = self.get_connection_query_counts(connection_names)
+        connection_errors = self._concurrent_map(self.test_connection, db_connections)
 
+        formatted_results = []
+        for i, errors in enumerate(connection_errors):
             formatted_results.append(
                 {
-                    "Connection": connection.name,
+                    "Connection": connection_names[i],
                     "Status": "OK" if not errors else "\n".join(errors),
-                    "Query Count": query_run_count,
+                    "Query Count": query_counts.get(connection_names[i], 0),
                 }
             )
-        self._tabularize_and_print(formatted_results)
+        return CheckResult(formatted_results)
 
-    @spinner.Spinner()
-    def check_dashboard_performance(self):
-        """Prints a list of dashboards with slow running queries in the past
-        7 days"""
-        print(
-            "\bTest 2/6: Checking for dashboards with queries slower than "
-            "30 seconds in the last 7 days"
+    def test_connection(self, connection: models.DBConnection) -> List[str]:
+        """Runs all supported tests against a db connection and returns its errors.
+        Tests that take longer than self.connection_timeout seconds are reported as
+        an error.
+        """
+        assert connection.dialect
+        assert isinstance(connection.name, str)
+        try:
+            resp = self.sdk.test_connection(
+                connection.name,
+                models.DelimSequence(connection.dialect.connection_tests),
+                transport_options={"timeout": self.connection_timeout},
+            )
+        except transport.RequestTimeout:
+            return [f"- Timed out after {self.connection_timeout}s"]
+        except SDKError:
+            return ["API JSONDecode Error"]
+        results = list(filter(lambda r: r.status == "error", resp))
+        return [f"- {fill(cast(str, e.message), width=100)}" for e in results]
+
+    def get_connection_query_counts(self, names: Sequence[str]) -> Dict[str, int]:
+        """Returns a dictionary with connection names as keys and query count as
+        values, pulled with a single query grouped by connection.
+        """
+        rows = self.run_inline_query(
+            models.WriteQuery(
+                model="system__activity",
+                view="history",
+                fields=["history.connection_name", "history.query_run_count"],
+                filters={
+                    "history.connection_name": ",".join(map(escape_filter, names))
+                },
+                limit=str(len(names)),
+            ),
         )
+        return {
+            r["history.connection_name"]: r["history.query_run_count"] or 0
+            for r in rows
+            if r["history.connection_name"] in names
+        }
+
+    def check_dashboard_performance(self) -> CheckResult:
+        """Returns a list of dashboards with slow running queries in the past
+        7 days"""
         request = models.WriteQuery(
             model="system__activity",
             view="history",
@@ -95,18 +181,13 @@ class Pulse(fetcher.Fetcher):
                 "history.status": "complete",
             },
             sorts=["query.count desc"],
-            limit=20,
-        )
-        resp = self.sdk.run_inline_query("json", request)
-        slowest_dashboards = json.loads(resp)
-        self._tabularize_and_print(slowest_dashboards)
-
-    @spinner.Spinner()
-    def check_dashboard_errors(self):
-        """Prints a list of erroring dashboard queries."""
-        print(
-            "\bTest 3/6: Checking for dashboards with erroring queries in the last 7 days"  # noqa: B950
+            limit="20",
         )
+        slowest_dashboards = self.run_inline_query(request)
+        return CheckResult(slowest_dashboards)
+
+    def check_dashboard_errors(self) -> CheckResult:
+        """Returns a list of erroring dashboard queries."""
         request = models.WriteQuery(
             model="system__activity",
             view="history",
@@ -118,16 +199,13 @@ class Pulse(fetcher.Fetcher):
                 "history.status": "error",
             },
             sorts=["history.query_run_ount desc"],
-            limit=20,
+            limit="20",
         )
-        resp = self.sdk.run_inline_query("json", request)
-        erroring_dashboards = json.loads(resp)
-        self._tabularize_and_print(erroring_dashboards)
-
-    @spinner.Spinner()
-    def check_explore_performance(self):
-        """Prints a list of the slowest running explores."""
-        print("\bTest 4/6: Checking for the slowest explores in the past 7 days")
+        erroring_dashboards = self.run_inline_query(request)
+        return CheckResult(erroring_dashboards)
+
+    def check_explore_performance(self) -> CheckResult:
+        """Returns a list of the slowest running explores."""
         request = models.WriteQuery(
             model="system__activity",
             view="history",
@@ -137,25 +215,21 @@ class Pulse(fetcher.Fetcher):
                 "query.model": "-NULL, -system^_^_activity",
             },
             sorts=["history.average_runtime desc"],
-            limit=20,
+            limit="20",
         )
-        resp = self.sdk.run_inline_query("json", request)
-        slowest_explores = json.loads(resp)
+        slowest_explores = self.run_inline_query(request)
 
         request.fields = ["history.average_runtime"]
-        resp = json.loads(self.sdk.run_inline_query("json", request))
+        resp = self.run_inline_query(request)
         avg_query_runtime = resp[0]["history.average_runtime"]
+        note = None
         if avg_query_runtime:
-            print(
-                f"\bFor context, the average query runtime is {avg_query_runtime:.4f}s"
-            )
+            note = f"For context, the average query runtime is {avg_query_runtime:.4f}s"
 
-        self._tabularize_and_print(slowest_explores)
+        return CheckResult(slowest_explores, note)
 
-    @spinner.Spinner()
-    def check_schedule_failures(self):
-        """Prints a list of schedules that have failed in the past 7 days."""
-        print("\bTest 5/6: Checking for failing schedules")
+    def check_schedule_failures(self) -> CheckResult:
+        """Returns a list of schedules that have failed in the past 7 days."""
         request = models.WriteQuery(
             model="system__activity",
             view="scheduled_plan",
@@ -165,20 +239,27 @@ class Pulse(fetcher.Fetcher):
                 "scheduled_job.status": "failure",
             },
             sorts=["scheduled_job.count desc"],
-            limit=500,
+            limit="500",
         )
-        result = self.sdk.run_inline_query("json", request)
-        failed_schedules = json.loads(result)
-        self._tabularize_and_print(failed_schedules)
-
-    @spinner.Spinner()
-    def check_legacy_features(self):
-        """Prints a list of enabled legacy features."""
-        print("\bTest 6/6: Checking for enabled legacy features")
+        failed_schedules = self.run_inline_query(request)
+        return CheckResult(failed_schedules)
+
+    def check_legacy_features(self) -> CheckResult:
+        """Returns a list of enabled legacy features."""
         try:
             lf = list(filter(lambda f: f.enabled, self.sdk.all_legacy_features()))
             legacy_features = [{"Feature": cast(str, f.name)} for f in lf]
         except SDKError:
-            legacy_features = [["Unable to pull legacy features due to SDK error"]]
-        self._tabularize_and_print(legacy_features)
+            legacy_features = [
+                {"Feature": "Unable to pull legacy features due to SDK error"}
+            ]
+        return CheckResult(legacy_features)
+
 
+def escape_filter(value: str) -> str:
+    """Escapes the characters of the Looker filter grammar in a value, so that it
+    only matches itself: wildcards, separators, quotes and a leading "-".
+    """
+    for char in '^_%,"':
+        value = value.replace(char, "^" + char)
+    return "^" + value if value.startswith("-") else value
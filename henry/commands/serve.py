@@ -0,0 +1,83 @@
+import contextlib
+import os
+import sys
+from typing import List, TextIO
+
+from henry import cli
+from henry.modules import fetcher, server
+
+# Options of the API session, which commands share with henry serve
+SESSION_OPTIONS = (
+    "--jobs",
+    "--timeout",
+    "--max-retries",
+    "--max-rps",
+    "--max-in-flight",
+    "--token-cache",
+)
+
+
+class Serve(fetcher.Fetcher):
+    """Keeps an API session and the caches of its commands warm for the commands
+    henry clients forward with --server, so that they answer without logging in
+    or fetching metadata and usage history again.
+    """
+
+    def __init__(self, options: fetcher.Input):
+        super().__init__(options)
+        self.socket = options.socket or server.default_socket_path()
+        self.config_file = os.path.abspath(options.config_file)
+        self.section = options.section
+        self.state = fetcher.WarmState(self.sdk, options.cache_ttl)
+
+    @classmethod
+    def run(cls, user_input: fetcher.Input):
+        serve = cls(user_input)
+        with server.Server(serve.socket, serve.handle) as s:
+            print(f"henry serve listening on {serve.socket}", file=sys.stderr)
+            try:
+                s.serve_forever()
+            except KeyboardInterrupt:
+                pass
+
+    def handle(self, argv: List[str], cwd: str, stdout: TextIO, stderr: TextIO):
+        """Runs a command forwarded by a client from its working directory, with
+        its output sent back to it.
+        """
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(contextlib.redirect_stdout(stdout))
+            stack.enter_context(contextlib.redirect_stderr(stderr))
+            stack.enter_context(working_directory(cwd))
+            parser = cli.setup_cli(argv)
+            user_input = fetcher.Input(**cli.parse_args(parser, argv))
+            if user_input.command in ("serve", "batch"):
+                parser.error(
+                    f"henry {user_input.command} can not be run by henry serve"
+                )
+            session_options = sorted(
+                {a.split("=")[0] for a in argv} & set(SESSION_OPTIONS)
+            )
+            if session_options:
+                parser.error(
+                    f"{', '.join(session_options)} can only be given to henry serve"
+                )
+            config_file = os.path.abspath(user_input.config_file)
+            if (config_file, user_input.section) != (self.config_file, self.section):
+                parser.error(
+                    f"henry serve is connected to section {self.section} of "
+                    f"{self.config_file}"
+                )
+            self.state.expire()
+            cli.run_command(parser, user_input, self.state)
+        return 0
+
+
+@contextlib.contextmanager
+def working_directory(path: str):
+    """Changes the working directory for the duration of the block."""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
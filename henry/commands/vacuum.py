@@ -1,4 +1,4 @@
-from typing import cast, Optional
+from typing import Any, cast, Dict, Iterator, Optional
 
 from henry.modules import fetcher
 from henry.modules import spinner
@@ -6,51 +6,75 @@ from henry.modules import spinner
 
 class Vacuum(fetcher.Fetcher):
     @classmethod
-    def run(cls, user_input: fetcher.Input):
-        vacuum = cls(user_input)
+    def run(cls, user_input: fetcher.Input, warm: Optional[fetcher.WarmState] = None):
+        vacuum = cls(user_input, warm)
+        rows = vacuum.iter_results(user_input)
+        if vacuum.stream:
+            vacuum.stream_output(rows)
+        else:
+            name = f"{cls.__name__}.{user_input.subcommand}"
+            with spinner.Spinner(name, vacuum.tracer):
+                result = list(rows)
+            vacuum.output(data=cast(fetcher.TResult, result))
+
+    def iter_results(self, user_input: fetcher.Input) -> Iterator[Dict[str, Any]]:
+        """Yields the results of the subcommand of user_input."""
         if user_input.subcommand == "models":
-            result = vacuum.models(project=user_input.project, model=user_input.model)
+            return self.iter_model_results(
+                project=user_input.project, model=user_input.model
+            )
         elif user_input.subcommand == "explores":
-            result = vacuum.explores(model=user_input.model, explore=user_input.explore)
-        vacuum.output(data=cast(fetcher.TResult, result))
+            return self.iter_explore_results(
+                model=user_input.model, explore=user_input.explore
+            )
+        else:
+            raise ValueError("Please specify one of 'models' or 'explores'")
 
     @spinner.Spinner()
     def models(self, *, project: Optional[str] = None, model: str) -> fetcher.TResult:
         """Analyze models."""
+        return list(self.iter_model_results(project=project, model=model))
+
+    def iter_model_results(
+        self, *, project: Optional[str] = None, model: str
+    ) -> Iterator[Dict[str, Any]]:
+        """Yields the results of models() one model at a time."""
         all_models = self.get_models(project=project, model=model)
         used_models = self.get_used_models()
-        result: fetcher.TResult = []
         for m in all_models:
             assert isinstance(m.name, str)
-            result.append(
-                {
-                    "Model": m.name,
-                    "Unused Explores": "\n".join(
-                        sorted(self.get_unused_explores(m.name))
-                    ),
-                    "Model Query Count": used_models.get(m.name, 0),
-                }
-            )
-        return result
+            yield {
+                "Model": m.name,
+                "Unused Explores": "\n".join(sorted(self.get_unused_explores(m.name))),
+                "Model Query Count": used_models.get(m.name, 0),
+            }
 
     @spinner.Spinner()
     def explores(
         self, *, model: Optional[str] = None, explore: Optional[str] = None
     ) -> fetcher.TResult:
         """Analyze explores"""
-        explores = self.get_explores(model=model, explore=explore)
-        result: fetcher.TResult = []
+        return list(self.iter_explore_results(model=model, explore=explore))
+
+    def iter_explore_results(
+        self, *, model: Optional[str] = None, explore: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yields the results of explores() one explore at a time."""
+        explores = self.iter_explores(model=model, explore=explore)
+        explore_usage: Dict[str, Dict[str, fetcher.ExploreUsage]] = {}
         for e in explores:
             assert isinstance(e.name, str)
             assert isinstance(e.model_name, str)
-            field_stats = self.get_explore_field_stats(e)
+            if e.model_name not in explore_usage:
+                explore_usage[e.model_name] = self.get_explore_usage(
+                    model=e.model_name, explore=explore or ""
+                )
+            usage = explore_usage[e.model_name].get(e.name, fetcher.ExploreUsage(0, {}))
+            field_stats = self.get_explore_field_stats(e, used_fields=usage.fields)
             join_stats = self.get_explore_join_stats(explore=e, field_stats=field_stats)
-            result.append(
-                {
-                    "Model": e.model_name,
-                    "Explore": e.name,
-                    "Unused Joins": "\n".join(sorted(self._filter(join_stats).keys())),
-                    "Unused Fields": "\n".join(sorted(self._filter(field_stats))),
-                }
-            )
-        return result
+            yield {
+                "Model": e.model_name,
+                "Explore": e.name,
+                "Unused Joins": "\n".join(sorted(self._filter(join_stats).keys())),
+                "Unused Fields": "\n".join(sorted(self._filter(field_stats))),
+            }
@@ -0,0 +1,71 @@
+import functools
+import re
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+FIELD_PATTERN = re.compile(r"\w+\.\w+")
+
+
+@functools.lru_cache(maxsize=65536)
+def parse_fields(
+    formatted_fields: str, filters: Optional[str]
+) -> Tuple[Tuple[str, int], ...]:
+    """Returns the fields a query counts towards, in order of appearance, along with
+    how many times each of them is counted.
+
+    A field used as a filter in a query is not listed in query.formatted_fields BUT
+    if the field is used as both a filter and a dimension/measure, it's listed in
+    both query.formatted_fields and query.filters. Filter fields that are also
+    selected are therefore skipped so that no double counting occurs.
+    """
+    counts: Dict[str, int] = {}
+    for f in FIELD_PATTERN.findall(formatted_fields):
+        counts[f] = counts.get(f, 0) + 1
+    if filters:
+        selected = set(counts)
+        for f in FIELD_PATTERN.findall(filters):
+            if f not in selected:
+                counts[f] = counts.get(f, 0) + 1
+    return tuple(counts.items())
+
+
+class FieldCounter:
+    """Sums query counts per field from history rows holding query.formatted_fields,
+    query.filters and history.query_run_count, one row at a time.
+
+    History rows repeat the same few queries heavily, so query counts are summed per
+    distinct formatted_fields/filters pair and every pair is only parsed and spread
+    over its fields once, when the counts are read.
+    """
+
+    def __init__(self):
+        self._totals: Dict[Tuple[str, Optional[str]], int] = {}
+
+    def add(self, row: Dict[str, Any]):
+        key = (row["query.formatted_fields"], row["query.filters"])
+        self._totals[key] = self._totals.get(key, 0) + row["history.query_run_count"]
+
+    def counts(self) -> Dict[str, int]:
+        used_fields: Dict[str, int] = {}
+        for (formatted_fields, filters), query_count in self._totals.items():
+            for field, times in parse_fields(formatted_fields, filters):
+                used_fields[field] = used_fields.get(field, 0) + times * query_count
+        return used_fields
+
+
+def count_used_fields(rows: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """Sums query counts per field from history rows holding query.formatted_fields,
+    query.filters and history.query_run_count.
+    """
+    counter = FieldCounter()
+    for row in rows:
+        counter.add(row)
+    return counter.counts()
+
+
+def sum_query_counts(rows: Iterable[Dict[str, Any]], key: str) -> Dict[str, int]:
+    """Sums history.query_run_count of history rows per value of key."""
+    totals: Dict[str, int] = {}
+    for row in rows:
+        value = str(row[key])
+        totals[value] = totals.get(value, 0) + int(row["history.query_run_count"])
+    return totals
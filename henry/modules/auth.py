@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import stat
+import sys
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from looker_sdk import error
+from looker_sdk.rtl import api_settings, auth_session, auth_token, serialize, transport
+
+from henry.modules import cache
+
+# Seconds a cached token must still be valid for to be reused
+MIN_TOKEN_LIFETIME = 60
+
+
+class TokenCache:
+    """On-disk cache of the API access token of one client of one instance, so that
+    consecutive runs do not each log in.
+
+    Tokens are only readable by the current user and are discarded once less than
+    MIN_TOKEN_LIFETIME seconds of their expires_in remain.
+    """
+
+    def __init__(self, host: str, client_id: str, directory: Optional[str] = None):
+        self.directory = directory or cache.cache_dir("tokens")
+        key = "\0".join([host, client_id]).encode("utf-8")
+        self.path = os.path.join(
+            self.directory, f"{hashlib.sha256(key).hexdigest()}.json"
+        )
+
+    def get(self) -> Optional[auth_token.AccessToken]:
+        """Returns the cached token, or None if it is missing, about to expire or
+        could have been read or written by another user.
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                st = os.fstat(f.fileno())
+                if st.st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+                    return None
+                if hasattr(os, "getuid") and st.st_uid != os.getuid():
+                    return None
+                data = json.load(f)
+            expires_in = int(data["expires_at"] - time.time())
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if expires_in < MIN_TOKEN_LIFETIME:
+            return None
+        return auth_token.AccessToken(
+            access_token=data["access_token"],
+            token_type=data["token_type"],
+            expires_in=expires_in,
+        )
+
+    def put(self, token: auth_token.AuthToken):
+        """Writes a token that was just issued to the cache."""
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        data = {
+            "access_token": token.access_token,
+            "token_type": token.token_type,
+            "expires_at": time.time() + token.expires_in,
+        }
+        # mkstemp creates files only the current user can read
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class LazyAuthSession(auth_session.AuthSession):
+    """AuthSession that logs in when the first API call is sent, once for all
+    threads, rather than being verified upfront. A token from token_cache is used
+    instead of logging in when there is one.
+
+    Looker ties the workspace of an API session to its token, so a cached token is
+    switched to the production workspace before it is used, and commands switching
+    to the dev workspace log in for a token of their own with use_private_token().
+    """
+
+    def __init__(
+        self,
+        settings: api_settings.PApiSettings,
+        transport: transport.Transport,
+        deserialize: serialize.TDeserialize,
+        api_version: str,
+        token_cache: Optional[TokenCache] = None,
+    ):
+        super().__init__(settings, transport, deserialize, api_version)
+        self.token_cache = token_cache
+        # Reentrant so that a cached token can be switched to production, and
+        # replaced if Looker rejects it, while logging in
+        self._lock = threading.RLock()
+        self._token_from_cache = False
+        self._private = False
+
+    def _get_token(
+        self, transport_options: transport.TransportOptions
+    ) -> auth_token.AuthToken:
+        with self._lock:
+            return super()._get_token(transport_options)
+
+    def _login(self, transport_options: transport.TransportOptions) -> None:
+        token_cache = None if self._private else self.token_cache
+        cached = token_cache.get() if token_cache else None
+        if cached:
+            self.token = auth_token.AuthToken(cached)
+            self._token_from_cache = True
+            # Another run may have left the session of the token in dev mode
+            self._ok(
+                self.transport.request(
+                    transport.HttpMethod.PATCH,
+                    f"{self.settings.base_url}/api/{self.api_version}/session",
+                    body=b'{"workspace_id": "production"}',
+                    authenticator=self.authenticate,
+                    transport_options=transport_options,
+                )
+            )
+            return
+        try:
+            super()._login(transport_options)
+        except error.SDKError:
+            print(
+                "Error logging in to the API. Please check your credentials.",
+                file=sys.stderr,
+            )
+            raise
+        self._token_from_cache = False
+        if token_cache:
+            token_cache.put(self.token)
+
+    def use_private_token(self):
+        """Logs in for a token that is neither read from nor written to the token
+        cache, so that switching its workspace does not affect other runs.
+        """
+        with self._lock:
+            if self.token_cache and not self._private:
+                self._private = True
+                self.token = auth_token.AuthToken()
+                self._token_from_cache = False
+
+    def reject_token(self, authorization: str) -> bool:
+        """Forgets the current token after Looker rejected a call authorized with
+        it. Returns True if the call can be sent again with a new token, i.e. if it
+        was a cached token or the token was renewed since.
+        """
+        with self._lock:
+            if authorization != f"Bearer {self.token.access_token}":
+                return True
+            if not self._token_from_cache:
+                return False
+            assert self.token_cache
+            self.token_cache.clear()
+            self.token = auth_token.AuthToken()
+            self._token_from_cache = False
+            return True
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import NamedTuple, Optional
+
+from looker_sdk.rtl import serialize
+from looker_sdk.sdk.api40 import models
+
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+
+
+def cache_dir(name: str) -> str:
+    """Returns the directory henry caches `name` data in."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "henry", name)
+
+
+class CachedExplore(NamedTuple):
+    project: str
+    commit: str
+    explore: models.LookmlModelExplore
+
+
+class ExploreCache:
+    """On-disk cache of LookML explore metadata.
+
+    Entries are keyed by instance host, model, explore and the `fields` projection
+    they were requested with, and record the project's deployed git commit at the
+    time they were written, so callers can discard them once new LookML is
+    deployed. Entries expire after `ttl` seconds and the oldest entries are evicted
+    whenever the cache grows beyond `max_size` bytes.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        *,
+        directory: Optional[str] = None,
+        ttl: int = DEFAULT_TTL,
+        max_size: int = DEFAULT_MAX_SIZE,
+        fields: str = "",
+    ):
+        self.host = host
+        self.fields = fields
+        self.directory = directory or cache_dir("explores")
+        self.ttl = ttl
+        self.max_size = max_size
+        # Pruned before any explore is fetched, rather than while --jobs threads
+        # write entries
+        self.prune()
+
+    def _path(self, model: str, explore: str) -> str:
+        key = "\0".join([self.host, model, explore, self.fields]).encode("utf-8")
+        return os.path.join(self.directory, f"{hashlib.sha256(key).hexdigest()}.json")
+
+    def get(self, model: str, explore: str) -> Optional[CachedExplore]:
+        """Returns a cached explore, or None if it is missing or expired."""
+        path = self._path(model, explore)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                data = f.read()
+        except (OSError, ValueError):
+            return None
+        if (header.get("model"), header.get("explore")) != (model, explore):
+            return None
+        explore_model = serialize.deserialize40(
+            data=data, structure=models.LookmlModelExplore
+        )
+        assert isinstance(explore_model, models.LookmlModelExplore)
+        return CachedExplore(header["project"], header["commit"], explore_model)
+
+    def put(
+        self,
+        model: str,
+        explore: str,
+        *,
+        project: str,
+        commit: str,
+        data: models.LookmlModelExplore,
+    ):
+        """Writes an explore to the cache."""
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        header = {
+            "model": model,
+            "explore": explore,
+            "project": project,
+            "commit": commit,
+        }
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            f.write(serialize.serialize40(api_model=data))
+        os.replace(tmp, self._path(model, explore))
+
+    def prune(self):
+        """Removes expired entries and evicts the oldest ones until the cache fits
+        in max_size bytes. Entries other runs are still writing are left alone.
+        """
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        now = time.time()
+        entries = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+                if now - stat.st_mtime > self.ttl:
+                    os.remove(path)
+                elif not name.endswith(".tmp"):
+                    entries.append((stat.st_mtime, stat.st_size, path))
+            except OSError:
+                continue
+        size = sum(e[1] for e in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= entry_size
@@ -1,36 +1,85 @@
-import csv
+import contextlib
 import datetime
+import itertools
 import json
-import re
+import os
+import sys
+import time
 import uuid
+from concurrent import futures
 from operator import itemgetter
 from typing import (
+    Any,
     Callable,
     Dict,
+    Iterable,
+    Iterator,
+    List,
     MutableSequence,
     NamedTuple,
     Optional,
     Sequence,
     Tuple,
+    TypeVar,
     Union,
     cast,
 )
 
+import attr
 import tabulate
 from looker_sdk import error
-from looker_sdk.rtl import api_settings, auth_session, requests_transport, serialize
+from looker_sdk.rtl import api_settings, serialize
+from looker_sdk.rtl import transport as rtl_transport
 from looker_sdk.sdk.api40 import methods, models
 
-from henry.modules import exceptions
+from henry.modules import (
+    aggregation,
+    auth,
+    cache,
+    exceptions,
+    paging,
+    profiler,
+    ratelimit,
+    results,
+    sinks,
+    summaries,
+    tracing,
+    transport,
+    usage_store,
+)
 
 from .. import __version__ as pkg
 
+# Converters for numeric System Activity fields in csv results
+HISTORY_TYPES: Dict[str, Callable[[str], Any]] = {
+    "history.query_run_count": int,
+    "history.average_runtime": float,
+    "query.count": int,
+}
+
+# Filters every usage query shares, so that usage read from the usage store and
+# from System Activity count the same queries: production queries that ran
+USAGE_FILTERS = {
+    "history.query_run_count": ">0",
+    "history.workspace_id": "production",
+    "user.dev_branch_name": "NULL",
+}
+
+# Attributes of lookml models henry requests, the explores of a model by name only
+MODEL_FIELDS = "name,project_name,has_content,explores(name)"
+
 TResult = MutableSequence[Dict[str, Union[str, int, bool]]]
+T = TypeVar("T")
+R = TypeVar("R")
 
 
 class Fetcher:
-    def __init__(self, options: "Input"):
-        self.timeframe = f"{options.timeframe} days" if options.timeframe else "90 days"
+    # Threads per --jobs that can send API requests at the same time
+    THREADS_PER_JOB = 1
+
+    def __init__(self, options: "Input", warm: Optional["WarmState"] = None):
+        self.timeframe_days = options.timeframe or 90
+        self.timeframe = f"{self.timeframe_days} days"
         self.min_queries = options.min_queries or 0
         self.limit = options.limit[0] if options.limit else None
         self.sortkey = options.sortkey
@@ -39,10 +88,48 @@ class Fetcher:
         self.cmd = f"{cmd}_{sub_cmd}" if sub_cmd else cmd
         self.save = options.save
         self.quiet = options.quiet
-        self.sdk = self.configure_sdk(
-            options.config_file, options.section, options.timeout
+        self.jsonl = options.jsonl
+        self.stream = options.stream or options.jsonl
+        self.jobs = max(options.jobs or 1, 1)
+        self.max_retries = options.max_retries
+        self.max_rps = options.max_rps
+        self.max_in_flight = options.max_in_flight
+        self.chunk_size = options.chunk_size
+        self.max_history_rows = options.max_history_rows
+        self.result_format = options.result_format
+        self._usage_cache: Dict[bytes, Any] = {}
+        self.profiler = profiler.Profiler() if options.profile else None
+        self.tracer = tracing.Tracer() if options.trace else None
+        self._output_date: Optional[str] = None
+        self.output_dir = options.output_dir
+        self.token_cache = options.token_cache
+        self.warm = warm
+        if warm:
+            self._usage_cache = warm.usage_cache
+            self.sdk = self._instrument_sdk(warm.sdk)
+        else:
+            self.sdk = self.configure_sdk(
+                options.config_file, options.section, options.timeout
+            )
+        self.explore_cache = (
+            None
+            if options.no_cache
+            else cache.ExploreCache(
+                self.sdk.auth.settings.base_url, fields=summaries.EXPLORE_FIELDS
+            )
         )
-        self._verify_api_credentials()
+        self.refresh_cache = options.refresh_cache
+        self._deployed_commits: Dict[str, str] = warm.deployed_commits if warm else {}
+        self._dev_mode = False
+        self.usage_store = (
+            usage_store.UsageStore(
+                self.sdk.auth.settings.base_url,
+                retention=max(options.usage_retention, self.timeframe_days),
+            )
+            if options.usage_store
+            else None
+        )
+        self._usage_store_synced = False
 
     def configure_sdk(
         self,
@@ -51,7 +138,7 @@ class Fetcher:
         timeout: Optional[int],
     ) -> methods.Looker40SDK:
         """Instantiates and returns a LookerSDK object and overrides default timeout if
-        specified by user.
+        specified by user. Credentials are verified by the first API call.
         """
         settings = api_settings.ApiSettings(filename=config_file, section=section)
         user_agent_tag = f"Henry v{pkg.__version__}: cmd={self.cmd}, sid={uuid.uuid1()}"
@@ -61,34 +148,196 @@ class Fetcher:
         }
         if timeout:
             settings.timeout = timeout
-        transport = requests_transport.RequestsTransport.configure(settings)
+        threads = self.jobs * self.THREADS_PER_JOB
+        api = transport.ApiTransport.configure(
+            settings,
+            pool_size=threads,
+            max_retries=self.max_retries,
+            limiter=ratelimit.AdaptiveLimiter(
+                max_in_flight=min(self.max_in_flight or threads, threads),
+                max_rate=self.max_rps,
+            ),
+        )
+        api_transport = self._instrument(api)
+        token_cache = None
+        if self.token_cache:
+            token_cache = auth.TokenCache(
+                settings.base_url, settings.read_config().get("client_id") or ""
+            )
         # 4.0 is hardcoded here due to needing the -40 suffixed methods
+        session = auth.LazyAuthSession(
+            settings,
+            api_transport,
+            serialize.deserialize40,
+            "4.0",
+            token_cache=token_cache,
+        )
+        api.on_unauthorized = session.reject_token
         return methods.Looker40SDK(
-            auth_session.AuthSession(
-                settings, transport, serialize.deserialize40, "4.0"
-            ),
+            session,
             serialize.deserialize40,
             serialize.serialize40,
-            transport,
+            api_transport,
             "4.0",
         )
 
-    def _verify_api_credentials(self):
-        try:
-            self.sdk.me()
-        except error.SDKError as e:
-            print("Error retreiving self using API. Please check your credentials.")
-            raise (e)
+    def _instrument(self, api: rtl_transport.Transport) -> rtl_transport.Transport:
+        """Wraps the transport API calls are sent with to profile and trace them
+        when asked to.
+        """
+        if self.profiler:
+            api = profiler.ProfilingTransport(api, self.profiler)
+        if self.tracer:
+            api = tracing.TracingTransport(api, self.tracer)
+        return api
+
+    def _instrument_sdk(self, sdk: methods.Looker40SDK) -> methods.Looker40SDK:
+        """Returns an SDK sending API calls through the session and connections of
+        sdk, profiled and traced for this run.
+        """
+        if not self.profiler and not self.tracer:
+            return sdk
+        return methods.Looker40SDK(
+            sdk.auth,
+            serialize.deserialize40,
+            serialize.serialize40,
+            self._instrument(sdk.transport),
+            "4.0",
+        )
+
+    def _run_usage_query(
+        self,
+        query: models.WriteQuery,
+        aggregate: Callable[[Iterator[Dict[str, Any]]], T],
+    ) -> T:
+        """Runs a system__activity query over self.timeframe and returns the result of
+        aggregate over its rows.
+
+        History is paged in day windows of at most self.chunk_size rows and rows are
+        handed to aggregate as they are decoded, so only one window is held in memory
+        at a time. Grouped rows can repeat across windows and their counts must be
+        summed by aggregate. Results are memoized on the full serialized query so
+        identical usage lookups only hit the API once per run.
+        """
+        key = serialize.serialize40(api_model=query)
+        if key not in self._usage_cache:
+            window = paging.Window(self.timeframe_days - 1, self.timeframe_days)
+            with self._stage("aggregation", view=query.view, fields=query.fields):
+                self._usage_cache[key] = aggregate(
+                    row
+                    for chunk in self._iter_history(query, window)
+                    for row in chunk.rows
+                )
+        return self._usage_cache[key]
+
+    def run_inline_query(
+        self, query: models.WriteQuery, result_format: str = "json"
+    ) -> List[Dict[str, Any]]:
+        """Runs a query and returns its rows, decoded while the response is read."""
+        with self._stage("usage queries", view=query.view, filters=query.filters):
+            return list(
+                results.stream_inline_query(
+                    self.sdk, query, result_format, HISTORY_TYPES
+                )
+            )
+
+    def _iter_history(
+        self, query: models.WriteQuery, window: paging.Window
+    ) -> Iterator[paging.Chunk]:
+        """Pages through the history of a system__activity query over a window."""
+
+        def run(created_date: str, limit: int) -> Sequence[Dict[str, Any]]:
+            assert query.filters is not None
+            windowed_query = attr.evolve(
+                query,
+                filters={**query.filters, "history.created_date": created_date},
+                limit=str(limit),
+            )
+            if self.result_format == "csv":
+                try:
+                    return self.run_inline_query(windowed_query, "csv")
+                except ValueError as e:
+                    print(
+                        f"Warning: unable to read csv results ({e}), using json.",
+                        file=sys.stderr,
+                    )
+                    self.result_format = "json"
+            return self.run_inline_query(windowed_query)
+
+        return paging.paginate(
+            run,
+            window,
+            chunk_size=self.chunk_size,
+            max_rows=self.max_history_rows,
+        )
+
+    def _synced_usage_store(self) -> Optional[usage_store.UsageStore]:
+        """Returns the usage store, if enabled, after fetching the days of history
+        it is missing for self.timeframe.
+        """
+        if self.usage_store is None or self._usage_store_synced:
+            return self.usage_store
+        query = models.WriteQuery(
+            model="system__activity",
+            view="history",
+            fields=[
+                "history.created_date",
+                "query.model",
+                "query.view",
+                "query.formatted_fields",
+                "query.filters",
+                "history.query_run_count",
+            ],
+            filters={
+                "history.created_date": self.timeframe,
+                "query.model": "-system^_^_activity, -i^_^_looker",
+                **USAGE_FILTERS,
+            },
+        )
+        for window in self.usage_store.missing_windows(self.timeframe_days):
+            for chunk in self._iter_history(query, window):
+                with self._stage("aggregation"):
+                    self.usage_store.write(
+                        chunk.window,
+                        self._usage_records(chunk.rows),
+                        complete=chunk.complete,
+                    )
+        self.usage_store.compact()
+        self._usage_store_synced = True
+        return self.usage_store
+
+    def _usage_records(
+        self, rows: Sequence[Dict[str, Any]]
+    ) -> Iterator[usage_store.UsageRecord]:
+        """Aggregates history rows into daily explore and field usage records."""
+        rows_by_explore: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = {}
+        for row in rows:
+            key = (row["history.created_date"], row["query.model"], row["query.view"])
+            rows_by_explore.setdefault(key, []).append(row)
+        for (day, model, explore), explore_rows in rows_by_explore.items():
+            yield usage_store.UsageRecord(
+                day,
+                model,
+                explore,
+                usage_store.EXPLORE,
+                sum(r["history.query_run_count"] for r in explore_rows),
+            )
+            fields = aggregation.count_used_fields(
+                [r for r in explore_rows if r["query.formatted_fields"]]
+            )
+            for field, count in fields.items():
+                yield usage_store.UsageRecord(day, model, explore, field, count)
 
     def get_projects(
         self, project_id: Optional[str] = None
     ) -> Sequence[models.Project]:
         """Returns a list of projects."""
         try:
-            if project_id:
-                projects: Sequence[models.Project] = [self.sdk.project(project_id)]
-            else:
-                projects = self.sdk.all_projects()
+            with self._stage("metadata fetch"):
+                if project_id:
+                    projects: Sequence[models.Project] = [self.sdk.project(project_id)]
+                else:
+                    projects = self.sdk.all_projects()
         except error.SDKError:
             raise exceptions.NotFoundError("An error occured while getting projects.")
         return projects
@@ -101,10 +350,8 @@ class Fetcher:
         if project:
             self.get_projects(project)
         try:
-            if model:
-                ml: Sequence[models.LookmlModel] = [self.sdk.lookml_model(model)]
-            else:
-                ml = self.sdk.all_lookml_models()
+            with self._stage("metadata fetch"):
+                ml = self._fetch_models(model)
         except error.SDKError:
             raise exceptions.NotFoundError("An error occured while getting models.")
         else:
@@ -119,10 +366,28 @@ class Fetcher:
             ml = list(filter(lambda m: cast(bool, m.has_content), ml))
         return ml
 
+    def _fetch_models(self, model: Optional[str]) -> Sequence[models.LookmlModel]:
+        """Returns a model, or all models, from the API unless they were fetched by
+        a previous command sharing warm state.
+        """
+        if self.warm and model in self.warm.lookml_models:
+            return self.warm.lookml_models[model]
+        if model:
+            ml: Sequence[models.LookmlModel] = [
+                self.sdk.lookml_model(model, fields=MODEL_FIELDS)
+            ]
+        else:
+            ml = self.sdk.all_lookml_models(fields=MODEL_FIELDS)
+        if self.warm:
+            self.warm.lookml_models[model] = ml
+        return ml
+
     def get_used_models(self) -> Dict[str, int]:
         """Returns a dictionary with model names as keys and query count as values."""
-        resp = self.sdk.run_inline_query(
-            "json",
+        store = self._synced_usage_store()
+        if store:
+            return store.used_models(self.timeframe_days)
+        return self._run_usage_query(
             models.WriteQuery(
                 model="system__activity",
                 view="history",
@@ -130,66 +395,162 @@ class Fetcher:
                 filters={
                     "history.created_date": self.timeframe,
                     "query.model": "-system^_^_activity, -i^_^_looker",
-                    "history.query_run_count": ">0",
-                    "user.dev_branch_name": "NULL",
+                    **USAGE_FILTERS,
                 },
-                limit="5000",
             ),
+            lambda rows: aggregation.sum_query_counts(rows, "query.model"),
         )
-        _results: MutableSequence[Dict[str, int]] = json.loads(resp)
-        results = {
-            str(row["query.model"]): int(row["history.query_run_count"])
-            for row in _results
-        }
-        return results
 
     def get_explores(
         self, *, model: Optional[str] = None, explore: Optional[str] = None
-    ) -> Sequence[models.LookmlModelExplore]:
+    ) -> Sequence[summaries.ExploreSummary]:
         """Returns a list of explores."""
+        return list(self.iter_explores(model=model, explore=explore))
+
+    def iter_explores(
+        self, *, model: Optional[str] = None, explore: Optional[str] = None
+    ) -> Iterator[summaries.ExploreSummary]:
+        """Yields explores as soon as their metadata is fetched, in the same order
+        as get_explores(). Only the summary of every explore is kept, so that the
+        metadata of its fields is released right away.
+        """
         try:
             if model and explore:
-                explores = [self.sdk.lookml_model_explore(model, explore)]
+                yield self._get_lookml_model_explore(model, explore)
             elif not explore:
                 all_models = self.get_models(model=model)
-                explores = []
+                model_explores: List[Tuple[str, str]] = []
                 for m in all_models:
                     assert isinstance(m.name, str)
                     assert isinstance(m.explores, list)
-                    explores.extend(
-                        list(
-                            filter(None,
-                                    [
-                                      self.lookml_model_explore(m.name, cast(str, e.name))
-                                      for e in m.explores
-                                    ]
-                            )
-                        )
+                    model_explores.extend(
+                        (m.name, cast(str, e.name)) for e in m.explores
                     )
+                yield from filter(
+                    None,
+                    self._concurrent_imap(
+                        lambda me: self.lookml_model_explore(*me), model_explores
+                    ),
+                )
         except error.SDKError:
             raise exceptions.NotFoundError(
                 f"An error occured while getting model:{model}/explore:{explore}."
             )
-        return explores
 
     def lookml_model_explore(self, model: str, explore: str):
         try:
-            return self.sdk.lookml_model_explore(model, explore)
+            return self._get_lookml_model_explore(model, explore)
         except error.SDKError as e:
-            if e.message == 'Not found':
-                print(f"No Data Found while getting model {model}/explore {explore}.")
+            if e.message == "Not found":
+                print(
+                    f"No Data Found while getting model {model}/explore {explore}.",
+                    file=sys.stderr,
+                )
             else:
                 raise
         return []
 
+    def _get_lookml_model_explore(
+        self, model: str, explore: str
+    ) -> summaries.ExploreSummary:
+        """Returns the summary of an explore's metadata from the explore cache if it
+        was cached since its project's last deploy, from the API otherwise. Explores
+        of projects whose deployed commit is unknown are not cached.
+        """
+        with self._stage("metadata fetch"):
+            if not self.refresh_cache:
+                warm = self.warm.explores.get((model, explore)) if self.warm else None
+                if warm and warm[0] == self._deployed_commit(warm[1].project_name):
+                    return warm[1]
+                cached = (
+                    self.explore_cache.get(model, explore)
+                    if self.explore_cache
+                    else None
+                )
+                if (
+                    cached
+                    and cached.commit
+                    and cached.commit == self._deployed_commit(cached.project)
+                ):
+                    summary = summaries.summarize_explore(cached.explore)
+                    if self.warm:
+                        self.warm.explores[(model, explore)] = (cached.commit, summary)
+                    return summary
+            result = self.sdk.lookml_model_explore(
+                model, explore, fields=summaries.EXPLORE_FIELDS
+            )
+            project = cast(str, result.project_name or "")
+            commit = self._deployed_commit(project)
+            summary = summaries.summarize_explore(result)
+            if commit and self.explore_cache:
+                self.explore_cache.put(
+                    model, explore, project=project, commit=commit, data=result
+                )
+            if commit and self.warm:
+                self.warm.explores[(model, explore)] = (commit, summary)
+            return summary
+
+    def _deployed_commit(self, project: str) -> str:
+        """Returns the git commit deployed to production for a project, or an empty
+        string if it cannot be determined.
+        """
+        if project not in self._deployed_commits:
+            try:
+                workspace = self.sdk.project_workspace(project) if project else None
+            except error.SDKError:
+                workspace = None
+            commit = workspace.git_head if workspace else None
+            self._deployed_commits[project] = commit or ""
+        return self._deployed_commits[project]
+
+    def _concurrent_map(self, func: Callable[[T], R], items: Iterable[T]) -> List[R]:
+        """Applies func to every item using up to self.jobs threads. Results are
+        returned in the order of items and exceptions are raised to the caller.
+        """
+        return list(self._concurrent_imap(func, items))
+
+    def _concurrent_imap(
+        self, func: Callable[[T], R], items: Iterable[T]
+    ) -> Iterator[R]:
+        """Like _concurrent_map() but yields every result as soon as it and all
+        results before it are available. Pending calls are cancelled if the caller
+        stops iterating early.
+        """
+        if self.jobs <= 1:
+            yield from map(func, items)
+            return
+        executor = futures.ThreadPoolExecutor(max_workers=self.jobs)
+        pending = [executor.submit(func, i) for i in items]
+        try:
+            for future in pending:
+                yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown()
+
+    @contextlib.contextmanager
+    def _stage(self, name: str, **args: Any) -> Iterator[None]:
+        """Attributes the time spent in the block to a stage of the run when
+        profiling, and traces it as a span described by args.
+        """
+        with tracing.span(self.tracer, name, "stage", **args):
+            if self.profiler:
+                with self.profiler.stage(name):
+                    yield
+            else:
+                yield
+
     def get_used_explores(
         self, *, model: Optional[str] = None, explore: str = ""
     ) -> Dict[str, int]:
         """Returns a dictionary with used explore names as keys and query count as
         values.
         """
-        resp = self.sdk.run_inline_query(
-            "json",
+        store = self._synced_usage_store()
+        if store:
+            return store.used_explores(self.timeframe_days, model or "", explore)
+        return self._run_usage_query(
             models.WriteQuery(
                 model="system__activity",
                 view="history",
@@ -197,18 +558,12 @@ class Fetcher:
                 filters={
                     "history.created_date": self.timeframe,
                     "query.model": model.replace("_", "^_") if model else "",
-                    "history.query_run_count": ">0",
                     "query.view": explore,
-                    "user.dev_branch_name": "NULL",
+                    **USAGE_FILTERS,
                 },
-                limit="5000",
             ),
+            lambda rows: aggregation.sum_query_counts(rows, "query.view"),
         )
-        _results: MutableSequence[Dict[str, int]] = json.loads(resp)
-        results = {
-            cast(str, r["query.view"]): r["history.query_run_count"] for r in _results
-        }
-        return results
 
     def get_unused_explores(self, model: str):
         """Returns a list of explores that do not meet the min query count requirement
@@ -221,11 +576,11 @@ class Fetcher:
         unused_explores = [e.name for e in _all if e.name not in used.keys()]
         return unused_explores
 
-    def get_explore_fields(self, explore: models.LookmlModelExplore) -> Sequence[str]:
+    def get_explore_fields(self, explore: summaries.ExploreSummary) -> Sequence[str]:
         """Return a list of non hidden fields for a given explore"""
         fields = explore.fields
-        dimensions = [cast(str, f.name) for f in fields.dimensions if not f.hidden]  # type: ignore  # noqa: B950
-        measures = [cast(str, f.name) for f in fields.measures if not f.hidden]  # type: ignore  # noqa B950
+        dimensions = [f.name for f in fields.dimensions if not f.hidden]
+        measures = [f.name for f in fields.measures if not f.hidden]
         result = sorted(list(set([*dimensions, *measures])))
         return result
 
@@ -236,8 +591,15 @@ class Fetcher:
         number of times they were used in the specified timeframe as value.
         Should always be called with either model, or model and explore
         """
-        resp = self.sdk.run_inline_query(
-            "json",
+        store = self._synced_usage_store()
+        if store:
+            used_fields: Dict[str, int] = {}
+            explore_fields = store.used_fields(self.timeframe_days, model, explore)
+            for fields in explore_fields.values():
+                for field, count in fields.items():
+                    used_fields[field] = used_fields.get(field, 0) + count
+            return used_fields
+        return self._run_usage_query(
             models.WriteQuery(
                 model="system__activity",
                 view="history",
@@ -253,104 +615,157 @@ class Fetcher:
                     "query.model": model.replace("_", "^_"),
                     "query.view": explore.replace("_", "^_") if explore else "",
                     "query.formatted_fields": "-NULL",
-                    "history.workspace_id": "production",
+                    **USAGE_FILTERS,
                 },
-                limit="5000",
             ),
+            aggregation.count_used_fields,
         )
-        data = json.loads(resp)
-        used_fields: Dict[str, int] = {}
-        for row in data:
-            model = row["query.model"]
-            explore = row["query.view"]
-            fields = re.findall(r"(\w+\.\w+)", row["query.formatted_fields"])
-            recorded = []
-            for f in fields:
-                if used_fields.get(f):
-                    used_fields[f] += row["history.query_run_count"]
-                else:
-                    used_fields[f] = row["history.query_run_count"]
-                recorded.append(f)
-
-            # A field used as a filter in a query is not listed in
-            # query.formatted_fields BUT if the field is used as both a filter
-            # and a dimension/measure, it's listed in both query.formatted_fields
-            # and query.filters. The recorded variable keeps track of
-            # this, so that no double counting occurs.
-            filters = row["query.filters"]
-            if filters:
-                parsed_filters = re.findall(r"(\w+\.\w+)+", filters)
-                for f in parsed_filters:
-                    if f in recorded:
-                        continue
-                    elif used_fields.get(f):
-                        used_fields[f] += row["history.query_run_count"]
-                    else:
-                        used_fields[f] = row["history.query_run_count"]
-        return used_fields
+
+    def get_explore_usage(
+        self, *, model: str, explore: str = ""
+    ) -> Dict[str, "ExploreUsage"]:
+        """Returns a dictionary with explore names as keys and their query count and
+        field usage as values. Usage for every explore of the model is pulled with a
+        single grouped history query and split per explore locally.
+        """
+        store = self._synced_usage_store()
+        if store:
+            used_fields = store.used_fields(self.timeframe_days, model, explore)
+            return {
+                name: ExploreUsage(query_count, used_fields.get(name, {}))
+                for name, query_count in store.used_explores(
+                    self.timeframe_days, model, explore
+                ).items()
+            }
+        return self._run_usage_query(
+            models.WriteQuery(
+                model="system__activity",
+                view="history",
+                fields=[
+                    "query.view",
+                    "query.formatted_fields",
+                    "query.filters",
+                    "history.query_run_count",
+                ],
+                filters={
+                    "history.created_date": self.timeframe,
+                    "query.model": model.replace("_", "^_"),
+                    "query.view": explore.replace("_", "^_") if explore else "",
+                    **USAGE_FILTERS,
+                },
+            ),
+            self._aggregate_explore_usage,
+        )
+
+    def _aggregate_explore_usage(
+        self, rows: Iterable[Dict[str, Any]]
+    ) -> Dict[str, "ExploreUsage"]:
+        """Sums query counts and field usage per explore from history rows."""
+        query_counts: Dict[str, int] = {}
+        fields: Dict[str, aggregation.FieldCounter] = {}
+        for row in rows:
+            name = row["query.view"]
+            query_counts[name] = (
+                query_counts.get(name, 0) + row["history.query_run_count"]
+            )
+            if row["query.formatted_fields"]:
+                fields.setdefault(name, aggregation.FieldCounter()).add(row)
+        return {
+            name: ExploreUsage(
+                query_count, fields[name].counts() if name in fields else {}
+            )
+            for name, query_count in query_counts.items()
+        }
 
     def get_explore_field_stats(
-        self, explore: models.LookmlModelExplore
+        self,
+        explore: summaries.ExploreSummary,
+        used_fields: Optional[Dict[str, int]] = None,
     ) -> Dict[str, int]:
         """Return a dictionary with all exposed field names as keys and field query
-        count as values.
+        count as values. Field usage already pulled through get_explore_usage can be
+        passed as used_fields to avoid querying history again.
         """
         assert isinstance(explore.model_name, str)
         assert isinstance(explore.name, str)
         all_fields = self.get_explore_fields(explore=explore)
-        field_stats = self.get_used_explore_fields(
-            model=explore.model_name, explore=explore.name
-        )
+        if used_fields is None:
+            field_stats = dict(
+                self.get_used_explore_fields(
+                    model=explore.model_name, explore=explore.name
+                )
+            )
+        else:
+            field_stats = dict(used_fields)
 
-        for field in all_fields:
-            if not field_stats.get(field):
-                field_stats[field] = 0
+        with self._stage("aggregation"):
+            for field in all_fields:
+                if not field_stats.get(field):
+                    field_stats[field] = 0
 
         return field_stats
 
     def get_explore_join_stats(
-        self, *, explore: models.LookmlModelExplore, field_stats: Dict[str, int]
+        self, *, explore: summaries.ExploreSummary, field_stats: Dict[str, int]
     ) -> Dict[str, int]:
         """Returns dict containing stats about all joins in an explore."""
-        assert isinstance(explore.scopes, MutableSequence)
-        all_joins = explore.scopes
-        all_joins.remove(explore.name)
+        all_joins = [s for s in explore.scopes if s != explore.name]
         join_stats: Dict[str, int] = {}
-        if all_joins:
-            for field, query_count in field_stats.items():
-                join = field.split(".")[0]  # Because all fields are view (join) scoped
-                if join == explore.name:
-                    continue
-                elif join_stats.get(join):
-                    join_stats[join] += query_count
-                else:
-                    join_stats[join] = query_count
+        with self._stage("aggregation"):
+            if all_joins:
+                for field, query_count in field_stats.items():
+                    join = field.split(".")[0]  # All fields are view (join) scoped
+                    if join == explore.name:
+                        continue
+                    elif join_stats.get(join):
+                        join_stats[join] += query_count
+                    else:
+                        join_stats[join] = query_count
 
-            for join in all_joins:
-                if not join_stats.get(join):
-                    join_stats[join] = 0
+                for join in all_joins:
+                    if not join_stats.get(join):
+                        join_stats[join] = 0
         return join_stats
 
-    def run_git_connection_tests(self, project_id: str):
-        """Run all git connection tests for a given project."""
+    @contextlib.contextmanager
+    def dev_mode(self) -> Iterator[None]:
+        """Switches the API session to the dev workspace for the duration of the
+        block. Nested blocks reuse the outer session instead of switching again.
+        """
+        if self._dev_mode:
+            yield
+            return
+        if isinstance(self.sdk.auth, auth.LazyAuthSession):
+            self.sdk.auth.use_private_token()
         self.sdk.update_session(models.WriteApiSession(workspace_id="dev"))
-
+        self._dev_mode = True
         try:
-            supported_tests = self.sdk.all_git_connection_tests(project_id, transport_options={"headers": {"Accept": "application/json"}})
-        except error.SDKError as e:
-            if e.message == "The resource you're looking for could not be found":
-                return "Project not found in development mode"
-            else:
-                return "Error running git connection tests"
-
-        results = []
-        for test in supported_tests:
-            assert isinstance(test.id, str)
-            resp = self.sdk.run_git_connection_test(project_id, test.id)
-            results.append(resp)
-            if resp.status != "pass":
-                break
-        self.sdk.update_session(models.WriteApiSession(workspace_id="production"))
+            yield
+        finally:
+            self._dev_mode = False
+            self.sdk.update_session(models.WriteApiSession(workspace_id="production"))
+
+    def run_git_connection_tests(self, project_id: str):
+        """Run all git connection tests for a given project."""
+        with self.dev_mode():
+            try:
+                supported_tests = self.sdk.all_git_connection_tests(
+                    project_id,
+                    transport_options={"headers": {"Accept": "application/json"}},
+                )
+            except error.SDKError as e:
+                if e.message == "The resource you're looking for could not be found":
+                    return "Project not found in development mode"
+                else:
+                    return "Error running git connection tests"
+
+            results = []
+            for test in supported_tests:
+                assert isinstance(test.id, str)
+                resp = self.sdk.run_git_connection_test(project_id, test.id)
+                results.append(resp)
+                if resp.status != "pass":
+                    break
         errors = list(filter(lambda r: r.status != "pass", results))
         formatted_results = [f"{r.id} ({r.status})" for r in results]
         return "\n".join(formatted_results) if errors else "OK"
@@ -395,21 +810,17 @@ class Fetcher:
             data = sorted(data, key=itemgetter(sort_key), reverse=sort_type)
         return data
 
-    def _save_to_file(self, data: Sequence[Dict[str, Union[int, str]]]):
+    def _save_to_file(self, data: Iterable[Dict[str, Union[int, str]]]):
         """Save results to a file with name {command}_date_time.csv"""
-        date = datetime.datetime.now().strftime("%y%m%d_%H%M%S")
-        filename = f"{self.cmd}_{date}.csv"
-        with open(filename, "w", newline="") as csvfile:
-            # Replace "\n" which is required when printing, with ','
-            data = list(
-                map(
-                    lambda x: {k: str(v).replace("\n", ",") for k, v in x.items()},
-                    data,
-                )
-            )
-            writer = csv.DictWriter(csvfile, fieldnames=data[0].keys())
-            writer.writeheader()
-            writer.writerows(data)
+        with sinks.CsvSink(self._output_filename()) as sink:
+            for row in data:
+                sink.write(row)
+
+    def _output_filename(self, suffix: str = ".csv") -> str:
+        if self._output_date is None:
+            self._output_date = datetime.datetime.now().strftime("%y%m%d_%H%M%S")
+        filename = f"{self.cmd}_{self._output_date}{suffix}"
+        return os.path.normpath(os.path.join(self.output_dir, filename))
 
     def _tabularize_and_print(
         self,
@@ -428,10 +839,93 @@ class Fetcher:
         """Output generated results and/or save"""
         data = self._sort(data)
         data = self._limit(data)
+        with self._stage("rendering"):
+            if self.save:
+                self._save_to_file(data)
+            if not self.quiet:
+                self._tabularize_and_print(data)
+        self.report_profile()
+        self.write_trace()
+
+    def stream_output(self, rows: Iterable[Dict[str, Union[int, str, bool]]]):
+        """Outputs results while they are generated: every row is saved and printed,
+        as a JSON line or in tables of at most sinks.TABLE_BUFFER_SIZE rows, as soon
+        as it is available. Results can not be sorted.
+        """
+        if self.limit:
+            rows = itertools.islice(rows, self.limit)
+        with contextlib.ExitStack() as stack:
+            outputs: List[sinks.Sink] = []
+            if self.save:
+                outputs.append(
+                    stack.enter_context(sinks.CsvSink(self._output_filename()))
+                )
+            if self.quiet:
+                pass
+            elif self.jsonl:
+                outputs.append(stack.enter_context(sinks.JsonLinesSink(sys.stdout)))
+            else:
+                outputs.append(stack.enter_context(sinks.TableSink(sys.stdout)))
+            for row in rows:
+                with self._stage("rendering"):
+                    for output in outputs:
+                        output.write(row)
+        self.report_profile()
+        self.write_trace()
+
+    def report_profile(self):
+        """Writes the profile of the run next to the saved results with --save,
+        prints it to stderr otherwise. Does nothing unless profiling.
+        """
+        if not self.profiler:
+            return
+        summary = self.profiler.summary()
         if self.save:
-            self._save_to_file(data)
-        if not self.quiet:
-            self._tabularize_and_print(data)
+            with open(self._output_filename("_profile.json"), "w") as f:
+                json.dump(summary, f, indent=2)
+        else:
+            sys.stderr.write(profiler.format_summary(summary))
+
+    def write_trace(self):
+        """Writes the spans recorded while tracing to {command}_{date}_trace.json.
+        Does nothing unless tracing.
+        """
+        if not self.tracer:
+            return
+        filename = self._output_filename("_trace.json")
+        self.tracer.write(filename)
+        print(f"Trace written to {filename}", file=sys.stderr)
+
+
+class WarmState:
+    """API session and caches shared by the commands henry serve and henry batch
+    run: the metadata of models and explores, usage history and deployed commits.
+    Caches are dropped once they are older than ttl seconds, if given.
+    """
+
+    def __init__(self, sdk: methods.Looker40SDK, ttl: Optional[int] = None):
+        self.sdk = sdk
+        self.ttl = ttl
+        self.lookml_models: Dict[Optional[str], Sequence[models.LookmlModel]] = {}
+        # Explore summaries along with the commit deployed when they were fetched
+        self.explores: Dict[Tuple[str, str], Tuple[str, summaries.ExploreSummary]] = {}
+        self.usage_cache: Dict[bytes, Any] = {}
+        self.deployed_commits: Dict[str, str] = {}
+        self._loaded = time.monotonic()
+
+    def expire(self):
+        """Drops the caches if they are older than ttl seconds."""
+        if self.ttl is not None and time.monotonic() - self._loaded > self.ttl:
+            self.lookml_models.clear()
+            self.explores.clear()
+            self.usage_cache.clear()
+            self.deployed_commits.clear()
+            self._loaded = time.monotonic()
+
+
+class ExploreUsage(NamedTuple):
+    query_count: int
+    fields: Dict[str, int]
 
 
 class Input(NamedTuple):
@@ -449,3 +943,27 @@ class Input(NamedTuple):
     quiet: bool = False
     save: Optional[bool] = False
     timeout: Optional[int] = 120
+    jobs: int = 1
+    chunk_size: int = 5000
+    max_history_rows: int = 1000000
+    no_cache: bool = False
+    refresh_cache: bool = False
+    usage_store: bool = False
+    usage_retention: int = 90
+    connection_timeout: int = 60
+    result_format: str = "csv"
+    stream: bool = False
+    jsonl: bool = False
+    profile: bool = False
+    trace: bool = False
+    max_retries: int = 5
+    max_rps: Optional[float] = None
+    max_in_flight: Optional[int] = None
+    token_cache: bool = False
+    server: Optional[str] = None
+    socket: Optional[str] = None
+    cache_ttl: int = 300
+    manifest: Optional[str] = None
+    output_dir: str = "."
+    sections: Optional[Sequence[str]] = None
+    all_sections: bool = False
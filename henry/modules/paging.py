@@ -0,0 +1,83 @@
+import datetime
+import sys
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+TRow = Dict[str, Any]
+
+
+class Window(NamedTuple):
+    """A range of whole days in history. Days are counted back from today in the
+    Looker instance's timezone, just like the "N days" filter, or from `today` if
+    given, in which case the window covers the same dates wherever it is resolved.
+    """
+
+    days_ago: int
+    days: int
+    today: Optional[datetime.date] = None
+
+    @property
+    def expression(self) -> str:
+        if self.today is None:
+            return f"{self.days_ago} days ago for {self.days} days"
+        start = self.today - datetime.timedelta(days=self.days_ago)
+        end = start + datetime.timedelta(days=self.days)
+        return f"{start:%Y/%m/%d} to {end:%Y/%m/%d}"
+
+    def split(self) -> Sequence["Window"]:
+        """Splits the window into an older and a newer half."""
+        older = self.days // 2
+        return (
+            Window(self.days_ago, older, self.today),
+            Window(self.days_ago - older, self.days - older, self.today),
+        )
+
+
+class Chunk(NamedTuple):
+    window: Window
+    rows: Sequence[TRow]
+    # False if some rows of the window could not be fetched
+    complete: bool
+
+
+def paginate(
+    run: Callable[[str, int], Sequence[TRow]],
+    window: Window,
+    *,
+    chunk_size: int,
+    max_rows: int,
+) -> Iterator[Chunk]:
+    """Yields history rows of a window in chronological chunks.
+
+    `run` is called with a created_date filter expression and a row limit and must
+    return the rows of that window. A window that fills the whole chunk may have been
+    truncated by the limit so it is split in half and fetched again, down to single
+    days. Fetching stops once `max_rows` rows were returned. Both cases where data
+    could not be fully fetched are reported.
+    """
+    pending: List[Window] = [window]
+    total = 0
+    while pending:
+        window = pending.pop(0)
+        rows = run(window.expression, chunk_size)
+        complete = True
+        if len(rows) >= chunk_size:
+            if window.days > 1:
+                pending[:0] = window.split()
+                continue
+            complete = False
+            print(
+                f"Warning: history for {window.expression} has more than "
+                f"{chunk_size} rows and was truncated. Increase --chunk-size to "
+                "fetch all of it.",
+                file=sys.stderr,
+            )
+        total += len(rows)
+        if total > max_rows:
+            print(
+                f"Warning: history exceeds {max_rows} rows, results are truncated. "
+                "Increase --max-history-rows to fetch all of it.",
+                file=sys.stderr,
+            )
+            yield Chunk(window, rows[: len(rows) - (total - max_rows)], False)
+            return
+        yield Chunk(window, rows, complete)
@@ -0,0 +1,203 @@
+import bisect
+import contextlib
+import threading
+import time
+import urllib.parse
+from typing import Any, Dict, Iterator, List, MutableMapping, Optional
+
+import tabulate  # type: ignore
+from looker_sdk.rtl import requests_transport, transport
+
+# Upper bounds, in milliseconds, of the latency histogram buckets
+LATENCY_BUCKETS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+# Path segments following these ones are ids that are left out of endpoint names
+ID_COLLECTIONS = {
+    "connections",
+    "dashboards",
+    "explores",
+    "git_connection_tests",
+    "looks",
+    "lookml_models",
+    "projects",
+    "users",
+}
+
+
+def endpoint_name(method: transport.HttpMethod, path: str) -> str:
+    """Returns the endpoint a request was made to, e.g.
+    "GET /lookml_models/{id}/explores/{id}".
+    """
+    segments = urllib.parse.urlparse(path).path.split("/")
+    if "api" in segments:
+        # Drop everything up to the API version
+        segments = [""] + segments[segments.index("api") + 2 :]
+    for i in range(2, len(segments)):
+        if segments[i - 1] in ID_COLLECTIONS:
+            segments[i] = "{id}"
+    return f"{method.name} {'/'.join(segments)}"
+
+
+class EndpointStats:
+    def __init__(self):
+        self.calls = 0
+        self.bytes = 0
+        self.latencies: List[float] = []
+
+    def summary(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        for latency in latencies:
+            buckets[bisect.bisect_left(LATENCY_BUCKETS, latency * 1000)] += 1
+        labels = [f"<={b}ms" for b in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}ms"]
+        return {
+            "calls": self.calls,
+            "bytes": self.bytes,
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+            "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+            "max_ms": round(latencies[-1] * 1000, 1),
+            "histogram": {labels[i]: n for i, n in enumerate(buckets) if n},
+        }
+
+
+class Profiler:
+    """Records API calls per endpoint and the time spent in each stage of a run.
+
+    Stages can be nested and entered from several threads at once. The time of a
+    nested stage only counts towards that stage, so that e.g. the time
+    "aggregation" spends waiting on "usage queries" is not counted twice. Stages
+    running in parallel threads all count fully, so their sum can exceed the wall
+    time of the run.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.endpoints: Dict[str, EndpointStats] = {}
+        self.stages: Dict[str, float] = {}
+
+    def record_call(self, endpoint: str, size: int, latency: float):
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, EndpointStats())
+            stats.calls += 1
+            stats.bytes += size
+            stats.latencies.append(latency)
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        stack = self._local.__dict__.setdefault("stack", [])
+        # [nested time, start] of the stages entered by this thread
+        frame = [0.0, time.perf_counter()]
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            stack.pop()
+            elapsed = time.perf_counter() - frame[1]
+            if stack:
+                stack[-1][0] += elapsed
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed - frame[0]
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "wall_time_s": round(time.perf_counter() - self.started, 3),
+                "stages_s": {k: round(v, 3) for k, v in self.stages.items()},
+                "endpoints": {
+                    k: v.summary() for k, v in sorted(self.endpoints.items())
+                },
+            }
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """Formats a Profiler.summary() as tables of stages and endpoints."""
+    stages = tabulate.tabulate(
+        [
+            {"Stage": name, "Time (s)": seconds}
+            for name, seconds in summary["stages_s"].items()
+        ],
+        headers="keys",
+        tablefmt="psql",
+    )
+    endpoints = tabulate.tabulate(
+        [
+            {
+                "Endpoint": name,
+                "Calls": stats["calls"],
+                "Received (KB)": round(stats["bytes"] / 1024, 1),
+                "p50 (ms)": stats["p50_ms"],
+                "p95 (ms)": stats["p95_ms"],
+                "Max (ms)": stats["max_ms"],
+                "Latency Histogram": "\n".join(
+                    f"{bucket}: {n}" for bucket, n in stats["histogram"].items()
+                ),
+            }
+            for name, stats in summary["endpoints"].items()
+        ],
+        headers="keys",
+        tablefmt="psql",
+    )
+    wall_time = summary["wall_time_s"]
+    return f"Profile (wall time {wall_time}s)\n{stages}\n{endpoints}\n\n"
+
+
+class ProfilingTransport(transport.Transport):
+    """Transport that records every request another transport sends."""
+
+    def __init__(self, inner: transport.Transport, profiler: Profiler):
+        self.inner = inner
+        self.profiler = profiler
+
+    @classmethod
+    def configure(cls, settings: transport.PTransportSettings) -> transport.Transport:
+        """Returns a transport profiling the requests of a RequestsTransport."""
+        return cls(requests_transport.RequestsTransport.configure(settings), Profiler())
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.inner, name)
+
+    def request(
+        self,
+        method: transport.HttpMethod,
+        path: str,
+        query_params: Optional[MutableMapping[str, str]] = None,
+        body: Optional[bytes] = None,
+        authenticator: transport.TAuthenticator = None,
+        transport_options: Optional[transport.TransportOptions] = None,
+    ) -> transport.Response:
+        start = time.perf_counter()
+        response = self.inner.request(
+            method, path, query_params, body, authenticator, transport_options
+        )
+        self.profiler.record_call(
+            endpoint_name(method, path),
+            len(response.value),
+            time.perf_counter() - start,
+        )
+        return response
+
+    @contextlib.contextmanager
+    def stream(
+        self, method: transport.HttpMethod, path: str, **kwargs
+    ) -> Iterator[Any]:
+        """Records a streamed request once its body was read. Its latency includes
+        the time the caller spent processing the body while reading it.
+        """
+        start = time.perf_counter()
+        size = 0
+        with self.inner.stream(method, path, **kwargs) as resp:  # type: ignore
+
+            def counted_chunks() -> Iterator[bytes]:
+                nonlocal size
+                for chunk in resp.chunks:
+                    size += len(chunk)
+                    yield chunk
+
+            try:
+                yield resp._replace(chunks=counted_chunks())
+            finally:
+                self.profiler.record_call(
+                    endpoint_name(method, path), size, time.perf_counter() - start
+                )
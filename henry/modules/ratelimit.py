@@ -0,0 +1,110 @@
+import contextlib
+import logging
+import threading
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+# Statuses Looker answers with when it is overloaded
+THROTTLE_STATUSES = {429, 503}
+# A call is considered slowed down by load once it takes LATENCY_TOLERANCE times
+# as long as the typical call to the same endpoint, and at least LATENCY_FLOOR
+# seconds more. The typical latency starts as the mean of the first
+# LATENCY_SAMPLES calls, then moves by LATENCY_SMOOTHING of every later call.
+LATENCY_TOLERANCE = 3.0
+LATENCY_FLOOR = 0.05
+LATENCY_SMOOTHING = 0.1
+LATENCY_SAMPLES = 10
+
+logger = logging.getLogger(__name__)
+
+
+class Slot:
+    """A call the limiter let through. Set throttled if Looker rejected it because
+    it is overloaded.
+    """
+
+    def __init__(self, endpoint: str, start: float):
+        self.endpoint = endpoint
+        self.start = start
+        self.throttled = False
+
+
+class AdaptiveLimiter:
+    """Limits the API calls sent to Looker to what it can serve without slowing
+    down, within ceilings on the calls per second and the calls in flight.
+
+    Calls per second are capped by a token bucket holding up to a second of calls.
+    Calls in flight are limited with additive increase, multiplicative decrease:
+    the limit grows by one call per round of calls answered promptly, up to
+    max_in_flight, and is halved, down to one call, when a call is throttled,
+    fails or is slowed down by load. Calls sent before the last decrease do not
+    decrease the limit again, so that one overloaded moment halves it only once.
+    """
+
+    def __init__(self, max_in_flight: int, max_rate: Optional[float] = None):
+        self.max_in_flight = max(max_in_flight, 1)
+        self.max_rate = max_rate
+        self.limit = float(self.max_in_flight)
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._tokens = max(max_rate or 0, 1.0)
+        self._refilled = time.monotonic()
+        self._decreased = 0.0
+        self._typical: Dict[str, Tuple[float, int]] = {}
+
+    @contextlib.contextmanager
+    def slot(self, endpoint: str) -> Iterator[Slot]:
+        """Waits until a call to endpoint can be sent, then times the block."""
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+        wait = self._take_token()
+        if wait:
+            time.sleep(wait)
+        slot = Slot(endpoint, time.monotonic())
+        congested = True
+        try:
+            yield slot
+            congested = slot.throttled or self._slowed_down(slot)
+        finally:
+            self._release(slot, congested)
+
+    def _take_token(self) -> float:
+        """Takes a token from the bucket, returns the seconds to wait for it."""
+        if not self.max_rate:
+            return 0.0
+        with self._condition:
+            now = time.monotonic()
+            self._tokens = min(
+                self._tokens + (now - self._refilled) * self.max_rate,
+                max(self.max_rate, 1.0),
+            )
+            self._refilled = now
+            # Tokens can be borrowed from the future, the call then waits for them
+            self._tokens -= 1
+            return -self._tokens / self.max_rate if self._tokens < 0 else 0.0
+
+    def _slowed_down(self, slot: Slot) -> bool:
+        latency = time.monotonic() - slot.start
+        with self._condition:
+            typical, samples = self._typical.get(slot.endpoint, (0.0, 0))
+            weight = max(1 / (samples + 1), LATENCY_SMOOTHING)
+            self._typical[slot.endpoint] = (
+                typical + (latency - typical) * weight,
+                samples + 1,
+            )
+        if samples < LATENCY_SAMPLES:
+            return False
+        return latency > max(typical * LATENCY_TOLERANCE, typical + LATENCY_FLOOR)
+
+    def _release(self, slot: Slot, congested: bool):
+        with self._condition:
+            self._in_flight -= 1
+            if not congested:
+                self.limit = min(self.limit + 1 / self.limit, self.max_in_flight)
+            elif slot.start >= self._decreased:
+                self.limit = max(self.limit / 2, 1.0)
+                self._decreased = time.monotonic()
+                logger.info("Reduced API calls in flight to %d", int(self.limit))
+            self._condition.notify_all()
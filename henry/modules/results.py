@@ -0,0 +1,166 @@
+import codecs
+import csv
+import json
+import re
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Mapping,
+    Optional,
+    Sequence,
+)
+
+from looker_sdk import error
+from looker_sdk.rtl import serialize, transport
+from looker_sdk.sdk.api40 import methods, models
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator[Any]:
+    """Yields the elements of a JSON array as soon as they are complete, reading the
+    array text from chunks of arbitrary size. Only the element being decoded is kept
+    in memory.
+    """
+    chunks = iter(chunks)
+    buf = ""
+    pos = 0
+    eof = False
+    started = False
+
+    def skip(chars: str):
+        nonlocal pos
+        while pos < len(buf) and buf[pos] in chars:
+            pos += 1
+
+    while True:
+        skip(_WHITESPACE + ("," if started else ""))
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                value, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # A scalar ending with the buffer may continue in the next chunk.
+                if eof or end < len(buf) or isinstance(value, (dict, list)):
+                    pos = end
+                    yield value
+                    continue
+        elif eof:
+            raise ValueError("Unexpected end of JSON array")
+        try:
+            buf = buf[pos:] + next(chunks)
+            pos = 0
+        except StopIteration:
+            eof = True
+
+
+def iter_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """Yields the lines, including line endings, of text read in chunks."""
+    pending = ""
+    for chunk in chunks:
+        lines = (pending + chunk).splitlines(keepends=True)
+        pending = lines.pop() if lines and not lines[-1].endswith("\n") else ""
+        yield from lines
+    if pending:
+        yield pending
+
+
+def iter_csv_rows(
+    chunks: Iterable[str],
+    fields: Sequence[str],
+    types: Optional[Mapping[str, Callable[[str], Any]]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Yields the rows of a csv query result as dictionaries keyed by field name.
+
+    Looker labels csv columns for display and does not keep the order of the
+    query's fields, so columns are matched with fields by their label, e.g.
+    "History Query Run Count" for history.query_run_count. A ValueError is raised
+    before any row is yielded if the labels do not match the fields. Values are
+    converted with the callable given for their field in types, or kept as strings,
+    and empty values are decoded as None like null values in json results.
+    """
+    reader = csv.reader(iter_lines(chunks))
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = {_label_key(label): i for i, label in enumerate(header)}
+    if len(header) != len(fields) or set(columns) != {_label_key(f) for f in fields}:
+        raise ValueError(f"Expected csv columns for {list(fields)} but got {header}")
+    converters = [
+        (f, columns[_label_key(f)], (types or {}).get(f, str)) for f in fields
+    ]
+    for values in reader:
+        if not values:
+            continue
+        if len(values) != len(converters):
+            raise ValueError(f"Expected {len(converters)} csv values: {values}")
+        yield {
+            f: convert(values[i]) if values[i] != "" else None
+            for f, i, convert in converters
+        }
+
+
+def _label_key(name: str) -> str:
+    """Returns a field name or csv column label in a form both compare equal in,
+    e.g. "history query run count".
+    """
+    return " ".join(re.split(r"[^a-z0-9]+", name.lower())).strip()
+
+
+def _iter_response_text(
+    sdk: methods.Looker40SDK, result_format: str, query: models.WriteQuery
+) -> Iterator[str]:
+    """Runs a query and yields the response text in chunks as it is read."""
+    stream = getattr(sdk.transport, "stream", None)
+    if stream is None:
+        result = sdk.run_inline_query(result_format, query)
+        yield result if isinstance(result, str) else result.decode("utf-8")
+        return
+    with stream(
+        transport.HttpMethod.POST,
+        f"{sdk.auth.settings.base_url}/api/{sdk.auth.api_version}"
+        f"/queries/run/{result_format}",
+        body=serialize.serialize40(api_model=query),
+        authenticator=sdk.auth.authenticate,
+    ) as resp:
+        if not resp.ok:
+            raise error.SDKError(b"".join(resp.chunks).decode(resp.encoding))
+        decoder = codecs.getincrementaldecoder(resp.encoding)()
+        for chunk in resp.chunks:
+            yield decoder.decode(chunk)
+        yield decoder.decode(b"", final=True)
+
+
+def stream_inline_query(
+    sdk: methods.Looker40SDK,
+    query: models.WriteQuery,
+    result_format: str = "json",
+    types: Optional[Mapping[str, Callable[[str], Any]]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Runs a query and yields its rows while the response is still being read,
+    so that the raw response body is never held in memory as a whole.
+
+    Results are requested as "json" or, more compactly, as "csv" in which case
+    values are converted using types (see iter_csv_rows).
+    """
+    text = _iter_response_text(sdk, result_format, query)
+    if result_format == "json":
+        yield from iter_json_array(text)
+    elif result_format == "csv":
+        yield from iter_csv_rows(text, query.fields or [], types)
+    else:
+        raise ValueError(f"Unsupported result format: {result_format}")
@@ -0,0 +1,153 @@
+import contextlib
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import traceback
+from typing import Any, Callable, Dict, Iterator, List, TextIO
+
+# Only the standard library is imported here so that forwarding a command to
+# henry serve does not pay for importing the Looker SDK.
+
+# Handles the arguments of a command run in a directory, writing its output to
+# the given stdout and stderr, and returns its exit status
+THandler = Callable[[List[str], str, TextIO, TextIO], int]
+
+
+def default_socket_path() -> str:
+    """Returns the socket henry serve listens on unless told otherwise."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "henry", "serve.sock")
+
+
+def _send(wfile, message: Dict[str, Any]):
+    wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+    wfile.flush()
+
+
+def _receive(rfile) -> Iterator[Dict[str, Any]]:
+    for line in rfile:
+        yield json.loads(line.decode("utf-8"))
+
+
+class MessageStream:
+    """Text stream sending everything written to it to the client as a message
+    of the given kind.
+    """
+
+    def __init__(self, wfile, kind: str, lock: threading.Lock):
+        self._wfile = wfile
+        self._kind = kind
+        self._lock = lock
+
+    def write(self, text: str) -> int:
+        if text:
+            # Spinner threads write while the command prints its results
+            with self._lock:
+                _send(self._wfile, {self._kind: text})
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    server: "Server"
+
+    def handle(self):
+        try:
+            request = next(_receive(self.rfile))
+        except (StopIteration, ValueError):
+            return
+        lock = threading.Lock()
+        stdout = MessageStream(self.wfile, "stdout", lock)
+        stderr = MessageStream(self.wfile, "stderr", lock)
+        try:
+            status = self.server.handler(
+                request["argv"], request["cwd"], stdout, stderr
+            )
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else 1
+        except OSError:
+            # The client went away, there is nobody left to report to
+            return
+        except Exception:
+            stderr.write(traceback.format_exc())
+            status = 1
+        with contextlib.suppress(OSError):
+            _send(self.wfile, {"exit": status})
+
+
+class Server(socketserver.UnixStreamServer):
+    """Runs the commands henry clients forward over a Unix socket, one at a time,
+    with handler. The socket is only accessible to the current user.
+    """
+
+    def __init__(self, path: str, handler: THandler):
+        self.path = path
+        self.handler = handler
+        directory = os.path.dirname(path)
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        if os.path.exists(path):
+            if is_running(path):
+                raise OSError(f"henry serve is already listening on {path}")
+            os.remove(path)
+        umask = os.umask(0o177)
+        try:
+            super().__init__(path, _RequestHandler)
+        finally:
+            os.umask(umask)
+
+    def server_close(self):
+        super().server_close()
+        with contextlib.suppress(OSError):
+            os.remove(self.path)
+
+
+def is_running(path: str) -> bool:
+    """Returns True if henry serve accepts connections on path."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+def forward(path: str, argv: List[str]) -> int:
+    """Runs a command on the henry serve listening on path, printing its output as
+    it is generated, and returns its exit status.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError as e:
+            print(
+                f"Unable to connect to henry serve on {path} ({e.strerror}). "
+                "Please start it with `henry serve`.",
+                file=sys.stderr,
+            )
+            return 1
+        with sock.makefile("rwb") as conn:
+            _send(conn, {"argv": argv, "cwd": os.getcwd()})
+            for message in _receive(conn):
+                if "stdout" in message:
+                    sys.stdout.write(message["stdout"])
+                    sys.stdout.flush()
+                elif "stderr" in message:
+                    sys.stderr.write(message["stderr"])
+                    sys.stderr.flush()
+                elif "exit" in message:
+                    return message["exit"]
+    print(
+        "henry serve closed the connection before the command ended.",
+        file=sys.stderr,
+    )
+    return 1
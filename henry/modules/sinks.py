@@ -0,0 +1,87 @@
+import csv
+import json
+from typing import Dict, List, Optional, TextIO, Union
+
+import tabulate  # type: ignore
+
+TRow = Dict[str, Union[int, str, bool]]
+
+# Maximum number of rows TableSink holds before printing them
+TABLE_BUFFER_SIZE = 20
+
+
+class Sink:
+    """Writes result rows somewhere as they are generated."""
+
+    def __enter__(self) -> "Sink":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, row: TRow):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CsvSink(Sink):
+    """Writes rows to a csv file, using the keys of the first row as header."""
+
+    def __init__(self, filename: str):
+        self._file = open(filename, "w", newline="")
+        self._writer: Optional[csv.DictWriter] = None
+
+    def write(self, row: TRow):
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._file, fieldnames=list(row.keys()))
+            self._writer.writeheader()
+        # Replace "\n" which is required when printing, with ','
+        self._writer.writerow({k: str(v).replace("\n", ",") for k, v in row.items()})
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class JsonLinesSink(Sink):
+    """Writes every row as a JSON object on its own line."""
+
+    def __init__(self, stream: TextIO):
+        self._stream = stream
+
+    def write(self, row: TRow):
+        self._stream.write(json.dumps(row) + "\n")
+        self._stream.flush()
+
+
+class TableSink(Sink):
+    """Prints rows in tables of at most buffer_size rows."""
+
+    def __init__(self, stream: TextIO, buffer_size: int = TABLE_BUFFER_SIZE):
+        self._stream = stream
+        self._buffer_size = buffer_size
+        self._buffer: List[TRow] = []
+        self._printed = False
+
+    def write(self, row: TRow):
+        self._buffer.append(row)
+        if len(self._buffer) >= self._buffer_size:
+            self._print()
+
+    def close(self):
+        if self._buffer or not self._printed:
+            self._print()
+
+    def _print(self):
+        if self._buffer:
+            table = tabulate.tabulate(
+                self._buffer, headers="keys", tablefmt="psql", numalign="center"
+            )
+            self._stream.write(f"{table}\n\n")
+        else:
+            self._stream.write("No results found.\n\n")
+        self._stream.flush()
+        self._buffer = []
+        self._printed = True
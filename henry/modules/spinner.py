@@ -1,31 +1,64 @@
-from contextlib import ContextDecorator
+import functools
 import sys
 import threading
-import time
+from typing import Optional, TextIO
+
+from henry.modules import tracing
 
 
 class SpinnerThread(threading.Thread):
-    def __init__(self):
+    def __init__(self, stream: TextIO):
         super().__init__(target=self._spin)
+        self._stream = stream
         self._stopevent = threading.Event()
 
     def stop(self):
-        sys.stdout.write("\b")
+        self._stream.write("\b")
         self._stopevent.set()
+        # Waited for so that the spinner does not write after its block, into the
+        # output of whatever comes next
+        self.join()
 
     def _spin(self):
-        while not self._stopevent.isSet():
+        while not self._stopevent.is_set():
             for t in "|/-\\":
-                sys.stdout.write(t)
-                sys.stdout.flush()
-                time.sleep(0.1)
-                sys.stdout.write("\b")
+                self._stream.write(t)
+                self._stream.flush()
+                stopped = self._stopevent.wait(0.1)
+                self._stream.write("\b")
+                if stopped:
+                    break
+
+
+class Spinner:
+    """Shows a spinner while the block or decorated method runs, which is traced
+    by tracer, or the tracer of the method's instance, as a span named after the
+    method, or name. Nothing is shown unless stdout is a terminal, so that output
+    written to files is not interleaved with the spinner.
+    """
+
+    def __init__(self, name: str = "Spinner", tracer: Optional[tracing.Tracer] = None):
+        self.name = name
+        self.tracer = tracer
+
+    def __call__(self, func):
+        name = func.__qualname__
+
+        @functools.wraps(func)
+        def spin(instance, *args, **kwargs):
+            with Spinner(name, getattr(instance, "tracer", None)):
+                return func(instance, *args, **kwargs)
 
+        return spin
 
-class Spinner(ContextDecorator):
     def __enter__(self):
-        self.spinner = SpinnerThread()
-        self.spinner.start()
+        self.span = tracing.span(self.tracer, self.name, "command")
+        self.span.__enter__()
+        self.spinner = SpinnerThread(sys.stdout) if sys.stdout.isatty() else None
+        if self.spinner:
+            self.spinner.start()
 
     def __exit__(self, exc_type, exc_value, tb):
-        self.spinner.stop()
+        if self.spinner:
+            self.spinner.stop()
+        self.span.__exit__(exc_type, exc_value, tb)
@@ -0,0 +1,97 @@
+import sys
+from typing import Optional, Sequence, Tuple
+
+from looker_sdk.sdk.api40 import models
+
+# The `fields=` projection explores are requested with, only what summaries hold
+EXPLORE_FIELDS = (
+    "name,model_name,project_name,hidden,description,scopes,"
+    "fields(dimensions(name,hidden),measures(name,hidden))"
+)
+
+
+class FieldSummary:
+    """Name and visibility of a dimension or measure."""
+
+    __slots__ = ("name", "hidden")
+
+    def __init__(self, name: str, hidden: bool):
+        self.name = name
+        self.hidden = hidden
+
+
+class FieldsSummary:
+    """Dimensions and measures of an explore."""
+
+    __slots__ = ("dimensions", "measures")
+
+    def __init__(
+        self,
+        dimensions: Tuple[FieldSummary, ...],
+        measures: Tuple[FieldSummary, ...],
+    ):
+        self.dimensions = dimensions
+        self.measures = measures
+
+
+class ExploreSummary:
+    """The attributes of a LookmlModelExplore henry reports on, under the same
+    names. Field metadata such as sql, labels and suggestions is left out, so
+    explores take a fraction of the memory of the SDK models they are built from.
+    """
+
+    __slots__ = (
+        "name",
+        "model_name",
+        "project_name",
+        "hidden",
+        "description",
+        "scopes",
+        "fields",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        model_name: str,
+        project_name: str,
+        hidden: bool,
+        description: Optional[str],
+        scopes: Tuple[str, ...],
+        fields: FieldsSummary,
+    ):
+        self.name = name
+        self.model_name = model_name
+        self.project_name = project_name
+        self.hidden = hidden
+        self.description = description
+        self.scopes = scopes
+        self.fields = fields
+
+
+def _intern(value: Optional[str]) -> str:
+    # Names repeat across explores, e.g. the fields of views joined in several
+    return sys.intern(value or "")
+
+
+def _summarize_fields(
+    fields: Optional[Sequence[models.LookmlModelExploreField]],
+) -> Tuple[FieldSummary, ...]:
+    return tuple(FieldSummary(_intern(f.name), bool(f.hidden)) for f in fields or ())
+
+
+def summarize_explore(explore: models.LookmlModelExplore) -> ExploreSummary:
+    """Returns the summary of an explore fetched from the API."""
+    fields = explore.fields
+    return ExploreSummary(
+        name=_intern(explore.name),
+        model_name=_intern(explore.model_name),
+        project_name=_intern(explore.project_name),
+        hidden=bool(explore.hidden),
+        description=explore.description,
+        scopes=tuple(_intern(s) for s in explore.scopes or ()),
+        fields=FieldsSummary(
+            _summarize_fields(fields.dimensions if fields else None),
+            _summarize_fields(fields.measures if fields else None),
+        ),
+    )
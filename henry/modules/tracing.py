@@ -0,0 +1,115 @@
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Any, ContextManager, Dict, Iterator, List, MutableMapping, Optional
+
+from looker_sdk.rtl import requests_transport, transport
+
+from henry.modules import profiler
+
+
+class Tracer:
+    """Records spans as Chrome trace events, which chrome://tracing and Perfetto
+    (https://ui.perfetto.dev) open as a timeline with one track per thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, str] = {}
+        # Timestamps are microseconds since the epoch, measured with perf_counter
+        self._epoch_us = time.time() * 1e6 - time.perf_counter() * 1e6
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str, **args: Any) -> Iterator[None]:
+        tid = threading.get_ident()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": round(self._epoch_us + start * 1e6, 3),
+                "dur": round((end - start) * 1e6, 3),
+                "pid": os.getpid(),
+                "tid": tid,
+            }
+            if args:
+                event["args"] = args
+            with self._lock:
+                self._events.append(event)
+                self._threads.setdefault(tid, threading.current_thread().name)
+
+    def events(self) -> List[Dict[str, Any]]:
+        """Returns the spans recorded so far, along with the names of their threads."""
+        with self._lock:
+            names = [
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": tid,
+                    "args": {"name": name},
+                }
+                for tid, name in self._threads.items()
+            ]
+            return names + sorted(self._events, key=lambda e: e["ts"])
+
+    def write(self, filename: str):
+        with open(filename, "w") as f:
+            json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, f)
+
+
+def span(
+    tracer: Optional[Tracer], name: str, category: str, **args: Any
+) -> ContextManager[None]:
+    """Records the block as a span of tracer, does nothing without a tracer."""
+    if tracer is None:
+        return contextlib.nullcontext()
+    return tracer.span(name, category, **args)
+
+
+class TracingTransport(transport.Transport):
+    """Transport that records every request another transport sends as a span of
+    tracer.
+    """
+
+    def __init__(self, inner: transport.Transport, tracer: Tracer):
+        self.inner = inner
+        self.tracer = tracer
+
+    @classmethod
+    def configure(cls, settings: transport.PTransportSettings) -> transport.Transport:
+        """Returns a transport tracing the requests of a RequestsTransport."""
+        return cls(requests_transport.RequestsTransport.configure(settings), Tracer())
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.inner, name)
+
+    def request(
+        self,
+        method: transport.HttpMethod,
+        path: str,
+        query_params: Optional[MutableMapping[str, str]] = None,
+        body: Optional[bytes] = None,
+        authenticator: transport.TAuthenticator = None,
+        transport_options: Optional[transport.TransportOptions] = None,
+    ) -> transport.Response:
+        with self.tracer.span(profiler.endpoint_name(method, path), "api", path=path):
+            return self.inner.request(
+                method, path, query_params, body, authenticator, transport_options
+            )
+
+    @contextlib.contextmanager
+    def stream(
+        self, method: transport.HttpMethod, path: str, **kwargs
+    ) -> Iterator[Any]:
+        """Records a streamed request until its body was read."""
+        with self.tracer.span(profiler.endpoint_name(method, path), "api", path=path):
+            with self.inner.stream(method, path, **kwargs) as resp:  # type: ignore
+                yield resp
@@ -0,0 +1,279 @@
+import contextlib
+import email.utils
+import random
+import threading
+import time
+from typing import (
+    Callable,
+    ContextManager,
+    Iterator,
+    MutableMapping,
+    NamedTuple,
+    Optional,
+)
+
+import requests
+from looker_sdk import error
+from looker_sdk.rtl import requests_transport, transport
+
+from henry.modules import profiler, ratelimit
+
+READ_SIZE = 64 * 1024
+
+# Responses worth sending a request again for
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Seconds the first retry waits at most, doubling with every retry up to BACKOFF_CAP
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+
+
+class RequestTimeout(error.SDKError):
+    """Raised when Looker did not answer a request within its timeout."""
+
+
+@contextlib.contextmanager
+def sdk_errors() -> Iterator[None]:
+    """Raises the errors of requests sending or reading a request as SDKError, as
+    the SDK does for the requests it sends.
+    """
+    try:
+        yield
+    except requests.Timeout as exc:
+        raise RequestTimeout(str(exc)) from exc
+    except IOError as exc:
+        raise error.SDKError(str(exc)) from exc
+
+
+def iter_chunks(resp: requests.Response) -> Iterator[bytes]:
+    """Yields the body of a streamed response in chunks of READ_SIZE bytes."""
+    with sdk_errors():
+        yield from resp.iter_content(READ_SIZE)
+
+
+class StreamedResponse(NamedTuple):
+    ok: bool
+    # Raw response body, read lazily
+    chunks: Iterator[bytes]
+    encoding: str
+
+
+class RetryBudget:
+    """Limits retries to a share of the requests sent, so that an instance that is
+    down fails the run quickly instead of every request retrying up to its limit.
+
+    Every request adds ratio retries to the budget, which starts with minimum
+    retries. Budgets are shared by the threads of a run.
+    """
+
+    def __init__(self, ratio: float = 0.2, minimum: int = 10):
+        self.ratio = ratio
+        self._lock = threading.Lock()
+        self._balance = float(minimum)
+
+    def deposit(self):
+        with self._lock:
+            self._balance += self.ratio
+
+    def withdraw(self) -> bool:
+        """Spends one retry, returns False if the budget is exhausted."""
+        with self._lock:
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+def backoff(retry: int, retry_after: Optional[str] = None) -> float:
+    """Returns the seconds to wait before a retry, the first one being retry 0.
+
+    Waits are drawn at random up to an exponentially growing limit, so that
+    concurrent requests failing together do not retry together. A Retry-After
+    header, in seconds or as a date, is honored up to BACKOFF_CAP.
+    """
+    if retry_after:
+        if retry_after.isdigit():
+            return min(float(retry_after), BACKOFF_CAP)
+        try:
+            date = email.utils.parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            date = None
+        if date:
+            return min(max(date.timestamp() - time.time(), 0.0), BACKOFF_CAP)
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**retry))
+
+
+class ApiTransport(requests_transport.RequestsTransport):
+    """RequestsTransport that keeps connections to Looker alive across threads,
+    retries requests failing with a transient error, sends requests no faster than
+    limiter allows and can also hand out response bodies while they are still being
+    received.
+    """
+
+    def __init__(
+        self,
+        settings: transport.PTransportSettings,
+        session: requests.Session,
+        max_retries: int = 5,
+        retry_budget: Optional[RetryBudget] = None,
+        limiter: Optional[ratelimit.AdaptiveLimiter] = None,
+    ):
+        super().__init__(settings, session)
+        self.max_retries = max_retries
+        self.retry_budget = retry_budget or RetryBudget()
+        self.limiter = limiter
+        # Called with the Authorization header of a call Looker answered with 401,
+        # returns True if the call should be sent again with a renewed token
+        self.on_unauthorized: Optional[Callable[[str], bool]] = None
+
+    @classmethod
+    def configure(
+        cls,
+        settings: transport.PTransportSettings,
+        pool_size: int = 10,
+        max_retries: int = 5,
+        limiter: Optional[ratelimit.AdaptiveLimiter] = None,
+    ) -> "ApiTransport":
+        """Returns a transport keeping up to pool_size connections open, which
+        should be at least the number of threads sending requests.
+        """
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return cls(settings, session, max_retries, limiter=limiter)
+
+    def request(
+        self,
+        method: transport.HttpMethod,
+        path: str,
+        query_params: Optional[MutableMapping[str, str]] = None,
+        body: Optional[bytes] = None,
+        authenticator: transport.TAuthenticator = None,
+        transport_options: Optional[transport.TransportOptions] = None,
+    ) -> transport.Response:
+        try:
+            resp = self._send(
+                method, path, query_params, body, authenticator, transport_options
+            )
+        except requests.Timeout as exc:
+            raise RequestTimeout(str(exc)) from exc
+        except IOError as exc:
+            return transport.Response(
+                False, bytes(str(exc), encoding="utf-8"), transport.ResponseMode.STRING
+            )
+        ret = transport.Response(
+            resp.ok,
+            resp.content,
+            transport.response_mode(resp.headers.get("content-type")),
+        )
+        encoding = requests.utils.get_encoding_from_headers(resp.headers)
+        if encoding:
+            ret.encoding = encoding
+        return ret
+
+    @contextlib.contextmanager
+    def stream(
+        self,
+        method: transport.HttpMethod,
+        path: str,
+        query_params: Optional[MutableMapping[str, str]] = None,
+        body: Optional[bytes] = None,
+        authenticator: transport.TAuthenticator = None,
+        transport_options: Optional[transport.TransportOptions] = None,
+    ) -> Iterator[StreamedResponse]:
+        """Sends a request and yields its response, whose body can be read in
+        chunks until the block exits.
+        """
+        with sdk_errors():
+            resp = self._send(
+                method,
+                path,
+                query_params,
+                body,
+                authenticator,
+                transport_options,
+                stream=True,
+            )
+        with resp:
+            # requests assumes ISO-8859-1 for text/* without an explicit charset
+            charset = "charset" in resp.headers.get("Content-Type", "")
+            yield StreamedResponse(
+                resp.ok,
+                iter_chunks(resp),
+                resp.encoding if charset and resp.encoding else "utf-8",
+            )
+
+    def _send(
+        self,
+        method: transport.HttpMethod,
+        path: str,
+        query_params: Optional[MutableMapping[str, str]],
+        body: Optional[bytes],
+        authenticator: transport.TAuthenticator,
+        transport_options: Optional[transport.TransportOptions],
+        stream: bool = False,
+    ) -> requests.Response:
+        """Sends a request, retrying it with backoff while it fails with a
+        RETRY_STATUSES status or cannot connect, up to self.max_retries times and
+        as long as the retry budget allows. Timeouts are not retried.
+        """
+        timeout = self.settings.timeout
+        if transport_options and transport_options.get("timeout"):
+            timeout = transport_options["timeout"]
+        self.retry_budget.deposit()
+        endpoint = profiler.endpoint_name(method, path)
+        retry = 0
+        reauthorized = False
+        while True:
+            # Authentication headers are renewed in case the token expired
+            headers = {}
+            if authenticator:
+                headers.update(authenticator(transport_options or {}))
+            if transport_options and transport_options.get("headers"):
+                headers.update(transport_options["headers"])
+            self.logger.info("%s(%s)", method.name, path)
+            try:
+                with self._slot(endpoint) as slot:
+                    resp = self.session.request(
+                        method.name,
+                        path,
+                        auth=requests_transport.NullAuth(),
+                        params=query_params,
+                        data=body,
+                        headers=headers,
+                        timeout=timeout,
+                        stream=stream,
+                    )
+                    slot.throttled = resp.status_code in ratelimit.THROTTLE_STATUSES
+            except requests.ConnectionError as e:
+                if isinstance(e, requests.Timeout) or not self._can_retry(retry):
+                    raise
+                wait = backoff(retry)
+            else:
+                if (
+                    resp.status_code == 401
+                    and "Authorization" in headers
+                    and self.on_unauthorized
+                    and not reauthorized
+                ):
+                    reauthorized = True
+                    if self.on_unauthorized(headers["Authorization"]):
+                        resp.close()
+                        continue
+                if resp.status_code not in RETRY_STATUSES or not self._can_retry(retry):
+                    return resp
+                wait = backoff(retry, resp.headers.get("Retry-After"))
+                resp.close()
+            self.logger.warning("Retrying %s(%s) in %.1fs", method.name, path, wait)
+            time.sleep(wait)
+            retry += 1
+
+    def _slot(self, endpoint: str) -> ContextManager[ratelimit.Slot]:
+        if self.limiter is None:
+            return contextlib.nullcontext(ratelimit.Slot(endpoint, time.monotonic()))
+        return self.limiter.slot(endpoint)
+
+    def _can_retry(self, retry: int) -> bool:
+        return retry < self.max_retries and self.retry_budget.withdraw()
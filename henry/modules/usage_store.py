@@ -0,0 +1,180 @@
+import datetime
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from henry.modules import cache, paging
+
+# Rows with an empty field hold the query count of the explore itself.
+EXPLORE = ""
+
+
+class UsageRecord(NamedTuple):
+    day: str
+    model: str
+    explore: str
+    field: str
+    query_count: int
+
+
+class UsageStore:
+    """Local SQLite store of daily System Activity usage aggregates.
+
+    Usage is stored per day, model, explore and field so that any timeframe can be
+    answered locally. Only days that have not been stored yet are fetched from the
+    instance, as windows of dates rather than of days ago so that the days fetched
+    are the days recorded even if the instance runs in another timezone. The last
+    `settle_days` days are always refetched because their history may still change
+    (and may not have started yet in the instance's timezone). Days older
+    than `retention` days are deleted and the database is compacted once enough space
+    was freed.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        *,
+        path: Optional[str] = None,
+        retention: int = 90,
+        settle_days: int = 2,
+    ):
+        if not path:
+            directory = cache.cache_dir("usage")
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            key = hashlib.sha256(host.encode("utf-8")).hexdigest()[:16]
+            path = os.path.join(directory, f"{key}.sqlite")
+        self.path = path
+        self.retention = retention
+        self.settle_days = settle_days
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS usage (
+                day TEXT NOT NULL,
+                model TEXT NOT NULL,
+                explore TEXT NOT NULL,
+                field TEXT NOT NULL,
+                query_count INTEGER NOT NULL,
+                PRIMARY KEY (day, model, explore, field)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS synced_days (day TEXT PRIMARY KEY);
+            """)
+
+    def close(self):
+        self._db.close()
+
+    @staticmethod
+    def _day(days_ago: int, today: Optional[datetime.date] = None) -> str:
+        today = today or datetime.date.today()
+        return (today - datetime.timedelta(days=days_ago)).isoformat()
+
+    def missing_windows(self, days: int) -> List[paging.Window]:
+        """Returns the windows of the last `days` days that need to be fetched, oldest
+        first.
+        """
+        with self._lock:
+            synced = {r[0] for r in self._db.execute("SELECT day FROM synced_days")}
+        today = datetime.date.today()
+        windows: List[paging.Window] = []
+        for days_ago in range(days - 1, -1, -1):
+            if days_ago >= self.settle_days and self._day(days_ago) in synced:
+                continue
+            last = windows[-1] if windows else None
+            if last and last.days_ago - last.days == days_ago:
+                windows[-1] = paging.Window(last.days_ago, last.days + 1, today)
+            else:
+                windows.append(paging.Window(days_ago, 1, today))
+        return windows
+
+    def write(
+        self,
+        window: paging.Window,
+        records: Iterable[UsageRecord],
+        *,
+        complete: bool = True,
+    ):
+        """Replaces the usage of every day in the window with records. Days are only
+        marked as stored if the records are complete.
+        """
+        records = list(records)
+        days = {
+            self._day(window.days_ago - i, window.today) for i in range(window.days)
+        }
+        days.update(r.day for r in records)
+        with self._lock, self._db:
+            self._db.executemany(
+                "DELETE FROM usage WHERE day = ?", [(d,) for d in sorted(days)]
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO usage VALUES (?, ?, ?, ?, ?)", records
+            )
+            if complete:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO synced_days VALUES (?)",
+                    [
+                        (self._day(window.days_ago - i, window.today),)
+                        for i in range(window.days)
+                        if window.days_ago - i >= self.settle_days
+                    ],
+                )
+
+    def compact(self):
+        """Deletes days past the retention period and reclaims free space once at
+        least a quarter of the database is unused.
+        """
+        cutoff = self._day(self.retention - 1)
+        with self._lock:
+            with self._db:
+                self._db.execute("DELETE FROM usage WHERE day < ?", (cutoff,))
+                self._db.execute("DELETE FROM synced_days WHERE day < ?", (cutoff,))
+            free = self._db.execute("PRAGMA freelist_count").fetchone()[0]
+            pages = self._db.execute("PRAGMA page_count").fetchone()[0]
+            if pages and free / pages > 0.25:
+                self._db.execute("VACUUM")
+
+    def _query(self, sql: str, params: Sequence) -> List[Tuple]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def used_models(self, days: int) -> Dict[str, int]:
+        """Returns query counts per model over the last `days` days."""
+        rows = self._query(
+            "SELECT model, SUM(query_count) FROM usage "
+            "WHERE day >= ? AND field = ? GROUP BY model",
+            (self._day(days - 1), EXPLORE),
+        )
+        return dict(rows)
+
+    def used_explores(
+        self, days: int, model: str = "", explore: str = ""
+    ) -> Dict[str, int]:
+        """Returns query counts per explore over the last `days` days, optionally
+        filtered on model and explore.
+        """
+        rows = self._query(
+            "SELECT explore, SUM(query_count) FROM usage "
+            "WHERE day >= ? AND field = ? "
+            "AND (? = '' OR model = ?) AND (? = '' OR explore = ?) "
+            "GROUP BY explore",
+            (self._day(days - 1), EXPLORE, model, model, explore, explore),
+        )
+        return dict(rows)
+
+    def used_fields(
+        self, days: int, model: str, explore: str = ""
+    ) -> Dict[str, Dict[str, int]]:
+        """Returns query counts per field, grouped by explore, of a model over the
+        last `days` days.
+        """
+        rows = self._query(
+            "SELECT explore, field, SUM(query_count) FROM usage "
+            "WHERE day >= ? AND field != ? AND model = ? AND (? = '' OR explore = ?) "
+            "GROUP BY explore, field",
+            (self._day(days - 1), EXPLORE, model, explore, explore),
+        )
+        fields: Dict[str, Dict[str, int]] = {}
+        for e, field, count in rows:
+            fields.setdefault(e, {})[field] = count
+        return fields
@@ -5,12 +5,14 @@ from henry import __version__ as pkg
 NAME = "henry"
 VERSION = pkg.__version__
 REQUIRES = ["looker-sdk>=21", "tabulate"]
+EXTRAS_REQUIRE = {"yaml": ["pyyaml"]}
 
 setup(
     author="Joseph Axisa",
     author_email="jax@looker.com",
     description="A Looker Cleanup Tool",
     install_requires=REQUIRES,
+    extras_require=EXTRAS_REQUIRE,
     license="MIT",
     long_description=open("README.md", encoding="utf-8").read(),
     long_description_content_type="text/markdown",
@@ -0,0 +1,41 @@
+from henry.modules import aggregation
+
+
+def row(formatted_fields, filters, query_count):
+    return {
+        "query.formatted_fields": formatted_fields,
+        "query.filters": filters,
+        "history.query_run_count": query_count,
+    }
+
+
+def test_parse_fields_skips_selected_filters():
+    """aggregation.parse_fields() should not count a filter field twice if it is also
+    selected.
+    """
+    fields = aggregation.parse_fields(
+        '["users.id", "orders.count"]', '{"users.id": ">5", "users.state": "CA"}'
+    )
+    assert fields == (("users.id", 1), ("orders.count", 1), ("users.state", 1))
+
+
+def test_count_used_fields_sums_repeated_queries():
+    """aggregation.count_used_fields() should sum query counts of every row,
+    including rows repeating the same query.
+    """
+    data = [
+        row('["users.id", "orders.count"]', None, 3),
+        row('["users.id"]', '{"orders.status": "complete"}', 2),
+        row('["users.id", "orders.count"]', None, 4),
+        row('["users.id", "users.id"]', None, 1),
+    ]
+    assert aggregation.count_used_fields(data) == {
+        "users.id": 11,
+        "orders.count": 7,
+        "orders.status": 2,
+    }
+    assert list(aggregation.count_used_fields(data)) == [
+        "users.id",
+        "orders.count",
+        "orders.status",
+    ]
@@ -0,0 +1,135 @@
+import os
+
+from looker_sdk.rtl import api_settings, auth_token, serialize, transport
+
+from henry.modules import auth
+
+
+class FakeTransport(transport.Transport):
+    """Answers every login with a new token and records session updates."""
+
+    def __init__(self):
+        self.logins = 0
+        self.sessions = []
+
+    @classmethod
+    def configure(cls, settings):
+        return cls()
+
+    def request(
+        self, method, path, query_params=None, body=None, authenticator=None, **kwargs
+    ):
+        if path.endswith("/session"):
+            self.sessions.append((authenticator({}), body))
+            return transport.Response(True, body, transport.ResponseMode.STRING)
+        self.logins += 1
+        token = f'{{"access_token": "token{self.logins}", "expires_in": 3600}}'
+        return transport.Response(
+            True, token.encode("utf-8"), transport.ResponseMode.STRING
+        )
+
+
+def make_session(token_cache=None):
+    settings = api_settings.ApiSettings()
+    settings.base_url = "https://looker.example.com"
+    settings.read_config = lambda: {"client_id": "id", "client_secret": "secret"}
+    fake = FakeTransport()
+    session = auth.LazyAuthSession(
+        settings, fake, serialize.deserialize40, "4.0", token_cache=token_cache
+    )
+    return session, fake
+
+
+def test_token_cache_round_trip(tmp_path):
+    """TokenCache should return tokens until they are about to expire."""
+    tokens = auth.TokenCache("https://looker", "id", directory=str(tmp_path))
+    assert tokens.get() is None
+    tokens.put(
+        auth_token.AuthToken(
+            auth_token.AccessToken(
+                access_token="t", token_type="Bearer", expires_in=3600
+            )
+        )
+    )
+    cached = tokens.get()
+    assert cached and cached.access_token == "t"
+    assert 3500 < cached.expires_in <= 3600
+    assert oct(os.stat(tokens.path).st_mode & 0o777) == oct(0o600)
+
+    other = auth.TokenCache("https://looker", "other", directory=str(tmp_path))
+    assert other.get() is None
+
+    tokens.put(
+        auth_token.AuthToken(auth_token.AccessToken(access_token="t", expires_in=30))
+    )
+    assert tokens.get() is None
+
+
+def test_token_cache_ignores_readable_files(tmp_path):
+    """TokenCache should not trust tokens other users could have written."""
+    tokens = auth.TokenCache("https://looker", "id", directory=str(tmp_path))
+    tokens.put(
+        auth_token.AuthToken(auth_token.AccessToken(access_token="t", expires_in=3600))
+    )
+    os.chmod(tokens.path, 0o644)
+    assert tokens.get() is None
+
+
+def test_session_logs_in_lazily_and_reuses_cached_tokens(tmp_path):
+    """LazyAuthSession should only log in once a call is authenticated, and not at
+    all while a cached token is valid.
+    """
+    tokens = auth.TokenCache("https://looker", "id", directory=str(tmp_path))
+    session, fake = make_session(tokens)
+    assert fake.logins == 0
+    assert session.authenticate({}) == {"Authorization": "Bearer token1"}
+    assert session.authenticate({}) == {"Authorization": "Bearer token1"}
+    assert fake.logins == 1
+
+    session, fake = make_session(tokens)
+    assert session.authenticate({}) == {"Authorization": "Bearer token1"}
+    assert fake.logins == 0
+
+
+def test_session_switches_cached_tokens_to_production(tmp_path):
+    """A cached token should be switched to the production workspace before it is
+    used, since another run may have left it in dev mode.
+    """
+    tokens = auth.TokenCache("https://looker", "id", directory=str(tmp_path))
+    session, fake = make_session(tokens)
+    session.authenticate({})
+    assert fake.sessions == []
+
+    session, fake = make_session(tokens)
+    session.authenticate({})
+    assert fake.sessions == [
+        ({"Authorization": "Bearer token1"}, b'{"workspace_id": "production"}')
+    ]
+
+
+def test_private_tokens_are_not_cached(tmp_path):
+    """Tokens of sessions switching to dev mode should not be shared."""
+    tokens = auth.TokenCache("https://looker", "id", directory=str(tmp_path))
+    session, fake = make_session(tokens)
+    assert session.authenticate({}) == {"Authorization": "Bearer token1"}
+    session.use_private_token()
+    assert session.authenticate({}) == {"Authorization": "Bearer token2"}
+    cached = tokens.get()
+    assert cached and cached.access_token == "token1"
+
+
+def test_session_replaces_rejected_cached_tokens(tmp_path):
+    """A cached token Looker rejects should be discarded and replaced once."""
+    tokens = auth.TokenCache("https://looker", "id", directory=str(tmp_path))
+    tokens.put(
+        auth_token.AuthToken(
+            auth_token.AccessToken(access_token="revoked", expires_in=3600)
+        )
+    )
+    session, fake = make_session(tokens)
+    assert session.authenticate({}) == {"Authorization": "Bearer revoked"}
+    assert session.reject_token("Bearer revoked")
+    assert session.authenticate({}) == {"Authorization": "Bearer token1"}
+    assert not session.reject_token("Bearer token1")
+    cached = tokens.get()
+    assert cached and cached.access_token == "token1"
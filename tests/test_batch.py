@@ -0,0 +1,80 @@
+import json
+
+import pytest  # type: ignore
+
+from henry.commands import batch
+from henry.modules import fetcher
+
+
+def test_load_manifest_reads_json_and_yaml(tmp_path):
+    """Manifests should be read as JSON or YAML depending on their extension."""
+    json_manifest = tmp_path / "manifest.json"
+    json_manifest.write_text(json.dumps({"commands": ["vacuum models"]}))
+    assert batch.load_manifest(str(json_manifest)) == ["vacuum models"]
+
+    pytest.importorskip("yaml")
+    yaml_manifest = tmp_path / "manifest.yaml"
+    yaml_manifest.write_text(
+        "commands:\n"
+        "  - vacuum models\n"
+        "  - name: unused_explores\n"
+        "    run: vacuum explores --min-queries 5\n"
+    )
+    assert batch.load_manifest(str(yaml_manifest)) == [
+        "vacuum models",
+        {"name": "unused_explores", "run": "vacuum explores --min-queries 5"},
+    ]
+
+
+def test_load_manifest_rejects_other_documents(tmp_path):
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps(["vacuum models"]))
+    with pytest.raises(ValueError):
+        batch.load_manifest(str(manifest))
+
+
+def test_plan_names_commands_after_their_output():
+    """Commands should run against the instance of henry batch, with its jobs."""
+    options = fetcher.Input(
+        command="batch",
+        config_file="prod.ini",
+        section="Prod",
+        jobs=8,
+        output_dir="nightly",
+    )
+    jobs = batch.plan(
+        [
+            "vacuum models",
+            "henry analyze explores --jsonl",
+            {"name": "unused_explores", "run": "vacuum explores --min-queries 5"},
+        ],
+        options,
+    )
+    assert [j.name for j in jobs] == [
+        "vacuum_models",
+        "analyze_explores",
+        "unused_explores",
+    ]
+    assert [batch.output_suffix(j) for j in jobs] == [".txt", ".jsonl", ".txt"]
+    assert jobs[2].user_input.min_queries == 5
+    assert all(j.user_input.section == "Prod" for j in jobs)
+    assert all(j.user_input.config_file == "prod.ini" for j in jobs)
+    assert all(j.user_input.jobs == 8 for j in jobs)
+    assert all(j.user_input.output_dir == "nightly" for j in jobs)
+
+
+@pytest.mark.parametrize(
+    "commands",
+    [
+        ["vacuum models", "vacuum models"],
+        ["serve"],
+        ["vacuum models --section Other"],
+        ["vacuum models --jobs 4"],
+        ["analyze explores -j4"],
+        ["vacuum explores --explore e"],
+        [{"name": "no command"}],
+    ],
+)
+def test_plan_rejects_invalid_commands(commands):
+    with pytest.raises(ValueError):
+        batch.plan(commands, fetcher.Input(command="batch"))
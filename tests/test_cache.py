@@ -0,0 +1,92 @@
+import os
+import time
+
+import pytest  # type: ignore
+from looker_sdk.sdk.api40 import models
+
+from henry.modules import cache
+
+
+@pytest.fixture(name="explore_cache")
+def initialize(tmp_path) -> cache.ExploreCache:
+    return cache.ExploreCache("https://looker.example.com", directory=str(tmp_path))
+
+
+@pytest.fixture(name="explore")
+def explore() -> models.LookmlModelExplore:
+    return models.LookmlModelExplore(
+        name="explore",
+        model_name="model",
+        project_name="project",
+        scopes=["explore", "join"],
+        fields=models.LookmlModelExploreFieldset(
+            dimensions=[models.LookmlModelExploreField(name="explore.d1", hidden=False)]
+        ),
+    )
+
+
+def test_explore_cache_round_trips_explores(explore_cache, explore):
+    """ExploreCache.get() should return what was put in the cache."""
+    assert explore_cache.get("model", "explore") is None
+    explore_cache.put("model", "explore", project="project", commit="abc", data=explore)
+    cached = explore_cache.get("model", "explore")
+    assert cached == cache.CachedExplore("project", "abc", explore)
+    assert explore_cache.get("model", "other_explore") is None
+
+
+def test_explore_cache_is_keyed_by_host(explore_cache, explore, tmp_path):
+    """Entries of one instance should not be visible to another."""
+    explore_cache.put("model", "explore", project="project", commit="abc", data=explore)
+    other = cache.ExploreCache("https://other.example.com", directory=str(tmp_path))
+    assert other.get("model", "explore") is None
+
+
+def test_explore_cache_is_keyed_by_fields(explore_cache, explore, tmp_path):
+    """Explores requested with another projection should not be reused."""
+    explore_cache.put("model", "explore", project="project", commit="abc", data=explore)
+    projected = cache.ExploreCache(
+        "https://looker.example.com", directory=str(tmp_path), fields="name,scopes"
+    )
+    assert projected.get("model", "explore") is None
+
+
+def test_explore_cache_expires_entries(explore_cache, explore):
+    """Entries older than the TTL should be ignored and pruned."""
+    explore_cache.put("model", "explore", project="project", commit="abc", data=explore)
+    explore_cache.ttl = 60
+    path = explore_cache._path("model", "explore")
+    os.utime(path, (time.time() - 120, time.time() - 120))
+    assert explore_cache.get("model", "explore") is None
+    explore_cache.prune()
+    assert not os.path.exists(path)
+
+
+def test_explore_cache_prunes_when_created(explore_cache, explore, tmp_path):
+    """The cache should be pruned when it is created, leaving alone the entries
+    other runs are still writing.
+    """
+    explore_cache.put("model", "explore", project="project", commit="abc", data=explore)
+    path = explore_cache._path("model", "explore")
+    os.utime(path, (time.time() - 120, time.time() - 120))
+    writing = tmp_path / "entry.tmp"
+    writing.write_bytes(b"x" * 1000)
+    cache.ExploreCache(
+        "https://looker.example.com", directory=str(tmp_path), ttl=60, max_size=0
+    )
+    assert not os.path.exists(path)
+    assert writing.exists()
+
+
+def test_explore_cache_evicts_oldest_entries(explore_cache, explore):
+    """prune() should evict the oldest entries once the size cap is exceeded."""
+    for i in range(3):
+        explore_cache.put(
+            "model", f"e{i}", project="project", commit="abc", data=explore
+        )
+        path = explore_cache._path("model", f"e{i}")
+        os.utime(path, (time.time() - 10 + i, time.time() - 10 + i))
+    explore_cache.max_size = os.path.getsize(path) * 2
+    explore_cache.prune()
+    assert explore_cache.get("model", "e0") is None
+    assert explore_cache.get("model", "e1") is not None
+    assert explore_cache.get("model", "e2") is not None
@@ -1,4 +1,5 @@
 import argparse
+import os
 
 import pytest  # type: ignore
 
@@ -11,7 +12,7 @@ def initialize_parser() -> argparse.ArgumentParser:
 
 
 def test_parse_input_with_pulse(parser: argparse.ArgumentParser):
-    """parse_input should assign the right defaults."""
+    """The parser should assign the right defaults."""
     ip = parser.parse_args(["pulse"])
     assert ip.command == "pulse"
     assert ip.config_file == "looker.ini"
@@ -25,3 +26,152 @@ def test_parse_input_with_pulse(parser: argparse.ArgumentParser):
     assert ip.config_file == "some_file.ini"
     assert ip.section == "some_section"
     assert ip.timeout == 120
+
+
+def test_parse_input_with_jobs(parser: argparse.ArgumentParser):
+    """--jobs should default to serial API calls."""
+    ip = parser.parse_args(["vacuum", "explores"])
+    assert ip.jobs == 1
+
+    ip = parser.parse_args(["vacuum", "explores", "--jobs", "8"])
+    assert ip.jobs == 8
+
+    ip = parser.parse_args(["pulse", "--jobs", "6"])
+    assert ip.jobs == 6
+
+
+def test_parse_input_with_connection_timeout(parser: argparse.ArgumentParser):
+    """Pulse should default to a 60 second connection test deadline."""
+    ip = parser.parse_args(["pulse"])
+    assert ip.connection_timeout == 60
+
+    ip = parser.parse_args(["pulse", "--connection-timeout", "15"])
+    assert ip.connection_timeout == 15
+
+
+def test_parse_input_with_result_format(parser: argparse.ArgumentParser):
+    """Usage history should be fetched as csv unless json is requested."""
+    ip = parser.parse_args(["analyze", "explores"])
+    assert ip.result_format == "csv"
+
+    ip = parser.parse_args(["analyze", "explores", "--result-format", "json"])
+    assert ip.result_format == "json"
+
+
+def test_parse_input_with_stream(parser: argparse.ArgumentParser):
+    """--stream and --jsonl should be off by default."""
+    ip = parser.parse_args(["vacuum", "explores"])
+    assert not ip.stream and not ip.jsonl
+
+    ip = parser.parse_args(["analyze", "explores", "--jsonl"])
+    assert ip.jsonl
+
+
+def test_parse_input_with_profile(parser: argparse.ArgumentParser):
+    """--profile should be off by default and available to every command."""
+    ip = parser.parse_args(["vacuum", "models"])
+    assert not ip.profile
+
+    ip = parser.parse_args(["pulse", "--profile"])
+    assert ip.profile
+
+    ip = parser.parse_args(["analyze", "projects", "--profile"])
+    assert ip.profile
+
+
+def test_parse_input_with_trace(parser: argparse.ArgumentParser):
+    """--trace should be off by default and available to every command."""
+    ip = parser.parse_args(["vacuum", "explores"])
+    assert not ip.trace
+
+    ip = parser.parse_args(["pulse", "--trace"])
+    assert ip.trace
+
+    ip = parser.parse_args(["analyze", "models", "--trace"])
+    assert ip.trace
+
+
+def test_parse_input_with_max_retries(parser: argparse.ArgumentParser):
+    """Transient API errors should be retried 5 times unless specified."""
+    ip = parser.parse_args(["analyze", "explores"])
+    assert ip.max_retries == 5
+
+    ip = parser.parse_args(["pulse", "--max-retries", "0"])
+    assert ip.max_retries == 0
+
+
+def test_parse_input_with_rate_limits(parser: argparse.ArgumentParser):
+    """API requests should only be limited by --jobs unless specified."""
+    ip = parser.parse_args(["vacuum", "explores"])
+    assert ip.max_rps is None and ip.max_in_flight is None
+
+    ip = parser.parse_args(["pulse", "--max-rps", "2.5", "--max-in-flight", "4"])
+    assert ip.max_rps == 2.5 and ip.max_in_flight == 4
+
+
+def test_parse_input_with_token_cache(parser: argparse.ArgumentParser):
+    """Tokens should only be cached on disk when asked to."""
+    ip = parser.parse_args(["analyze", "projects"])
+    assert not ip.token_cache
+
+    ip = parser.parse_args(["pulse", "--token-cache"])
+    assert ip.token_cache
+
+
+def test_parse_input_with_server(parser: argparse.ArgumentParser):
+    """--server should forward commands to the default socket unless given one."""
+    ip = parser.parse_args(["vacuum", "explores"])
+    assert ip.server is None
+
+    args = cli.parse_args(parser, ["vacuum", "explores", "--server"])
+    assert args["server"].endswith(os.path.join("henry", "serve.sock"))
+
+    args = cli.parse_args(parser, ["pulse", "--server", "/tmp/henry.sock"])
+    assert args["server"] == "/tmp/henry.sock"
+
+
+def test_parse_input_with_serve(parser: argparse.ArgumentParser):
+    """henry serve should keep caches for 5 minutes by default."""
+    ip = parser.parse_args(["serve"])
+    assert ip.socket is None
+    assert ip.cache_ttl == 300
+    assert ip.jobs == 1
+
+    ip = parser.parse_args(["serve", "--socket", "/tmp/henry.sock", "--jobs", "8"])
+    assert ip.socket == "/tmp/henry.sock"
+    assert ip.jobs == 8
+
+
+def test_setup_cli_checks_the_given_arguments():
+    """--model should be required with --explore in the arguments being parsed."""
+    parser = cli.setup_cli(["vacuum", "explores", "--explore", "e"])
+    with pytest.raises(SystemExit):
+        parser.parse_args(["vacuum", "explores", "--explore", "e"])
+    parser = cli.setup_cli(["vacuum", "explores"])
+    assert parser.parse_args(["vacuum", "explores"]).explore is None
+
+
+def test_parse_input_with_batch(parser: argparse.ArgumentParser):
+    """henry batch should write outputs to the current directory by default."""
+    ip = parser.parse_args(["batch", "manifest.yaml"])
+    assert ip.manifest == "manifest.yaml"
+    assert ip.output_dir == "."
+
+    ip = parser.parse_args(["batch", "manifest.yaml", "--output-dir", "nightly"])
+    assert ip.output_dir == "nightly"
+
+
+def test_parse_input_with_sections(parser: argparse.ArgumentParser):
+    """--sections should list the instances to run a command against."""
+    ip = parser.parse_args(["vacuum", "models"])
+    assert ip.sections is None
+    assert not ip.all_sections
+
+    ip = parser.parse_args(["vacuum", "models", "--sections", "prod, staging,"])
+    assert ip.sections == ["prod", "staging"]
+
+    ip = parser.parse_args(["analyze", "explores", "--all-sections"])
+    assert ip.all_sections
+
+    with pytest.raises(SystemExit):
+        cli.parse_args(parser, ["analyze", "models", "--all-sections", "--profile"])
@@ -0,0 +1,136 @@
+from concurrent import futures
+from typing import Any, Dict, Iterator, List
+
+import pytest  # type: ignore
+
+from henry.commands import fanout, vacuum
+from henry.modules import fetcher
+
+
+class FakeCommand(vacuum.Vacuum):
+    """Yields one result per instance without calling the API."""
+
+    def iter_results(self, user_input: fetcher.Input) -> Iterator[Dict[str, Any]]:
+        if user_input.section == "broken":
+            raise ValueError("Unable to reach broken")
+        yield {"Model": f"{user_input.section}_model", "Query Count": 1}
+
+
+class FirstOnlyExecutor:
+    """Runs the first command submitted, leaving the others pending."""
+
+    def __init__(self, max_workers: int):
+        self.submitted: List[futures.Future] = []
+        EXECUTORS.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def submit(self, fn, *args):
+        future: futures.Future = futures.Future()
+        if not self.submitted:
+            future.set_result(fn(*args))
+        self.submitted.append(future)
+        return future
+
+
+EXECUTORS: List[FirstOnlyExecutor] = []
+
+
+@pytest.fixture(name="config_file")
+def write_config_file(tmp_path):
+    config_file = tmp_path / "looker.ini"
+    config_file.write_text(
+        "".join(
+            f"[{section}]\nbase_url=https://{section}.looker.com\n"
+            for section in ["prod", "staging", "broken"]
+        )
+    )
+    return str(config_file)
+
+
+def test_config_sections(config_file):
+    assert fanout.config_sections(config_file) == ["prod", "staging", "broken"]
+    with pytest.raises(FileNotFoundError):
+        fanout.config_sections(config_file + ".missing")
+
+
+def test_section_input_leaves_output_to_the_caller():
+    user_input = fetcher.Input(
+        command="vacuum", sections=["prod", "staging"], save=True, jsonl=True
+    )
+    section_input = fanout.section_input(user_input, "staging")
+    assert section_input.section == "staging"
+    assert not section_input.sections
+    assert section_input.quiet
+    assert not (section_input.save or section_input.stream or section_input.jsonl)
+
+
+def test_run_merges_results_with_their_instance(config_file, capsys):
+    """Results of every instance should be output in one table, in the order of
+    the sections.
+    """
+    fanout.run(
+        FakeCommand,
+        fetcher.Input(
+            command="vacuum",
+            subcommand="models",
+            config_file=config_file,
+            sections=["staging", "prod"],
+            no_cache=True,
+        ),
+    )
+    out = capsys.readouterr().out
+    assert "Instance" in out
+    assert out.index("staging_model") < out.index("prod_model")
+
+
+def test_run_reports_failing_instances_after_the_others(config_file, capsys):
+    """An instance failing should not keep the results of the others from being
+    output.
+    """
+    with pytest.raises(ValueError):
+        fanout.run(
+            FakeCommand,
+            fetcher.Input(
+                command="vacuum",
+                subcommand="models",
+                config_file=config_file,
+                all_sections=True,
+                jsonl=True,
+                no_cache=True,
+            ),
+        )
+    out, err = capsys.readouterr()
+    assert "Unable to run vacuum_models on broken" in err
+    assert "Unable to run" not in out
+    assert '{"Instance": "prod", "Model": "prod_model", "Query Count": 1}' in out
+    assert '"Instance": "staging"' in out
+
+
+def test_run_cancels_instances_left_once_limit_is_reached(
+    config_file, capsys, monkeypatch
+):
+    """Streaming should not wait for the other instances once enough results were
+    output.
+    """
+    monkeypatch.setattr(futures, "ProcessPoolExecutor", FirstOnlyExecutor)
+    fanout.run(
+        FakeCommand,
+        fetcher.Input(
+            command="vacuum",
+            subcommand="models",
+            config_file=config_file,
+            sections=["prod", "staging", "broken"],
+            jsonl=True,
+            limit=[1],
+            no_cache=True,
+        ),
+    )
+    assert '"Instance": "prod"' in capsys.readouterr().out
+    submitted = EXECUTORS[-1].submitted
+    assert len(submitted) == 3
+    assert all(future.cancelled() for future in submitted[1:])
@@ -3,7 +3,7 @@ from typing import Callable, Dict, Optional, Sequence, Tuple, Union
 import pytest  # type: ignore
 from looker_sdk.sdk.api40 import methods, models
 
-from henry.modules import exceptions, fetcher
+from henry.modules import exceptions, fetcher, summaries
 
 
 @pytest.fixture(name="fc")
@@ -90,12 +90,26 @@ def test_get_used_models(fc: fetcher.Fetcher, test_model):
     assert test_model["name"] in used_models.keys()
 
 
+def test_get_used_models_is_memoized(fc: fetcher.Fetcher, monkeypatch):
+    """Identical usage queries should only hit the API once per run."""
+    calls = []
+    run_inline_query = fc.run_inline_query
+
+    def counting_run_inline_query(*args, **kwargs):
+        calls.append(args)
+        return run_inline_query(*args, **kwargs)
+
+    monkeypatch.setattr(fc, "run_inline_query", counting_run_inline_query)
+    assert fc.get_used_models() == fc.get_used_models()
+    assert len(calls) == 1
+
+
 def test_get_explores(fc: fetcher.Fetcher):
     """fetcher.get_explores() should return a list of explores."""
     explores = fc.get_explores()
     assert isinstance(explores, list)
     assert len(explores) > 0
-    assert isinstance(explores[0], models.LookmlModelExplore)
+    assert isinstance(explores[0], summaries.ExploreSummary)
 
 
 def test_get_explores_filters(fc: fetcher.Fetcher):
@@ -110,6 +124,16 @@ def test_get_explores_filters(fc: fetcher.Fetcher):
     )
 
 
+def test_get_explores_concurrently(fc: fetcher.Fetcher, test_model):
+    """fetcher.get_explores() should return the same explores in the same order
+    regardless of the number of jobs.
+    """
+    expected = [e.name for e in fc.get_explores(model=test_model["name"])]
+    fc.jobs = 4
+    actual = [e.name for e in fc.get_explores(model=test_model["name"])]
+    assert actual == expected
+
+
 @pytest.mark.parametrize(
     "model, explore, msg",
     [
@@ -151,7 +175,7 @@ def test_get_explore_fields_gets_fields(
     explore = fc.get_explores(model=test_model["name"], explore=test_explore["name"])
     assert isinstance(explore, list)
     explore = explore[0]
-    assert isinstance(explore, models.LookmlModelExplore)
+    assert isinstance(explore, summaries.ExploreSummary)
     assert explore.model_name == test_model["name"]
     assert explore.name == test_explore["name"]
     fields = fc.get_explore_fields(explore)
@@ -200,6 +224,20 @@ def test_get_explore_field_stats(
     assert all(actual_stats[k] > 0 for k in expected_stats["used_fields"])
 
 
+def test_get_explore_usage(fc: fetcher.Fetcher, test_model, test_used_explore_names):
+    """fetcher.get_explore_usage() should return the query count and field usage of
+    every used explore in a model with a single query.
+    """
+    usage = fc.get_explore_usage(model=test_model["name"])
+    assert isinstance(usage, dict)
+    assert all(e in test_used_explore_names for e in usage)
+    for explore in test_used_explore_names:
+        assert usage[explore].query_count > 0
+        assert usage[explore].fields == fc.get_used_explore_fields(
+            model=test_model["name"], explore=explore
+        )
+
+
 def test_get_explore_join_stats(fc: fetcher.Fetcher, test_model):
     """fetcher.get_explore_join_stats() should return the stats of all joins in
     an explore.
@@ -315,3 +353,19 @@ def test_sort_throws_for_invalid_sort_keys(
     with pytest.raises(KeyError):
         fc.sortkey = sortkey
         fc._sort(DATA)
+
+
+def test_dev_mode_switches_session_once(fc: fetcher.Fetcher, monkeypatch):
+    """Nested dev_mode() blocks should only switch the session once."""
+    workspaces = []
+    update_session = fc.sdk.update_session
+
+    def recording_update_session(body, *args, **kwargs):
+        workspaces.append(body.workspace_id)
+        return update_session(body, *args, **kwargs)
+
+    monkeypatch.setattr(fc.sdk, "update_session", recording_update_session)
+    with fc.dev_mode():
+        fc.run_git_connection_tests(fc.sdk.all_projects()[0].id)
+        fc.run_git_connection_tests(fc.sdk.all_projects()[0].id)
+    assert workspaces == ["dev", "production"]
@@ -0,0 +1,60 @@
+import datetime
+
+import pytest  # type: ignore
+
+from henry.modules import paging
+
+
+def test_window_expression_and_split():
+    """Windows are relative to today and split into an older and a newer half."""
+    window = paging.Window(89, 90)
+    assert window.expression == "89 days ago for 90 days"
+    older, newer = window.split()
+    assert older == paging.Window(89, 45)
+    assert newer == paging.Window(44, 45)
+
+
+def test_window_with_today_covers_fixed_dates():
+    """Windows counted back from a given day should filter on its dates."""
+    window = paging.Window(3, 2, datetime.date(2024, 3, 1))
+    assert window.expression == "2024/02/27 to 2024/02/29"
+    assert [w.expression for w in window.split()] == [
+        "2024/02/27 to 2024/02/28",
+        "2024/02/28 to 2024/02/29",
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1000, 30, 7])
+def test_paginate_fetches_all_rows_in_order(chunk_size):
+    """paginate() should split windows until no chunk is truncated."""
+    history = {day: [{"day": day}] * 5 for day in range(90)}
+
+    def run(expression, limit):
+        days_ago, days = [int(n) for n in expression.split()[::4][:2]]
+        rows = [r for d in range(days_ago, days_ago - days, -1) for r in history[d]]
+        return rows[:limit]
+
+    chunks = list(
+        paging.paginate(
+            run, paging.Window(89, 90), chunk_size=chunk_size, max_rows=10**6
+        )
+    )
+    assert all(c.complete for c in chunks)
+    rows = [r for c in chunks for r in c.rows]
+    assert len(rows) == 450
+    assert [r["day"] for r in rows] == sorted((r["day"] for r in rows), reverse=True)
+
+
+def test_paginate_reports_truncation(capsys):
+    """paginate() should warn when a day or the row ceiling truncates history."""
+    chunks = list(
+        paging.paginate(
+            lambda e, limit: [{}] * limit, paging.Window(1, 2), chunk_size=3, max_rows=4
+        )
+    )
+    assert sum(len(c.rows) for c in chunks) == 4
+    assert not any(c.complete for c in chunks)
+    out, err = capsys.readouterr()
+    assert "has more than 3 rows" in err
+    assert "exceeds 4 rows" in err
+    assert not out
@@ -0,0 +1,54 @@
+import time
+
+from looker_sdk.rtl import api_settings, requests_transport, transport
+
+from henry.modules import profiler
+
+
+def test_endpoint_name_replaces_ids():
+    """profiler.endpoint_name should group requests by endpoint, not by resource."""
+    assert (
+        profiler.endpoint_name(
+            transport.HttpMethod.GET,
+            "https://looker:19999/api/4.0/lookml_models/m/explores/e?fields=name",
+        )
+        == "GET /lookml_models/{id}/explores/{id}"
+    )
+    assert (
+        profiler.endpoint_name(transport.HttpMethod.POST, "/queries/run/csv")
+        == "POST /queries/run/csv"
+    )
+
+
+def test_profiler_summarizes_calls_per_endpoint():
+    """Profiler.summary() should count calls and bytes and bucket latencies."""
+    p = profiler.Profiler()
+    p.record_call("GET /user", 100, 0.005)
+    p.record_call("GET /user", 50, 0.2)
+    p.record_call("POST /login", 10, 20.0)
+    endpoints = p.summary()["endpoints"]
+    assert endpoints["GET /user"]["calls"] == 2
+    assert endpoints["GET /user"]["bytes"] == 150
+    assert endpoints["GET /user"]["max_ms"] == 200.0
+    assert endpoints["GET /user"]["histogram"] == {"<=10ms": 1, "<=250ms": 1}
+    assert endpoints["POST /login"]["histogram"] == {">10000ms": 1}
+
+
+def test_profiler_stages_exclude_nested_stages():
+    """Time spent in a nested stage should only count towards that stage."""
+    p = profiler.Profiler()
+    with p.stage("aggregation"):
+        with p.stage("usage queries"):
+            time.sleep(0.05)
+    stages = p.summary()["stages_s"]
+    assert stages["usage queries"] >= 0.05
+    assert stages["aggregation"] < 0.05
+
+
+def test_profiling_transport_configures_its_inner_transport():
+    settings = api_settings.ApiSettings()
+    settings.base_url = "https://looker.example.com"
+    api = profiler.ProfilingTransport.configure(settings)
+    assert isinstance(api, profiler.ProfilingTransport)
+    assert isinstance(api.inner, requests_transport.RequestsTransport)
+    assert isinstance(api.profiler, profiler.Profiler)
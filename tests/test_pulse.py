@@ -0,0 +1,8 @@
+from henry.commands import pulse
+
+
+def test_escape_filter_matches_names_literally():
+    """Connection names should not be read as Looker filter expressions."""
+    assert pulse.escape_filter("-foo") == "^-foo"
+    assert pulse.escape_filter("a-b") == "a-b"
+    assert pulse.escape_filter('my_db,"50%"^') == 'my^_db^,^"50^%^"^^'
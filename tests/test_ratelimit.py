@@ -0,0 +1,81 @@
+import threading
+import time
+
+from henry.modules import ratelimit
+
+
+def test_limiter_halves_in_flight_limit_once_per_congestion():
+    """AdaptiveLimiter should halve its limit when calls are throttled, once for
+    calls sent at the same time, and grow it back while calls are answered.
+    """
+    limiter = ratelimit.AdaptiveLimiter(max_in_flight=8)
+    with limiter.slot("GET /user") as first:
+        with limiter.slot("GET /user") as second:
+            first.throttled = second.throttled = True
+    assert limiter.limit == 4
+
+    for _ in range(10):
+        with limiter.slot("GET /user"):
+            pass
+    assert 4 < limiter.limit <= 8
+
+
+def test_limiter_caps_calls_in_flight():
+    """AdaptiveLimiter should never let more than max_in_flight calls through."""
+    limiter = ratelimit.AdaptiveLimiter(max_in_flight=2)
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    def call():
+        with limiter.slot("GET /lookml_models"):
+            with lock:
+                in_flight.append(1)
+                peak.append(len(in_flight))
+            time.sleep(0.01)
+            with lock:
+                in_flight.pop()
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max(peak) == 2
+
+
+def test_limiter_detects_slowed_down_calls(monkeypatch):
+    """Calls taking much longer than the typical call to their endpoint should
+    reduce the limit.
+    """
+    now = [0.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    limiter = ratelimit.AdaptiveLimiter(max_in_flight=4)
+    for _ in range(ratelimit.LATENCY_SAMPLES):
+        with limiter.slot("POST /queries/run/csv"):
+            now[0] += 0.2
+    assert limiter.limit == 4
+    with limiter.slot("POST /queries/run/csv"):
+        now[0] += 1.0
+    assert limiter.limit == 2
+
+
+def test_limiter_tolerates_varying_latencies(monkeypatch):
+    """Latencies varying as much as payloads do on an idle instance should not
+    reduce the limit.
+    """
+    now = [0.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    limiter = ratelimit.AdaptiveLimiter(max_in_flight=8)
+    for latency in [0.05, 0.3, 0.1, 0.25, 0.05, 0.3, 0.15, 0.05, 0.3, 0.2] * 10:
+        with limiter.slot("GET /lookml_models/{id}/explores/{id}"):
+            now[0] += latency
+    assert limiter.limit == 8
+
+
+def test_token_bucket_caps_calls_per_second():
+    """Calls beyond a second worth of max_rate should wait for their token."""
+    limiter = ratelimit.AdaptiveLimiter(max_in_flight=1, max_rate=20)
+    waits = [limiter._take_token() for _ in range(21)]
+    assert waits[:20] == [0.0] * 20
+    assert 0.04 <= waits[20] <= 0.05
@@ -0,0 +1,79 @@
+import json
+
+import pytest  # type: ignore
+
+from henry.modules import results
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 1000])
+def test_iter_json_array_decodes_any_chunk_size(size: int):
+    """results.iter_json_array() should yield the same rows regardless of how the
+    response text is split.
+    """
+    rows = [
+        {"query.view": "users", "history.query_run_count": 12},
+        {"query.view": 'orders, "items"', "history.query_run_count": None},
+        [1, 2.5, "three"],
+        123456,
+        "end",
+    ]
+    text = json.dumps(rows, indent=1)
+    chunks = (text[i : i + size] for i in range(0, len(text), size))
+    assert list(results.iter_json_array(chunks)) == rows
+
+
+def test_iter_json_array_handles_empty_arrays():
+    """results.iter_json_array() should not yield anything for an empty array."""
+    assert list(results.iter_json_array(["[", " ]"])) == []
+
+
+@pytest.mark.parametrize("text", ['{"rows": []}', '[{"a": 1}, {"b"'])
+def test_iter_json_array_throws_on_invalid_input(text: str):
+    """results.iter_json_array() should throw if the input is not a complete array."""
+    with pytest.raises(ValueError):
+        list(results.iter_json_array([text]))
+
+
+def test_iter_csv_rows_decodes_typed_columns():
+    """results.iter_csv_rows() should key values by field and convert their types."""
+    text = (
+        "Query View,Query Formatted Fields,History Query Run Count\r\n"
+        'users,"[""users.id"",\r\n""users.name""]",12\r\n'
+        "orders,,3\r\n"
+    )
+    chunks = (text[i : i + 5] for i in range(0, len(text), 5))
+    rows = results.iter_csv_rows(
+        chunks,
+        ["query.view", "query.formatted_fields", "history.query_run_count"],
+        {"history.query_run_count": int},
+    )
+    assert list(rows) == [
+        {
+            "query.view": "users",
+            "query.formatted_fields": '["users.id",\r\n"users.name"]',
+            "history.query_run_count": 12,
+        },
+        {
+            "query.view": "orders",
+            "query.formatted_fields": None,
+            "history.query_run_count": 3,
+        },
+    ]
+
+
+def test_iter_csv_rows_matches_reordered_columns():
+    """results.iter_csv_rows() should match columns with fields by their label,
+    not their position.
+    """
+    rows = results.iter_csv_rows(
+        ["Query Model,History Query Run Count\nthelook,12\n"],
+        ["history.query_run_count", "query.model"],
+        {"history.query_run_count": int},
+    )
+    assert list(rows) == [{"history.query_run_count": 12, "query.model": "thelook"}]
+
+
+def test_iter_csv_rows_throws_on_unexpected_columns():
+    """results.iter_csv_rows() should throw if columns do not match the fields."""
+    with pytest.raises(ValueError):
+        list(results.iter_csv_rows(["Query View\nusers\n"], ["a.b", "c.d"]))
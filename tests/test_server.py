@@ -0,0 +1,93 @@
+import io
+import os
+import stat
+import sys
+import threading
+
+import pytest  # type: ignore
+
+from henry.commands.serve import Serve
+from henry.modules import server
+
+
+@pytest.fixture(name="serve")
+def start_server(tmp_path):
+    """Starts a server running handler on a socket in tmp_path."""
+    started = []
+
+    def start(handler):
+        s = server.Server(str(tmp_path / "henry" / "serve.sock"), handler)
+        thread = threading.Thread(target=s.serve_forever)
+        thread.start()
+        started.append((s, thread))
+        return s
+
+    yield start
+    for s, thread in started:
+        s.shutdown()
+        thread.join()
+        s.server_close()
+
+
+def test_forward_prints_output_and_returns_status(serve, capsys):
+    """Commands forwarded to the server should print their output on the client
+    and exit with their status.
+    """
+    requests = []
+
+    def handler(argv, cwd, stdout, stderr):
+        requests.append((argv, cwd))
+        print("results", file=stdout)
+        print("warning", file=stderr)
+        return 3
+
+    s = serve(handler)
+    assert server.forward(s.path, ["vacuum", "models"]) == 3
+    assert requests == [(["vacuum", "models"], os.getcwd())]
+    out, err = capsys.readouterr()
+    assert out == "results\n"
+    assert err == "warning\n"
+
+
+def test_forward_reports_errors(serve, capsys):
+    """Usage errors and failures of commands should reach the client."""
+
+    def handler(argv, cwd, stdout, stderr):
+        if argv == ["usage"]:
+            raise SystemExit(2)
+        raise ValueError("Please specify one of 'projects', 'models' or 'explores'")
+
+    s = serve(handler)
+    assert server.forward(s.path, ["usage"]) == 2
+    assert server.forward(s.path, ["analyze"]) == 1
+    assert "ValueError: Please specify one of" in capsys.readouterr().err
+
+
+def test_server_socket_is_private(serve):
+    """Only the current user should be able to run commands on the server."""
+    s = serve(lambda *args: 0)
+    assert stat.S_IMODE(os.stat(s.path).st_mode) & 0o077 == 0
+    assert server.is_running(s.path)
+    with pytest.raises(OSError):
+        server.Server(s.path, lambda *args: 0)
+
+
+def test_forward_without_server(tmp_path, capsys):
+    """The client should fail right away when no server is listening."""
+    assert server.forward(str(tmp_path / "serve.sock"), ["pulse"]) == 1
+    assert "henry serve" in capsys.readouterr().err
+
+
+def test_serve_rejects_session_options(tmp_path, capsys):
+    """Options of the API session should be rejected rather than ignored, since
+    commands run with the session of henry serve.
+    """
+    serve = Serve.__new__(Serve)
+    serve.config_file = os.path.abspath("looker.ini")
+    serve.section = "Looker"
+    argv = ["vacuum", "models", "--jobs", "8", "--token-cache"]
+    with pytest.raises(SystemExit):
+        serve.handle(argv, str(tmp_path), io.StringIO(), sys.stderr)
+    assert "--jobs, --token-cache can only be given to henry serve" in (
+        capsys.readouterr().err
+    )
@@ -0,0 +1,46 @@
+import csv
+import io
+import json
+
+from henry.modules import sinks
+
+
+def test_csv_sink_writes_rows_as_they_come(tmp_path):
+    """sinks.CsvSink should write every row right away and join multiline values."""
+    filename = str(tmp_path / "results.csv")
+    with sinks.CsvSink(filename) as sink:
+        sink.write({"Model": "a", "Unused Explores": "x\ny"})
+        with open(filename) as f:
+            assert list(csv.reader(f)) == [["Model", "Unused Explores"], ["a", "x,y"]]
+        sink.write({"Model": "b", "Unused Explores": ""})
+    with open(filename) as f:
+        assert len(list(csv.reader(f))) == 3
+
+
+def test_json_lines_sink_writes_one_row_per_line():
+    """sinks.JsonLinesSink should write every row as a JSON object on its own line."""
+    out = io.StringIO()
+    rows = [{"Model": "a", "Is Hidden": True}, {"Model": "b", "Is Hidden": False}]
+    with sinks.JsonLinesSink(out) as sink:
+        for row in rows:
+            sink.write(row)
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == rows
+
+
+def test_table_sink_prints_bounded_tables():
+    """sinks.TableSink should print a table every buffer_size rows."""
+    out = io.StringIO()
+    with sinks.TableSink(out, buffer_size=2) as sink:
+        for i in range(3):
+            sink.write({"Model": f"model_{i}"})
+        assert out.getvalue().count("model_") == 2
+    assert out.getvalue().count("model_") == 3
+    assert out.getvalue().count("| Model ") == 2
+
+
+def test_table_sink_prints_no_results():
+    """sinks.TableSink should say so when there were no rows at all."""
+    out = io.StringIO()
+    with sinks.TableSink(out):
+        pass
+    assert out.getvalue() == "No results found.\n\n"
@@ -0,0 +1,57 @@
+import subprocess
+import sys
+from typing import Dict
+
+# Modules only commands that talk to Looker need
+HEAVY_MODULES = ["looker_sdk", "requests", "tabulate", "henry.commands"]
+
+
+def import_times(code: str) -> Dict[str, int]:
+    """Runs code with python -X importtime and returns the cumulative import time,
+    in microseconds, of every module it imported.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, module = line.split("|")
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_imports_quickly():
+    """Importing henry.cli and building its parser should not load the Looker SDK
+    or the commands using it.
+    """
+    times = import_times("import henry.cli; henry.cli.setup_cli()")
+    assert "henry.cli" in times
+    heavy = [
+        m for m in times if any(m == h or m.startswith(h + ".") for h in HEAVY_MODULES)
+    ]
+    assert not heavy
+
+
+def test_help_does_not_load_commands():
+    """henry --help should print the help file without importing any command."""
+    proc = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, henry.cli\n"
+            "sys.argv = ['henry', '--help']\n"
+            "try:\n"
+            "    henry.cli.main()\n"
+            "except SystemExit:\n"
+            "    print('looker_sdk' in sys.modules)",
+        ],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    assert "Global Options:" in proc.stdout
+    assert proc.stdout.strip().endswith("False")
@@ -0,0 +1,86 @@
+import json
+
+from looker_sdk.rtl import serialize
+from looker_sdk.sdk.api40 import models
+
+from henry.modules import summaries
+
+
+def make_explore(name: str) -> models.LookmlModelExplore:
+    def field(field_name: str, hidden: bool):
+        return {
+            "name": field_name,
+            "hidden": hidden,
+            "sql": "${TABLE}.id",
+            "description": "x" * 100,
+            "suggestions": ["a", "b"],
+        }
+
+    explore = serialize.deserialize40(
+        data=json.dumps(
+            {
+                "name": name,
+                "model_name": "thelook",
+                "project_name": "project",
+                "hidden": False,
+                "description": "Orders",
+                "scopes": [name, "users"],
+                "fields": {
+                    "dimensions": [
+                        field(f"{name}.id", False),
+                        field("users.id", True),
+                    ],
+                    "measures": [field("users.count", False)],
+                },
+            }
+        ),
+        structure=models.LookmlModelExplore,
+    )
+    assert isinstance(explore, models.LookmlModelExplore)
+    return explore
+
+
+def test_summarize_explore_keeps_what_henry_reports_on():
+    """Summaries should hold the attributes of explores henry uses, under the same
+    names.
+    """
+    summary = summaries.summarize_explore(make_explore("orders"))
+    assert summary.name == "orders"
+    assert summary.model_name == "thelook"
+    assert summary.project_name == "project"
+    assert summary.hidden is False
+    assert summary.description == "Orders"
+    assert summary.scopes == ("orders", "users")
+    assert [(f.name, f.hidden) for f in summary.fields.dimensions] == [
+        ("orders.id", False),
+        ("users.id", True),
+    ]
+    assert [f.name for f in summary.fields.measures] == ["users.count"]
+    assert not hasattr(summary, "__dict__")
+    assert not hasattr(summary.fields.dimensions[0], "__dict__")
+
+
+def test_summarize_explore_shares_names_across_explores():
+    """Fields of a view joined in several explores should share their names."""
+    orders = summaries.summarize_explore(make_explore("orders"))
+    items = summaries.summarize_explore(make_explore("order_items"))
+    assert orders.fields.measures[0].name is items.fields.measures[0].name
+    assert orders.scopes[1] is items.scopes[1]
+
+
+def test_summarize_explore_without_fields():
+    explore = models.LookmlModelExplore(name="empty", model_name="thelook")
+    summary = summaries.summarize_explore(explore)
+    assert summary.fields.dimensions == ()
+    assert summary.fields.measures == ()
+    assert summary.scopes == ()
+    assert summary.project_name == ""
+
+
+def test_explore_fields_request_every_summarized_attribute():
+    """Explores should be requested with every attribute summaries hold."""
+    requested = {f.split("(")[0] for f in summaries.EXPLORE_FIELDS.split(",")}
+    assert set(summaries.ExploreSummary.__slots__) <= requested
+    assert "fields(dimensions(name,hidden),measures(name,hidden))" in (
+        summaries.EXPLORE_FIELDS
+    )
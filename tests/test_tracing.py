@@ -0,0 +1,80 @@
+import json
+import threading
+
+from looker_sdk.rtl import api_settings, requests_transport
+
+from henry.modules import spinner, tracing
+
+
+def test_span_does_nothing_without_a_tracer():
+    """tracing.span() should only record spans of the tracer it is given."""
+    tracer, other = tracing.Tracer(), tracing.Tracer()
+    with tracing.span(None, "idle", "stage"):
+        pass
+    with tracing.span(tracer, "busy", "stage", view="history"):
+        pass
+    spans = [e for e in tracer.events() if e["ph"] == "X"]
+    assert [(s["name"], s["cat"], s["args"]) for s in spans] == [
+        ("busy", "stage", {"view": "history"})
+    ]
+    assert other.events() == []
+
+
+def test_tracer_writes_chrome_trace_events(tmp_path):
+    """Tracer.write() should write nested spans of every thread along with the
+    names of the threads.
+    """
+    tracer = tracing.Tracer()
+
+    def work():
+        with tracer.span("work", "api"):
+            pass
+
+    with tracer.span("outer", "command"):
+        with tracer.span("inner", "api"):
+            worker = threading.Thread(target=work, name="worker")
+            worker.start()
+            worker.join()
+    filename = str(tmp_path / "trace.json")
+    tracer.write(filename)
+    with open(filename) as f:
+        events = json.load(f)["traceEvents"]
+
+    spans = {e["name"]: e for e in events if e["ph"] == "X"}
+    outer, inner = spans["outer"], spans["inner"]
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    threads = {e["tid"]: e["args"]["name"] for e in events if e["ph"] == "M"}
+    assert threads[spans["work"]["tid"]] == "worker"
+    assert threads[outer["tid"]] == threading.current_thread().name
+
+
+def test_spinner_traces_decorated_methods():
+    """Spinner-decorated methods should be traced by the tracer of their instance,
+    under their qualified name.
+    """
+
+    class Command:
+        def __init__(self, tracer):
+            self.tracer = tracer
+
+        @spinner.Spinner()
+        def explores(self):
+            return "done"
+
+    tracer = tracing.Tracer()
+    assert Command(tracer).explores() == "done"
+    assert Command(None).explores() == "done"
+    spans = [e for e in tracer.events() if e["ph"] == "X"]
+    assert [(s["name"], s["cat"]) for s in spans] == [
+        ("test_spinner_traces_decorated_methods.<locals>.Command.explores", "command")
+    ]
+
+
+def test_tracing_transport_configures_its_inner_transport():
+    settings = api_settings.ApiSettings()
+    settings.base_url = "https://looker.example.com"
+    api = tracing.TracingTransport.configure(settings)
+    assert isinstance(api, tracing.TracingTransport)
+    assert isinstance(api.inner, requests_transport.RequestsTransport)
+    assert isinstance(api.tracer, tracing.Tracer)
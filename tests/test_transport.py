@@ -0,0 +1,142 @@
+from typing import List, Union
+
+import pytest  # type: ignore
+import requests
+from looker_sdk import error
+from looker_sdk.rtl import api_settings, transport as rtl_transport
+
+from henry.modules import transport
+
+
+class FakeAdapter(requests.adapters.BaseAdapter):
+    """Answers requests with the given statuses, or raises the given errors, then
+    answers with 200.
+    """
+
+    def __init__(self, statuses: List[Union[int, Exception]]):
+        super().__init__()
+        self.statuses = statuses
+        self.calls = 0
+
+    def send(self, request, **kwargs):
+        self.calls += 1
+        status = self.statuses.pop(0) if self.statuses else 200
+        if isinstance(status, Exception):
+            raise status
+        resp = requests.Response()
+        resp.status_code = status
+        resp.headers["Content-Type"] = "application/json"
+        resp.raw = None
+        resp._content = b'{"ok": true}'
+        resp.request = request
+        resp.url = request.url
+        return resp
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(name="make_transport")
+def fixture_make_transport(monkeypatch):
+    monkeypatch.setattr(transport.time, "sleep", lambda seconds: None)
+    settings = api_settings.ApiSettings()
+    settings.base_url = "https://looker.example.com"
+
+    def make(statuses: List[Union[int, Exception]], **kwargs):
+        session = requests.Session()
+        adapter = FakeAdapter(statuses)
+        session.mount("https://", adapter)
+        return transport.ApiTransport(settings, session, **kwargs), adapter
+
+    return make
+
+
+def test_request_retries_transient_errors(make_transport):
+    """ApiTransport should retry 429 and 5xx responses until one succeeds."""
+    api, adapter = make_transport([429, 502, 503])
+    resp = api.request(rtl_transport.HttpMethod.GET, "https://looker.example.com/x")
+    assert resp.ok
+    assert adapter.calls == 4
+
+
+def test_request_gives_up_after_max_retries(make_transport):
+    """ApiTransport should return the last error once max_retries is reached and
+    not retry client errors.
+    """
+    api, adapter = make_transport([500] * 10, max_retries=2)
+    resp = api.request(rtl_transport.HttpMethod.GET, "https://looker.example.com/x")
+    assert not resp.ok
+    assert adapter.calls == 3
+
+    api, adapter = make_transport([404])
+    resp = api.request(rtl_transport.HttpMethod.GET, "https://looker.example.com/x")
+    assert not resp.ok
+    assert adapter.calls == 1
+
+
+def test_request_raises_timeouts(make_transport):
+    """Timeouts should not be retried and be raised as RequestTimeout."""
+    api, adapter = make_transport([requests.ReadTimeout("read timed out")])
+    with pytest.raises(transport.RequestTimeout):
+        api.request(rtl_transport.HttpMethod.GET, "https://looker.example.com/x")
+    assert adapter.calls == 1
+
+
+def test_stream_raises_sdk_errors(make_transport):
+    """Streamed requests failing to connect or timing out should raise SDKError,
+    as other requests do.
+    """
+    api, adapter = make_transport([requests.ConnectionError("refused")], max_retries=0)
+    with pytest.raises(error.SDKError):
+        with api.stream(rtl_transport.HttpMethod.GET, "https://looker.example.com/x"):
+            pass
+    api, adapter = make_transport([requests.ReadTimeout("read timed out")])
+    with pytest.raises(transport.RequestTimeout):
+        with api.stream(rtl_transport.HttpMethod.GET, "https://looker.example.com/x"):
+            pass
+
+
+def test_retry_budget_limits_retries():
+    """RetryBudget should allow retries for a share of the requests sent."""
+    budget = transport.RetryBudget(ratio=0.5, minimum=1)
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+
+def test_backoff_grows_and_honors_retry_after():
+    """backoff() should stay below an exponentially growing limit, unless Looker
+    asks for a specific wait.
+    """
+    for retry in range(10):
+        wait = transport.backoff(retry)
+        assert (
+            0 <= wait <= min(transport.BACKOFF_CAP, transport.BACKOFF_BASE * 2**retry)
+        )
+    assert transport.backoff(0, "7") == 7
+    assert transport.backoff(0, "3600") == transport.BACKOFF_CAP
+
+
+def test_request_renews_rejected_tokens_once(make_transport):
+    """A call answered with 401 should be sent again once if its token could be
+    renewed.
+    """
+    api, adapter = make_transport([401, 401, 401])
+    rejected = []
+
+    def on_unauthorized(authorization: str) -> bool:
+        rejected.append(authorization)
+        return True
+
+    api.on_unauthorized = on_unauthorized
+    resp = api.request(
+        rtl_transport.HttpMethod.GET,
+        "https://looker.example.com/x",
+        authenticator=lambda options: {"Authorization": "Bearer cached"},
+    )
+    assert not resp.ok
+    assert adapter.calls == 2
+    assert rejected == ["Bearer cached"]
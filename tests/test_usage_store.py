@@ -0,0 +1,73 @@
+import datetime
+
+import pytest  # type: ignore
+
+from henry.modules import paging, usage_store
+
+
+@pytest.fixture(name="store")
+def initialize(tmp_path) -> usage_store.UsageStore:
+    store = usage_store.UsageStore(
+        "https://looker.example.com", path=str(tmp_path / "usage.sqlite")
+    )
+    yield store
+    store.close()
+
+
+def records(days_ago: int, count: int):
+    day = usage_store.UsageStore._day(days_ago)
+    return [
+        usage_store.UsageRecord(day, "model", "explore", usage_store.EXPLORE, count),
+        usage_store.UsageRecord(day, "model", "explore", "view.field", count),
+        usage_store.UsageRecord(day, "model", "other", usage_store.EXPLORE, 1),
+    ]
+
+
+def test_usage_store_records_the_dates_it_fetched(store: usage_store.UsageStore):
+    """Days should be recorded by the dates of the window they were fetched with,
+    not by today's date when they are written.
+    """
+    window = paging.Window(9, 1, datetime.date.today() - datetime.timedelta(days=1))
+    store.write(window, [])
+    assert store.missing_windows(11) == [paging.Window(9, 10, datetime.date.today())]
+
+
+def test_usage_store_only_misses_unstored_days(store: usage_store.UsageStore):
+    """missing_windows() should skip stored days but always refetch recent ones."""
+    assert store.missing_windows(10) == [paging.Window(9, 10, datetime.date.today())]
+    store.write(paging.Window(9, 5), [r for d in range(5, 10) for r in records(d, 1)])
+    assert store.missing_windows(10) == [paging.Window(4, 5, datetime.date.today())]
+    store.write(paging.Window(4, 5), [r for d in range(5) for r in records(d, 1)])
+    assert store.missing_windows(10) == [paging.Window(1, 2, datetime.date.today())]
+
+
+def test_usage_store_does_not_mark_incomplete_days(store: usage_store.UsageStore):
+    """Days with truncated history should be fetched again."""
+    store.write(paging.Window(5, 1), records(5, 1), complete=False)
+    assert store.missing_windows(6) == [paging.Window(5, 6, datetime.date.today())]
+
+
+def test_usage_store_answers_timeframes(store: usage_store.UsageStore):
+    """Usage should be summed over the requested number of days only."""
+    for days_ago in range(10):
+        store.write(paging.Window(days_ago, 1), records(days_ago, days_ago + 1))
+    assert store.used_models(3) == {"model": 6 + 3}
+    assert store.used_explores(3, "model") == {"explore": 6, "other": 3}
+    assert store.used_explores(3, "model", "explore") == {"explore": 6}
+    assert store.used_fields(10, "model") == {"explore": {"view.field": 55}}
+
+
+def test_usage_store_replaces_refetched_days(store: usage_store.UsageStore):
+    """Writing a day again should replace its usage rather than add to it."""
+    store.write(paging.Window(0, 1), records(0, 5))
+    store.write(paging.Window(0, 1), records(0, 7))
+    assert store.used_explores(1, "model", "explore") == {"explore": 7}
+
+
+def test_usage_store_compacts_expired_days(store: usage_store.UsageStore):
+    """compact() should delete days past the retention period."""
+    store.retention = 5
+    for days_ago in range(10):
+        store.write(paging.Window(days_ago, 1), records(days_ago, 1))
+    store.compact()
+    assert store.used_models(10) == {"model": 5 * 2}